@@ -1,13 +1,14 @@
 from flask import Flask
-from flask_sqlalchemy import SQLAlchemy
 from flask_marshmallow import Marshmallow
 from flask_migrate import Migrate
 from webargs.flaskparser import parser
+from webargs.multidictproxy import MultiDictProxy
 from flask import jsonify
 from flask_restful import abort
+from app import replicas
 import os
 
-db = SQLAlchemy()
+db = replicas.RoutingSQLAlchemy()
 ma = Marshmallow()
 migrate = Migrate()
 
@@ -20,10 +21,44 @@ def create_app():
     if database_url.startswith("postgres://"):
         database_url = database_url.replace("postgres://", "postgresql://", 1)
     app.config['SQLALCHEMY_DATABASE_URI'] = database_url
+    # Comma-separated URLs of read-only replicas for GET requests to read
+    # from; see app/replicas.py.
+    replica_urls = os.environ.get('DATABASE_REPLICA_URLS')
+    app.config['SQLALCHEMY_BINDS'] = {
+        '%s_%d' % (replicas.REPLICA_BIND_PREFIX, i):
+        url.replace('postgres://', 'postgresql://', 1)
+        for i, url in enumerate(replica_urls.split(',') if replica_urls else ())
+    }
+    # Replicas further behind the primary than this are not read from.
+    app.config['REPLICA_MAX_LAG_SECONDS'] = float(
+        os.environ.get('REPLICA_MAX_LAG_SECONDS', 5))
 
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # Number of engine decisions memoized per process; 0 disables the cache.
+    app.config['DECISION_CACHE_SIZE'] = int(
+        os.environ.get('DECISION_CACHE_SIZE', 10000))
+    # Write new decisions onto the application row itself; see
+    # models.Application. Rows in either layout are always readable.
+    app.config['COMPACT_APPLICATION_STORAGE'] = os.environ.get(
+        'COMPACT_APPLICATION_STORAGE', '').lower() in ('1', 'true', 'yes')
+    # Days an application is kept before purge-expired deletes it; unset
+    # keeps applications forever.
+    retention_days = os.environ.get('APPLICATION_RETENTION_DAYS')
+    app.config['APPLICATION_RETENTION_DAYS'] = (int(retention_days)
+                                                if retention_days else None)
+    # Whether the migrations partition the application tables by month; see
+    # app/partitions.py.
+    app.config['PARTITION_APPLICATIONS'] = os.environ.get(
+        'PARTITION_APPLICATIONS', '').lower() in ('1', 'true', 'yes')
+    # Serve GET /applications:export, to callers presenting EXPORT_API_TOKEN
+    # as a bearer token. Off by default; the export-applications command
+    # needs neither.
+    app.config['EXPORT_API_ENABLED'] = os.environ.get(
+        'EXPORT_API_ENABLED', '').lower() in ('1', 'true', 'yes')
+    app.config['EXPORT_API_TOKEN'] = os.environ.get('EXPORT_API_TOKEN')
 
     db.init_app(app)
+    replicas.init_app(app, db)
     migrate.init_app(app, db)
     ma.init_app(app)
 
@@ -31,12 +66,27 @@ def create_app():
     from app.api import blueprint as api_blueprint
     app.register_blueprint(api_blueprint)
 
+    from engine import decision_cache
+    decision_cache.configure(maxsize=app.config['DECISION_CACHE_SIZE'])
+
+    from app import commands
+    app.cli.add_command(commands.score_file)
+    app.cli.add_command(commands.export_applicants)
+    app.cli.add_command(commands.backtest_policies)
+    app.cli.add_command(commands.import_users)
+    app.cli.add_command(commands.import_applications)
+    app.cli.add_command(commands.export_applications)
+    app.cli.add_command(commands.purge_expired)
+    app.cli.add_command(commands.manage_partitions)
+
     @app.errorhandler(422)
     def custom_handler(err):
+        # webargs nests the messages under the location that failed to parse.
+        messages = err.data['meta']['messages']
         return jsonify({
             'status': 422,
             'title': 'One or more parameters did not validate.',
-            'messages': err.data['meta']['messages']['json'],
+            'messages': messages.get('json', next(iter(messages.values()))),
             'data': err.data['meta']['data'],
             'valid_data': err.data['meta']['valid_data'],
         }), 422
@@ -45,7 +95,9 @@ def create_app():
     def handle_error(error, req, schema, *, error_status_code, error_headers):
         abort(422,
               meta={
-                  'data': error.data,
+                  # Query arguments arrive as a MultiDictProxy.
+                  'data': dict(error.data) if isinstance(
+                      error.data, MultiDictProxy) else error.data,
                   'messages': error.messages,
                   'valid_data': error.valid_data,
               })
@@ -1,130 +1,267 @@
-from flask import request, jsonify
+from flask import (Response, current_app, request, jsonify,
+                   stream_with_context, url_for)
 from webargs.flaskparser import use_args
 from marshmallow import Schema, fields
-from app import models, schemas, db
+from app import (bulk, history_export, models, queries, schemas, serializers,
+                 validators, db)
 from app.api import blueprint
 from engine import application_processor as ap
+from engine import decision_cache
 
 from flask import make_response, jsonify
+import functools
+import hmac
+
+
+# The most applications accepted by one batch request.
+MAXIMUM_BATCH_SIZE = 10000
 
 
 def make_404(message):
     return make_response(jsonify(message), 404)
 
 
+def make_413():
+    return make_response(
+        jsonify('at most %d applications may be submitted at once.' %
+                MAXIMUM_BATCH_SIZE), 413)
+
+
+def _requested_terms(offer_terms_args):
+    """Returns the terms asked for, shortest first, or None for the default."""
+    if 'terms' not in offer_terms_args:
+        return None
+    return sorted(set(offer_terms_args['terms']))
+
+
+def _evaluate(applicant_info, terms):
+    """Returns the list of offers and the rejection reasons for an applicant."""
+    if terms:
+        return decision_cache.process_application(applicant_info, terms=terms)
+    offer, rejection_reasons = decision_cache.process_application(
+        applicant_info)
+    return ([] if offer is None else [offer]), rejection_reasons
+
+
 @blueprint.route('/users/<uuid:user_id>/applications', methods=['POST'])
-@use_args(schemas.ApplicantInfoSchema())
-def submit_application(applicant_info_args, user_id):
+@validators.use_args(schemas.ApplicantInfoSchema())
+@use_args(schemas.offer_terms_request_schema, location='query')
+def submit_application(applicant_info_args, offer_terms_args, user_id):
     # NOTE: Rate-limiting would be a useful feature for this API.
     # Might also consider metrics on outlier users with excessive applications.
     user = models.User.query.get(user_id)
     if user is None:
         return make_404('the requested user was not found.')
-    applicant_info = models.ApplicantInfo(**applicant_info_args)
 
     # Evaluate the application so we know whether we can make an offer.
-    offer, rejection_reasons = ap.process_application(applicant_info)
-
-    application = models.Application(user_id=user_id,
-                                     applicant_info=applicant_info)
-    if offer is not None:
-        application.status = models.ApplicationStatus.APPROVED
-        application.offer = offer
-    else:
-        application.status = models.ApplicationStatus.DECLINED
-        application.rejections = [
-            models.Rejection(reason=rejection_reason)
-            for rejection_reason in rejection_reasons
-        ]
+    terms = _requested_terms(offer_terms_args)
+    offers, rejection_reasons = _evaluate(
+        ap.ApplicantRecord(**applicant_info_args), terms)
+
+    application = models.Application(
+        user_id=user_id,
+        applicant_info=models.ApplicantInfo(**applicant_info_args),
+        requested_terms=terms)
+    application.status = (models.ApplicationStatus.APPROVED
+                          if offers else models.ApplicationStatus.DECLINED)
+    application.set_offers(offers)
+    application.set_rejection_reasons(rejection_reasons)
 
     # Save the application data along with any offer or rejections.
     db.session.add(application)
     db.session.commit()
 
-    return jsonify(schemas.application_schema.dump(application)), 201
+    return serializers.jsonify(serializers.dump_application(application)), 201
 
 
-@blueprint.route('/users/<uuid:user_id>/applications/<uuid:application_id>',
-                 methods=['PUT'])
-@use_args(schemas.ApplicantInfoSchema(partial=True))
-def update_application(applicant_info_args, user_id, application_id):
+@blueprint.route('/users/<uuid:user_id>/applications', methods=['GET'])
+@use_args(schemas.application_list_request_schema, location='query')
+def list_applications(args, user_id):
     user = models.User.query.get(user_id)
     if user is None:
-        return make_404('the requested application was not found.')
-    application = models.Application.query.get(application_id)
-    if application is None:
-        return make_404('the requested application was not found.')
+        return make_404('the requested user was not found.')
+
+    # Keyset pagination over ix_application_user_id_id: each page starts
+    # after the last id of the previous one, so deep pages cost no more than
+    # the first.
+    query = models.Application.query.filter(
+        models.Application.user_id == user_id)
+    if 'cursor' in args:
+        query = query.filter(models.Application.id > args['cursor']['id'])
+    applications = query.order_by(models.Application.id).options(
+        db.selectinload(models.Application.applicant_info_row)).limit(
+            args['limit'] + 1).all()
+
+    next_url = None
+    if len(applications) > args['limit']:
+        applications = applications[:args['limit']]
+        next_url = url_for('api.list_applications',
+                           user_id=user_id,
+                           limit=args['limit'],
+                           cursor=schemas.encode_cursor(
+                               {'id': str(applications[-1].id)}))
+    return serializers.jsonify({
+        'applications': serializers.dump_applications(applications),
+        'next': next_url,
+    })
+
+
+@blueprint.route('/users/<uuid:user_id>/applications:batch', methods=['POST'])
+@use_args(schemas.applicant_infos_schema)
+def submit_application_batch(applicant_info_args, user_id):
+    if len(applicant_info_args) > MAXIMUM_BATCH_SIZE:
+        return make_413()
+    user = models.User.query.get(user_id)
+    if user is None:
+        return make_404('the requested user was not found.')
+
+    applications = bulk.score_and_insert_applications(
+        [user_id] * len(applicant_info_args), applicant_info_args)
+    db.session.commit()
+
+    return serializers.jsonify(serializers.dump_applications(applications)), 201
+
+
+@blueprint.route('/applications:batch', methods=['POST'])
+@use_args(schemas.user_applicant_infos_schema)
+def submit_multi_user_application_batch(applicant_info_args):
+    if len(applicant_info_args) > MAXIMUM_BATCH_SIZE:
+        return make_413()
+    user_ids = set(args['user_id'] for args in applicant_info_args)
+    known_user_ids = set(
+        user_id for user_id, in db.session.query(models.User.id).filter(
+            models.User.id.in_(user_ids)))
+
+    # Applications for unknown users are reported but not inserted.
+    accepted = [
+        args for args in applicant_info_args
+        if args['user_id'] in known_user_ids
+    ]
+    applications = iter(
+        serializers.dump_applications(
+            bulk.score_and_insert_applications(
+                [args['user_id'] for args in accepted], [{
+                    key: val
+                    for key, val in args.items() if key != 'user_id'
+                } for args in accepted])))
+    db.session.commit()
+
+    return serializers.jsonify([
+        next(applications) if args['user_id'] in known_user_ids else
+        {'error': 'the requested user was not found.'}
+        for args in applicant_info_args
+    ]), 201
+
+
+def _requires_export_token(view):
+    """Serves view only to holders of the export token, if enabled."""
+
+    @functools.wraps(view)
+    def guarded(*args, **kwargs):
+        token = current_app.config['EXPORT_API_TOKEN']
+        if not current_app.config['EXPORT_API_ENABLED'] or not token:
+            return make_404('the requested URL was not found.')
+        if not hmac.compare_digest(
+                request.headers.get('Authorization', '').encode(),
+                ('Bearer ' + token).encode()):
+            response = make_response(
+                jsonify('a valid export token is required.'), 401)
+            response.headers['WWW-Authenticate'] = 'Bearer'
+            return response
+        return view(*args, **kwargs)
 
-    if user.id != application.user_id:
+    return guarded
+
+
+@blueprint.route('/applications:export', methods=['GET'])
+@_requires_export_token
+@use_args(schemas.application_export_request_schema, location='query')
+def export_applications(args):
+    # Streams every matching application as NDJSON. Each record carries a
+    # cursor; passing the last one received resumes an interrupted export.
+    batches = history_export.iter_record_batches(
+        status=models.ApplicationStatus[args['status']]
+        if 'status' in args else None,
+        min_id=args.get('min_id'),
+        max_id=args.get('max_id'),
+        after=args['cursor']['id'] if 'cursor' in args else None)
+    return Response(stream_with_context(
+        history_export.iter_ndjson(batches, compress=args['gzip'])),
+                    mimetype='application/gzip'
+                    if args['gzip'] else 'application/x-ndjson')
+
+
+@blueprint.route('/users/<uuid:user_id>/maximum-loan-amount', methods=['GET'])
+@use_args(schemas.maximum_loan_amount_request_schema, location='query')
+def get_maximum_loan_amount(args, user_id):
+    # Read-only: lets the funnel ask how much a customer can borrow without
+    # writing trial applications.
+    user = models.User.query.get(user_id)
+    if user is None:
+        return make_404('the requested user was not found.')
+
+    terms = args.pop('terms', None)
+    maximum_loans, rejection_reasons = ap.maximum_loan_amounts(
+        ap.ApplicantRecord(**args, loan_amount=0.0),
+        terms=sorted(set(terms)) if terms else None)
+
+    return jsonify(
+        schemas.maximum_loan_amount_schema.dump({
+            'maximum_loan_amount':
+            max((loan.loan_amount for loan in maximum_loans), default=None),
+            'offers': maximum_loans,
+            'rejection_reasons': rejection_reasons,
+        }))
+
+
+@blueprint.route('/users/<uuid:user_id>/applications/<uuid:application_id>',
+                 methods=['PUT'])
+@validators.use_args(schemas.ApplicantInfoSchema(partial=True))
+@use_args(schemas.offer_terms_request_schema, location='query')
+def update_application(applicant_info_args, offer_terms_args, user_id,
+                       application_id):
+    application = queries.get_user_application(user_id, application_id)
+    if application is None:
         return make_404('the requested application was not found.')
 
     for key, val in applicant_info_args.items():
         setattr(application.applicant_info, key, val)
 
+    # Without terms, reprice the terms the application asked for before.
+    if 'terms' in offer_terms_args:
+        application.requested_terms = _requested_terms(offer_terms_args)
+
     # Evaluate the application so we know whether we can make an offer.
-    offer, rejection_reasons = ap.process_application(
-        application.applicant_info)
-
-    if offer is not None:
-        application.status = models.ApplicationStatus.APPROVED
-        application.offer = offer
-        application.rejections = []
-    else:
-        application.status = models.ApplicationStatus.DECLINED
-        application.offer = None
-        existing_reasons = set([r.reason for r in application.rejections])
-        updated_reasons = set(rejection_reasons)
-        intersect_list = (existing_reasons & updated_reasons)
-        to_remove = (existing_reasons ^ intersect_list)
-        to_add = (updated_reasons ^ intersect_list)
-
-        for rejection in application.rejections:
-            if rejection.reason in to_remove:
-                db.session.delete(rejection)
-
-        for rejection_reason in to_add:
-            application.rejections.append(
-                models.Rejection(reason=rejection_reason))
+    offers, rejection_reasons = _evaluate(application.applicant_info,
+                                          application.requested_terms)
 
-    # Save the application data along with any offer or rejections.
-    db.session.add(application)
+    application.status = (models.ApplicationStatus.APPROVED
+                          if offers else models.ApplicationStatus.DECLINED)
+    application.set_offers(offers)
+    application.set_rejection_reasons(rejection_reasons)
+
+    # Dump before committing, which would expire what was just loaded.
+    data = serializers.dump_application(application)
     db.session.commit()
 
-    return jsonify(schemas.application_schema.dump(application)), 200
+    return serializers.jsonify(data), 200
 
 
 @blueprint.route('/users/<uuid:user_id>/applications/<uuid:application_id>',
                  methods=['GET'])
 def get_application(user_id, application_id):
-    user = models.User.query.get(user_id)
-    if user is None:
-        return make_404('the requested application was not found.')
-
-    application = models.Application.query.get(application_id)
+    application = queries.get_user_application(user_id, application_id)
     if application is None:
         return make_404('the requested application was not found.')
 
-    if user.id != application.user_id:
-        return make_404('the requested application was not found.')
-
-    return jsonify(schemas.application_schema.dump(application))
+    return serializers.jsonify(serializers.dump_application(application))
 
 
 @blueprint.route('/users/<uuid:user_id>/applications/<uuid:application_id>',
                  methods=['DELETE'])
 def delete_application(user_id, application_id):
-    user = models.User.query.get(user_id)
-    if user is None:
-        return make_404('the requested application was not found.')
-
-    application = models.Application.query.get(application_id)
-    if application is None:
-        return make_404('the requested application was not found.')
-
-    if user.id != application.user_id:
+    if not queries.delete_user_application(user_id, application_id):
         return make_404('the requested application was not found.')
-
-    db.session.delete(application)
     db.session.commit()
 
     return jsonify(), 204
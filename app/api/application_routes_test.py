@@ -1,27 +1,9 @@
 # TODO DO NOT SUBMIT
 from testing import flask_test_base
+from testing.applications import STRONG_APPLICATION, WEAK_APPLICATION
 from app import models
 import json
-
-_STRONG_APPLICATION = {
-    'bankruptcies': 0,
-    'credit_score': 1000,
-    'monthly_debt': 0,
-    'loan_amount': 399,
-    'vehicle_value': 2000,
-    'monthly_income': 4444444,
-    'delinquencies': 0,
-}
-
-_WEAK_APPLICATION = {
-    'bankruptcies': 3,
-    'credit_score': 333,
-    'monthly_debt': 220,
-    'loan_amount': 399,
-    'vehicle_value': 2000,
-    'monthly_income': 4444444,
-    'delinquencies': 33,
-}
+import uuid
 
 
 class ApplicationCreationTests(flask_test_base.FlaskTest):
@@ -30,11 +12,11 @@ class ApplicationCreationTests(flask_test_base.FlaskTest):
         response = self.post('/users', {'name': 'steve'})
         user_id = response.json['id']
         response = self.post('/users/' + user_id + '/applications',
-                             _WEAK_APPLICATION)
+                             WEAK_APPLICATION)
         self.assertEqual(response.status_code, 201)
         self.assertEqual(response.json['status'], 'DECLINED')
 
-        self.assertEqual(response.json['applicant_info'], _WEAK_APPLICATION)
+        self.assertEqual(response.json['applicant_info'], WEAK_APPLICATION)
         self.assertIsNone(response.json['offer'])
         self.assertEqual(response.json['rejections'],
                          [{
@@ -49,7 +31,7 @@ class ApplicationCreationTests(flask_test_base.FlaskTest):
         response = self.post('/users', {'name': 'steve'})
         user_id = response.json['id']
         response = self.post('/users/' + user_id + '/applications',
-                             _STRONG_APPLICATION)
+                             STRONG_APPLICATION)
         self.assertEqual(response.status_code, 201)
         self.assertEqual(response.json['status'], 'APPROVED')
         self.assertIsNotNone(response.json['offer'])
@@ -126,11 +108,11 @@ class ApplicationGetTests(flask_test_base.FlaskTest):
         user_response = self.post('/users', {'name': 'steve'})
         app_response = self.post(
             '/users/' + user_response.json['id'] + '/applications',
-            _WEAK_APPLICATION)
+            WEAK_APPLICATION)
         response = self.get('/users/' + user_response.json['id'] +
                             '/applications/' + app_response.json['id'])
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(response.json['applicant_info'], _WEAK_APPLICATION)
+        self.assertEqual(response.json['applicant_info'], WEAK_APPLICATION)
         self.assertIn('offer', response.json.keys())
         self.assertIn('status', response.json.keys())
         self.assertIn('rejections', response.json.keys())
@@ -139,7 +121,7 @@ class ApplicationGetTests(flask_test_base.FlaskTest):
         user_response = self.post('/users', {'name': 'steve'})
         app_response = self.post(
             '/users/' + user_response.json['id'] + '/applications',
-            _WEAK_APPLICATION)
+            WEAK_APPLICATION)
         response = self.get('/users/' + user_response.json['id'] +
                             '/applications/1234')
         self.assertEqual(response.status_code, 404)
@@ -155,23 +137,74 @@ class ApplicationGetTests(flask_test_base.FlaskTest):
         self.assertEqual(response.status_code, 404)
 
 
+class ApplicationListTests(flask_test_base.FlaskTest):
+
+    def setUp(self):
+        super().setUp()
+        self.user_id = self.post('/users', {'name': 'steve'}).json['id']
+
+    def test_pages_cover_every_application_once(self):
+        submitted = self.post(
+            '/users/' + self.user_id + '/applications:batch',
+            [STRONG_APPLICATION, WEAK_APPLICATION] * 3).json
+        other_user_id = self.post('/users', {'name': 'anna'}).json['id']
+        self.post('/users/' + other_user_id + '/applications',
+                  STRONG_APPLICATION)
+
+        listed = []
+        url = '/users/' + self.user_id + '/applications?limit=4'
+        while url is not None:
+            response = self.get(url)
+            self.assertEqual(response.status_code, 200)
+            listed.extend(response.json['applications'])
+            url = response.json['next']
+        self.assertEqual(len(listed), 6)
+        self.assertEqual(listed,
+                         sorted(submitted, key=lambda app: uuid.UUID(app['id'])))
+        self.assertEqual(
+            self.get('/users/' + self.user_id).json['application_count'], 6)
+
+    def test_last_page_has_no_next_link(self):
+        self.post('/users/' + self.user_id + '/applications',
+                  STRONG_APPLICATION)
+        response = self.get('/users/' + self.user_id + '/applications')
+        self.assertEqual(len(response.json['applications']), 1)
+        self.assertIsNone(response.json['next'])
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.get('/users/' + self.user_id +
+                            '/applications?cursor=bm90LWpzb24')
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(response.json['messages'],
+                         {'cursor': ['Invalid cursor.']})
+
+    def test_limit_is_bounded(self):
+        response = self.get('/users/' + self.user_id +
+                            '/applications?limit=501')
+        self.assertEqual(response.status_code, 422)
+
+    def test_unknown_user(self):
+        response = self.get('/users/' + str(uuid.uuid4()) + '/applications')
+        self.assertEqual(response.status_code, 404)
+
+
 class ApplicationUpdateTests(flask_test_base.FlaskTest):
 
     def test_update_offer(self):
         response = self.post('/users', {'name': 'steve'})
         user_id = response.json['id']
         response = self.post('/users/' + user_id + '/applications',
-                             _WEAK_APPLICATION)
+                             WEAK_APPLICATION)
         self.assertEqual(response.json['status'], 'DECLINED')
         self.assertIsNone(response.json['offer'])
 
         response = self.put(
             '/users/' + user_id + '/applications/' + response.json['id'],
-            _STRONG_APPLICATION)
+            STRONG_APPLICATION)
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.json['status'], 'APPROVED')
 
-        self.assertEqual(response.json['applicant_info'], _STRONG_APPLICATION)
+        self.assertEqual(response.json['applicant_info'], STRONG_APPLICATION)
         self.assertIsNotNone(response.json['offer'])
         self.assertEqual(response.json['rejections'], [])
 
@@ -179,7 +212,7 @@ class ApplicationUpdateTests(flask_test_base.FlaskTest):
         response = self.post('/users', {'name': 'steve'})
         user_id = response.json['id']
         response = self.post('/users/' + user_id + '/applications',
-                             _WEAK_APPLICATION)
+                             WEAK_APPLICATION)
         response = self.put(
             '/users/' + user_id + '/applications/' + response.json['id'], {})
         self.assertEqual(response.status_code, 200)
@@ -188,7 +221,7 @@ class ApplicationUpdateTests(flask_test_base.FlaskTest):
         response = self.post('/users', {'name': 'steve'})
         user_id = response.json['id']
         response = self.post('/users/' + user_id + '/applications',
-                             _WEAK_APPLICATION)
+                             WEAK_APPLICATION)
         response = self.put(
             '/users/' + user_id + '/applications/' + response.json['id'], {
                 'bankruptcies': 0,
@@ -219,7 +252,7 @@ class ApplicationDeleteTests(flask_test_base.FlaskTest):
         response = self.post('/users', {'name': 'steve'})
         user_id = response.json['id']
         response = self.post('/users/' + user_id + '/applications',
-                             _WEAK_APPLICATION)
+                             WEAK_APPLICATION)
         app_id = response.json['id']
         response = self.delete('/users/' + user_id + '/applications/' + app_id)
         self.assertEqual(response.status_code, 204)
@@ -233,12 +266,413 @@ class UserWithApplicationsDeleteTests(flask_test_base.FlaskTest):
         response = self.post('/users', {'name': 'steve'})
         user_id = response.json['id']
         response = self.post('/users/' + user_id + '/applications',
-                             _WEAK_APPLICATION)
+                             WEAK_APPLICATION)
         app_id = response.json['id']
-        response = self.delete('/users/' + user_id)
+        with self.record_statements() as statements:
+            response = self.delete('/users/' + user_id)
         self.assertEqual(response.status_code, 204)
+        self.assertEqual(len(statements), 1)
         user = models.User.query.get(user_id)
         self.assertIsNone(user)
 
         app = models.Application.query.get(app_id)
         self.assertIsNone(app)
+        self.assertEqual(models.ApplicantInfo.query.count(), 0)
+        self.assertEqual(models.Rejection.query.count(), 0)
+
+    def test_unknown_user_delete(self):
+        response = self.delete('/users/' + str(uuid.uuid4()))
+        self.assertEqual(response.status_code, 404)
+
+
+class ApplicationOfferGridTests(flask_test_base.FlaskTest):
+
+    def _submit(self, user_id, data, terms):
+        return self.client.post('/users/' + user_id + '/applications?terms=' +
+                                terms,
+                                headers=self.get_api_headers(),
+                                data=json.dumps(data))
+
+    def test_create_with_offer_grid(self):
+        user_id = self.post('/users', {'name': 'steve'}).json['id']
+        response = self._submit(user_id, STRONG_APPLICATION, '84,36,72,60,48')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json['status'], 'APPROVED')
+        self.assertEqual(
+            [offer['term_length_months'] for offer in response.json['offers']],
+            [36, 48, 60, 72, 84])
+        self.assertEqual(response.json['offer']['term_length_months'], 72)
+
+        response = self.get('/users/' + user_id + '/applications/' +
+                            response.json['id'])
+        self.assertEqual(len(response.json['offers']), 5)
+
+    def test_default_is_a_single_offer(self):
+        user_id = self.post('/users', {'name': 'steve'}).json['id']
+        response = self.post('/users/' + user_id + '/applications',
+                             STRONG_APPLICATION)
+        self.assertEqual(response.json['offers'], [response.json['offer']])
+
+    def test_only_affordable_terms_are_offered(self):
+        user_id = self.post('/users', {'name': 'steve'}).json['id']
+        application = dict(STRONG_APPLICATION,
+                           monthly_income=1000,
+                           loan_amount=30000,
+                           vehicle_value=30000)
+        response = self._submit(user_id, application, '36,84')
+        self.assertEqual(response.json['status'], 'APPROVED')
+        self.assertEqual(
+            [offer['term_length_months'] for offer in response.json['offers']],
+            [84])
+        self.assertEqual(response.json['offer']['term_length_months'], 84)
+
+    def test_update_replaces_offer_grid(self):
+        user_id = self.post('/users', {'name': 'steve'}).json['id']
+        app_id = self._submit(user_id, STRONG_APPLICATION,
+                              '36,72').json['id']
+        response = self.client.put('/users/' + user_id + '/applications/' +
+                                   app_id + '?terms=72,84',
+                                   headers=self.get_api_headers(),
+                                   data=json.dumps({'loan_amount': 500}))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [offer['term_length_months'] for offer in response.json['offers']],
+            [72, 84])
+        self.assertEqual(models.Offer.query.count(), 2)
+
+        response = self.put('/users/' + user_id + '/applications/' + app_id,
+                            WEAK_APPLICATION)
+        self.assertEqual(response.json['offers'], [])
+        self.assertEqual(models.Offer.query.count(), 0)
+
+    def test_update_without_terms_reprices_requested_terms(self):
+        user_id = self.post('/users', {'name': 'steve'}).json['id']
+        app_id = self._submit(user_id, STRONG_APPLICATION,
+                              '36,60').json['id']
+        app_url = '/users/' + user_id + '/applications/' + app_id
+        response = self.put(app_url, {'loan_amount': 500})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [offer['term_length_months'] for offer in response.json['offers']],
+            [36, 60])
+        expected = self._submit(user_id,
+                                dict(STRONG_APPLICATION, loan_amount=500),
+                                '36,60').json
+        self.assertEqual(response.json['offers'], expected['offers'])
+
+        # The requested terms outlive a decline.
+        self.put(app_url, WEAK_APPLICATION)
+        response = self.put(app_url, STRONG_APPLICATION)
+        self.assertEqual(
+            [offer['term_length_months'] for offer in response.json['offers']],
+            [36, 60])
+
+    def test_update_reprices_unaffordable_requested_terms(self):
+        user_id = self.post('/users', {'name': 'steve'}).json['id']
+        stretched = dict(STRONG_APPLICATION,
+                         monthly_income=1000,
+                         loan_amount=30000,
+                         vehicle_value=30000)
+        declined = self._submit(user_id, stretched, '36').json
+        self.assertEqual(declined['status'], 'DECLINED')
+        response = self.put(
+            '/users/' + user_id + '/applications/' + declined['id'],
+            {'monthly_income': 4444444})
+        self.assertEqual(response.json['status'], 'APPROVED')
+        self.assertEqual(
+            [offer['term_length_months'] for offer in response.json['offers']],
+            [36])
+
+        app_id = self._submit(user_id, stretched, '36,72').json['id']
+        app_url = '/users/' + user_id + '/applications/' + app_id
+        self.assertEqual(
+            [offer['term_length_months']
+             for offer in self.get(app_url).json['offers']], [72])
+        response = self.put(app_url, {'monthly_income': 4444444})
+        self.assertEqual(
+            [offer['term_length_months'] for offer in response.json['offers']],
+            [36, 72])
+
+    def test_invalid_terms_are_rejected(self):
+        user_id = self.post('/users', {'name': 'steve'}).json['id']
+        response = self._submit(user_id, STRONG_APPLICATION, '36,x')
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(response.json['messages'],
+                         {'terms': {
+                             '1': ['Not a valid integer.']
+                         }})
+        self.assertEqual(response.json['data'], {'terms': '36,x'})
+
+
+class MaximumLoanAmountTests(flask_test_base.FlaskTest):
+
+    def _get(self, user_id, params):
+        query = '&'.join('%s=%s' % item for item in params.items())
+        return self.get('/users/' + user_id + '/maximum-loan-amount?' + query)
+
+    def _applicant(self, **overrides):
+        applicant = dict(STRONG_APPLICATION,
+                         monthly_income=1000,
+                         vehicle_value=100000)
+        del applicant['loan_amount']
+        applicant.update(overrides)
+        return applicant
+
+    def test_maximum_amount_is_approvable_and_writes_nothing(self):
+        user_id = self.post('/users', {'name': 'steve'}).json['id']
+        response = self._get(user_id, dict(self._applicant(), terms='36,72'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(models.Application.query.count(), 0)
+
+        offers = response.json['offers']
+        self.assertEqual([offer['term_length_months'] for offer in offers],
+                         [36, 72])
+        self.assertEqual(response.json['maximum_loan_amount'],
+                         offers[1]['loan_amount'])
+        self.assertEqual(response.json['rejections'], [])
+
+        for offer in offers:
+            for loan_amount, status in ((offer['loan_amount'], 'APPROVED'),
+                                        (offer['loan_amount'] + 0.01,
+                                         'DECLINED')):
+                response = self.client.post(
+                    '/users/' + user_id + '/applications?terms=%d' %
+                    offer['term_length_months'],
+                    headers=self.get_api_headers(),
+                    data=json.dumps(
+                        dict(self._applicant(), loan_amount=loan_amount)))
+                self.assertEqual(response.json['status'], status)
+
+    def test_vehicle_value_caps_amount(self):
+        user_id = self.post('/users', {'name': 'steve'}).json['id']
+        response = self._get(user_id, self._applicant(vehicle_value=5000.25))
+        self.assertEqual(response.json['maximum_loan_amount'], 5000.25)
+        self.assertEqual(response.json['offers'][0]['term_length_months'], 72)
+
+    def test_ineligible_applicant_has_no_amount(self):
+        user_id = self.post('/users', {'name': 'steve'}).json['id']
+        response = self._get(user_id, self._applicant(bankruptcies=2))
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.json['maximum_loan_amount'])
+        self.assertEqual(response.json['offers'], [])
+        self.assertEqual(response.json['rejections'],
+                         [{
+                             'reason': 'EXCESSIVE_BANKRUPTCIES'
+                         }])
+
+    def test_existing_debt_leaves_no_amount(self):
+        user_id = self.post('/users', {'name': 'steve'}).json['id']
+        response = self._get(user_id, self._applicant(monthly_debt=900))
+        self.assertEqual(response.json['rejections'],
+                         [{
+                             'reason': 'EXCESSIVE_DEBT_TO_INCOME_RATIO'
+                         }])
+
+    def test_missing_params_are_rejected(self):
+        user_id = self.post('/users', {'name': 'steve'}).json['id']
+        response = self._get(user_id, {'credit_score': 700})
+        self.assertEqual(response.status_code, 422)
+        self.assertNotIn('loan_amount', response.json['messages'])
+        self.assertIn('monthly_income', response.json['messages'])
+
+    def test_unknown_user(self):
+        response = self._get('00000000-0000-0000-0000-000000000000',
+                             self._applicant())
+        self.assertEqual(response.status_code, 404)
+
+
+class ApplicationBatchTests(flask_test_base.FlaskTest):
+
+    def test_batch_matches_single_submissions(self):
+        user_id = self.post('/users', {'name': 'steve'}).json['id']
+        batch = [STRONG_APPLICATION, WEAK_APPLICATION, STRONG_APPLICATION]
+        response = self.post('/users/' + user_id + '/applications:batch',
+                             batch)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.json), 3)
+        self.assertEqual(models.Application.query.count(), 3)
+
+        for data, result in zip(batch, response.json):
+            single = self.post('/users/' + user_id + '/applications', data)
+            expected = dict(single.json, id=result['id'])
+            self.assertEqual(result, expected)
+            stored = self.get('/users/' + user_id + '/applications/' +
+                              result['id'])
+            self.assertEqual(stored.json, result)
+
+    def test_batch_for_unknown_user(self):
+        response = self.post(
+            '/users/00000000-0000-0000-0000-000000000000/applications:batch',
+            [STRONG_APPLICATION])
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(models.Application.query.count(), 0)
+
+    def test_invalid_item_rejects_the_batch(self):
+        user_id = self.post('/users', {'name': 'steve'}).json['id']
+        response = self.post('/users/' + user_id + '/applications:batch',
+                             [STRONG_APPLICATION, {
+                                 'credit_score': 1000
+                             }])
+        self.assertEqual(response.status_code, 422)
+        self.assertIn('1', response.json['messages'])
+        self.assertEqual(models.Application.query.count(), 0)
+
+    def test_multi_user_batch(self):
+        first_id = self.post('/users', {'name': 'steve'}).json['id']
+        second_id = self.post('/users', {'name': 'jake'}).json['id']
+        unknown_id = '00000000-0000-0000-0000-000000000000'
+        response = self.post('/applications:batch', [
+            dict(STRONG_APPLICATION, user_id=first_id),
+            dict(WEAK_APPLICATION, user_id=unknown_id),
+            dict(WEAK_APPLICATION, user_id=second_id),
+        ])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json[0]['status'], 'APPROVED')
+        self.assertEqual(response.json[1],
+                         {'error': 'the requested user was not found.'})
+        self.assertEqual(response.json[2]['status'], 'DECLINED')
+
+        response = self.get('/users/' + second_id)
+        self.assertEqual(response.json['application_count'], 1)
+
+
+class CompactStorageTests(flask_test_base.FlaskTest):
+
+    def _submit(self, user_id, data, terms=None):
+        url = '/users/' + user_id + '/applications'
+        return self.post(url + ('?terms=' + terms if terms else ''), data)
+
+    def _without_id(self, application):
+        return {
+            key: value
+            for key, value in application.items() if key != 'id'
+        }
+
+    def test_responses_match_the_normalized_layout(self):
+        user_id = self.post('/users', {'name': 'steve'}).json['id']
+        submissions = [(STRONG_APPLICATION, None), (WEAK_APPLICATION, None),
+                       (STRONG_APPLICATION, '36,60')]
+        normalized = [
+            self._submit(user_id, data, terms).json
+            for data, terms in submissions
+        ]
+        self.app.config['COMPACT_APPLICATION_STORAGE'] = True
+        compact = [
+            self._submit(user_id, data, terms).json
+            for data, terms in submissions
+        ]
+        self.assertEqual(list(map(self._without_id, compact)),
+                         list(map(self._without_id, normalized)))
+        for application in normalized + compact:
+            response = self.get('/users/' + user_id + '/applications/' +
+                                application['id'])
+            self.assertEqual(response.json, application)
+
+        # Of the compact applications, only the two-term grid has child rows.
+        self.assertEqual(models.ApplicantInfo.query.count(), 3)
+        self.assertEqual(models.Offer.query.count(), 3 + 2)
+        self.assertEqual(models.Rejection.query.count(),
+                         len(normalized[1]['rejections']))
+        stored = models.Application.query.get(compact[1]['id'])
+        self.assertEqual(stored.credit_score, WEAK_APPLICATION['credit_score'])
+        self.assertNotEqual(stored.rejection_mask, 0)
+
+    def test_update_switches_decisions(self):
+        user_id = self.post('/users', {'name': 'steve'}).json['id']
+        app_id = self._submit(user_id, STRONG_APPLICATION).json['id']
+        self.app.config['COMPACT_APPLICATION_STORAGE'] = True
+        url = '/users/' + user_id + '/applications/' + app_id
+
+        # The normalized row keeps its applicant info row; the decision is
+        # rewritten compactly.
+        declined = self.put(url, WEAK_APPLICATION).json
+        self.assertEqual(declined['status'], 'DECLINED')
+        self.assertEqual(declined['offers'], [])
+        self.assertTrue(declined['rejections'])
+        self.assertEqual(self.get(url).json, declined)
+        self.assertEqual(models.Rejection.query.count(), 0)
+        self.assertEqual(models.ApplicantInfo.query.count(), 1)
+
+        approved = self.put(url, STRONG_APPLICATION).json
+        self.assertEqual(approved['status'], 'APPROVED')
+        self.assertEqual(approved['rejections'], [])
+        self.assertEqual(len(approved['offers']), 1)
+        self.assertEqual(self.get(url).json, approved)
+        self.assertEqual(models.Offer.query.count(), 0)
+
+        self.app.config['COMPACT_APPLICATION_STORAGE'] = False
+        self.assertEqual(self.put(url, WEAK_APPLICATION).json, declined)
+        self.assertEqual(models.Rejection.query.count(),
+                         len(declined['rejections']))
+
+    def test_list_and_delete(self):
+        self.app.config['COMPACT_APPLICATION_STORAGE'] = True
+        user_id = self.post('/users', {'name': 'steve'}).json['id']
+        app_id = self._submit(user_id, STRONG_APPLICATION).json['id']
+        response = self.get('/users/' + user_id + '/applications')
+        self.assertEqual(response.json['applications'][0]['applicant_info'],
+                         STRONG_APPLICATION)
+        response = self.delete('/users/' + user_id + '/applications/' +
+                               app_id)
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(models.Application.query.count(), 0)
+
+    def test_batch_writes_application_rows_only(self):
+        self.app.config['COMPACT_APPLICATION_STORAGE'] = True
+        user_id = self.post('/users', {'name': 'steve'}).json['id']
+        response = self.post('/users/' + user_id + '/applications:batch',
+                             [STRONG_APPLICATION, WEAK_APPLICATION])
+        self.assertEqual(response.status_code, 201)
+        for result in response.json:
+            stored = self.get('/users/' + user_id + '/applications/' +
+                              result['id'])
+            self.assertEqual(stored.json, result)
+        self.assertEqual(models.ApplicantInfo.query.count(), 0)
+        self.assertEqual(models.Offer.query.count(), 0)
+        self.assertEqual(models.Rejection.query.count(), 0)
+
+
+class ApplicationQueryCountTests(flask_test_base.FlaskTest):
+
+    def setUp(self):
+        super().setUp()
+        self.user_id = self.post('/users', {'name': 'steve'}).json['id']
+        self.url = '/users/%s/applications/%s' % (
+            self.user_id,
+            self.post('/users/' + self.user_id + '/applications',
+                      WEAK_APPLICATION).json['id'])
+
+    def _selects(self, statements):
+        return [s for s in statements if s.lstrip().startswith('SELECT')]
+
+    def test_get_is_one_query(self):
+        with self.record_statements() as statements:
+            response = self.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json['rejections'])
+        self.assertEqual(len(statements), 1)
+
+    def test_update_reads_once(self):
+        with self.record_statements() as statements:
+            response = self.put(self.url, STRONG_APPLICATION)
+        self.assertEqual(response.json['status'], 'APPROVED')
+        self.assertEqual(len(self._selects(statements)), 1)
+        self.assertEqual(self.get(self.url).json, response.json)
+
+    def test_delete_is_one_statement(self):
+        with self.record_statements() as statements:
+            response = self.delete(self.url)
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(len(statements), 1)
+        self.assertEqual(models.Application.query.count(), 0)
+        self.assertEqual(models.Rejection.query.count(), 0)
+
+    def test_other_users_application_is_not_found(self):
+        other_id = self.post('/users', {'name': 'anna'}).json['id']
+        url = self.url.replace(self.user_id, other_id)
+        with self.record_statements() as statements:
+            self.assertEqual(self.get(url).status_code, 404)
+            self.assertEqual(self.put(url, {}).status_code, 404)
+            self.assertEqual(self.delete(url).status_code, 404)
+        self.assertEqual(len(statements), 3)
+        self.assertEqual(self.get(self.url).status_code, 200)
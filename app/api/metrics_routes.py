@@ -0,0 +1,9 @@
+from flask import jsonify
+from app.api import blueprint
+from engine import decision_cache
+
+
+@blueprint.route('/metrics/decision-cache', methods=['GET'])
+def get_decision_cache_metrics():
+    # Counters are per process; each gunicorn worker reports its own.
+    return jsonify(decision_cache.cache.stats())
@@ -0,0 +1,28 @@
+from testing import flask_test_base
+
+_APPLICATION = {
+    'bankruptcies': 0,
+    'credit_score': 1000,
+    'monthly_debt': 0,
+    'loan_amount': 399,
+    'vehicle_value': 2000,
+    'monthly_income': 4444444,
+    'delinquencies': 0,
+}
+
+
+class DecisionCacheMetricsTests(flask_test_base.FlaskTest):
+
+    def test_repeated_applications_hit_the_cache(self):
+        user_id = self.post('/users', {'name': 'steve'}).json['id']
+        first = self.post('/users/' + user_id + '/applications', _APPLICATION)
+        second = self.post('/users/' + user_id + '/applications',
+                           _APPLICATION)
+        self.assertEqual(first.json['offer'], second.json['offer'])
+        self.assertNotEqual(first.json['id'], second.json['id'])
+
+        response = self.get('/metrics/decision-cache')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json['hits'], 1)
+        self.assertEqual(response.json['misses'], 1)
+        self.assertEqual(response.json['size'], 1)
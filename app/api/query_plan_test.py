@@ -0,0 +1,119 @@
+"""Query plan regressions for the statements the API routes issue.
+
+Seeds enough users and applications that Postgres plans as it would for a
+real table, records every statement each route runs and EXPLAINs it. A
+sequential scan, or a plan costing more than _COST_BUDGET, fails the test.
+"""
+from testing import flask_test_base
+from testing.applications import STRONG_APPLICATION, WEAK_APPLICATION
+from app import bulk, db, schemas
+import random
+
+_USER_COUNT = 2000
+_APPLICATION_COUNT = 20000
+
+# Planner cost units. The route statements plan at under 200 with the seeded
+# volume, while a scan of any seeded table costs thousands.
+_COST_BUDGET = 1000
+
+_EXPORT_TOKEN = 'export-token'
+
+
+def _seed_applicant_infos(count, seed=0):
+    rng = random.Random(seed)
+    return [
+        dict(rng.choice((STRONG_APPLICATION, WEAK_APPLICATION)),
+             credit_score=rng.randint(300, 1000)) for _ in range(count)
+    ]
+
+
+def _plan_nodes(plan):
+    yield plan
+    for child in plan.get('Plans', []):
+        yield from _plan_nodes(child)
+
+
+class QueryPlanTests(flask_test_base.FlaskTest):
+
+    def get_api_headers(self):
+        return dict(super().get_api_headers(),
+                    Authorization='Bearer ' + _EXPORT_TOKEN)
+
+    def setUp(self):
+        super().setUp()
+        self.app.config['EXPORT_API_ENABLED'] = True
+        self.app.config['EXPORT_API_TOKEN'] = _EXPORT_TOKEN
+        users = bulk.insert_users(
+            ['user %d' % i for i in range(_USER_COUNT)])
+        rng = random.Random(0)
+        bulk.score_and_insert_applications(
+            [rng.choice(users).id for _ in range(_APPLICATION_COUNT)],
+            _seed_applicant_infos(_APPLICATION_COUNT))
+        db.session.commit()
+        db.session.execute('ANALYZE')
+        db.session.commit()
+        self.user_id = str(users[0].id)
+
+    def _assert_plans_are_cheap(self, executed):
+        self.assertTrue(executed)
+        for statement, parameters in executed:
+            if not statement.lstrip().startswith(
+                ('SELECT', 'UPDATE', 'DELETE', 'INSERT')):
+                continue
+            plan = db.session.connection().exec_driver_sql(
+                'EXPLAIN (FORMAT JSON) ' + statement,
+                parameters).scalar()[0]['Plan']
+            with self.subTest(statement=statement):
+                self.assertNotIn(
+                    'Seq Scan',
+                    [node['Node Type'] for node in _plan_nodes(plan)])
+                self.assertLessEqual(plan['Total Cost'], _COST_BUDGET)
+        db.session.rollback()
+
+    def test_route_queries_use_indexes(self):
+        user_url = '/users/' + self.user_id
+        application_id = self.post(user_url + '/applications',
+                                   WEAK_APPLICATION).json['id']
+        application_url = user_url + '/applications/' + application_id
+        second_page_url = self.get(user_url +
+                                   '/applications?limit=2').json['next']
+        requests = [
+            ('GET', user_url, None),
+            ('PUT', user_url, {'name': 'steve'}),
+            ('POST', user_url + '/applications', STRONG_APPLICATION),
+            ('POST', user_url + '/applications:batch',
+             [STRONG_APPLICATION, WEAK_APPLICATION]),
+            ('POST', '/applications:batch', [
+                dict(STRONG_APPLICATION, user_id=self.user_id),
+                dict(WEAK_APPLICATION, user_id=self.user_id)
+            ]),
+            ('GET', user_url + '/applications', None),
+            ('GET', second_page_url, None),
+            # Resumed from the application made above, so only those newer
+            # than it are exported.
+            ('GET', '/applications:export?cursor=' +
+             schemas.encode_cursor({'id': application_id}), None),
+            ('GET', user_url + '/maximum-loan-amount?' + '&'.join(
+                '%s=%s' % item for item in STRONG_APPLICATION.items()
+                if item[0] != 'loan_amount'), None),
+            ('GET', application_url, None),
+            ('PUT', application_url, STRONG_APPLICATION),
+            ('PUT', application_url, WEAK_APPLICATION),
+            ('DELETE', application_url, None),
+            ('DELETE', user_url, None),
+        ]
+        for method, url, data in requests:
+            with self.subTest(method=method, url=url):
+                with self.record_statements(parameters=True) as executed:
+                    if method == 'GET':
+                        response = self.get(url)
+                    elif method == 'POST':
+                        response = self.post(url, data)
+                    elif method == 'PUT':
+                        response = self.put(url, data)
+                    else:
+                        response = self.delete(url)
+                    # Streamed responses run their queries as they are read.
+                    response.get_data()
+                self.assertLess(response.status_code, 300, response.data)
+                self._assert_plans_are_cheap(executed)
@@ -1,13 +1,17 @@
 from flask import request, jsonify
 from webargs.flaskparser import use_args
 from marshmallow import Schema, fields
-from app import models, schemas, db
+from app import bulk, models, schemas, serializers, db
 from app.api import blueprint
 from engine import application_processor as ap
 
 from flask import make_response, jsonify
 
 
+# The most users accepted by one batch request.
+MAXIMUM_BATCH_SIZE = 10000
+
+
 def make_404(message):
     return make_response(jsonify(message), 404)
 
@@ -18,7 +22,19 @@ def add_user(args):
     user = models.User(name=args['name'])
     db.session.add(user)
     db.session.commit()
-    return jsonify(schemas.user_schema.dump(user)), 201
+    return serializers.jsonify(serializers.dump_user(user)), 201
+
+
+@blueprint.route('/users:batch', methods=['POST'])
+@use_args(schemas.user_create_requests_schema)
+def add_users(args):
+    if len(args) > MAXIMUM_BATCH_SIZE:
+        return make_response(
+            jsonify('at most %d users may be created at once.' %
+                    MAXIMUM_BATCH_SIZE), 413)
+    users = bulk.insert_users([user_args['name'] for user_args in args])
+    db.session.commit()
+    return serializers.jsonify(serializers.dump_users(users)), 201
 
 
 @blueprint.route('/users/<uuid:user_id>', methods=['GET'])
@@ -26,7 +42,7 @@ def get_user(user_id):
     user = models.User.query.get(user_id)
     if user is None:
         return make_404('the requested user was not found.')
-    return jsonify(schemas.user_schema.dump(user))
+    return serializers.jsonify(serializers.dump_user(user))
 
 
 @blueprint.route('/users/<uuid:user_id>', methods=['PUT'])
@@ -40,15 +56,15 @@ def update_user(args, user_id):
         setattr(user, key, val)
     db.session.add(user)
     db.session.commit()
-    return jsonify(schemas.user_schema.dump(user))
+    return serializers.jsonify(serializers.dump_user(user))
 
 
 @blueprint.route('/users/<uuid:user_id>', methods=['DELETE'])
 def delete_user(user_id):
-    user = models.User.query.get(user_id)
-    if user is None:
+    # The database cascades the delete to the user's applications.
+    deleted = models.User.query.filter_by(id=user_id).delete(
+        synchronize_session=False)
+    if not deleted:
         return make_404('the requested user was not found.')
-
-    db.session.delete(user)
     db.session.commit()
     return jsonify(), 204
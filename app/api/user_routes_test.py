@@ -1,6 +1,10 @@
 # TODO DO NOT SUBMIT
 from testing import flask_test_base
+from app import models
+import csv
 import json
+import os
+import tempfile
 
 
 class UserCreationTests(flask_test_base.FlaskTest):
@@ -8,7 +12,7 @@ class UserCreationTests(flask_test_base.FlaskTest):
     def test_create_user(self):
         response = self.post('/users', {'name': 'steve'})
         self.assertEqual(response.status_code, 201)
-        self.assertEqual(response.json['applications'], [])
+        self.assertEqual(response.json['application_count'], 0)
         self.assertEqual(response.json['name'], 'steve')
 
     def test_create_user_empty_name_is_rejected(self):
@@ -42,13 +46,88 @@ class UserCreationTests(flask_test_base.FlaskTest):
             })
 
 
+class UserBatchCreationTests(flask_test_base.FlaskTest):
+
+    def test_create_users_in_one_request(self):
+        response = self.post('/users:batch', [{'name': 'steve'},
+                                              {'name': 'anna, "a."'}])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([user['name'] for user in response.json],
+                         ['steve', 'anna, "a."'])
+        for user in response.json:
+            self.assertEqual(user['application_count'], 0)
+            self.assertEqual(self.get('/users/' + user['id']).json, user)
+
+    def test_one_invalid_user_rejects_the_batch(self):
+        response = self.post('/users:batch', [{'name': 'steve'},
+                                              {'name': ''}])
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(response.json['messages'],
+                         {'1': {'name': ["Shorter than minimum length 1."]}})
+        self.assertEqual(models.User.query.count(), 0)
+
+    def test_oversized_batch_is_rejected(self):
+        response = self.post('/users:batch', [{'name': 'steve'}] * 10001)
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(models.User.query.count(), 0)
+
+
+class UserImportCommandTests(flask_test_base.FlaskTest):
+
+    def setUp(self):
+        super().setUp()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.input_path = os.path.join(self.temp_dir.name, 'users.csv')
+        self.mapping_path = os.path.join(self.temp_dir.name, 'mapping.csv')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+        super().tearDown()
+
+    def test_import_writes_id_mapping(self):
+        with open(self.input_path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['external_id', 'name'])
+            writer.writerows([['a1', 'steve'], ['a2', ''],
+                              ['a3', 'anna\nsmith'], ['a4', 'bo'],
+                              ['a,5', 'tab\there \\ back']])
+        result = self.app.test_cli_runner().invoke(args=[
+            'import-users', self.input_path, self.mapping_path,
+            '--batch-size', '2'
+        ])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn('Imported 4 users; skipped 1 rows', result.output)
+
+        with open(self.mapping_path, newline='') as f:
+            mapping = list(csv.DictReader(f))
+        self.assertEqual([(row['row'], row['external_id']) for row in mapping],
+                         [('0', 'a1'), ('2', 'a3'), ('3', 'a4'),
+                          ('4', 'a,5')])
+        names = [self.get('/users/' + row['id']).json['name']
+                 for row in mapping]
+        self.assertEqual(names,
+                         ['steve', 'anna\nsmith', 'bo', 'tab\there \\ back'])
+
+    def test_import_without_name_column_fails(self):
+        with open(self.input_path, 'w', newline='') as f:
+            f.write('external_id,full_name\na1,steve\n')
+        result = self.app.test_cli_runner().invoke(
+            args=['import-users', self.input_path, self.mapping_path])
+        self.assertEqual(result.exit_code, 1)
+        self.assertIn('no name column', result.output)
+        self.assertEqual(models.User.query.count(), 0)
+
+
 class UserGetTests(flask_test_base.FlaskTest):
 
     def test_get_valid_user(self):
         response = self.post('/users', {'name': 'steve'})
-        response = self.get('/users/' + response.json['id'])
+        user_id = response.json['id']
+        response = self.get('/users/' + user_id)
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(response.json['applications'], [])
+        self.assertEqual(response.json['application_count'], 0)
+        self.assertEqual(response.json['applications_url'],
+                         '/users/' + user_id + '/applications')
         self.assertEqual(response.json['name'], 'steve')
 
     def test_get_invalid_user(self):
@@ -70,7 +149,7 @@ class UserUpdateTests(flask_test_base.FlaskTest):
                             {'name': 'jimbob'})
 
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(response.json['applications'], [])
+        self.assertEqual(response.json['application_count'], 0)
         self.assertEqual(response.json['name'], 'jimbob')
 
     def test_valid_empty_user_update(self):
@@ -78,7 +157,7 @@ class UserUpdateTests(flask_test_base.FlaskTest):
         response = self.put('/users/' + response.json['id'], {})
 
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(response.json['applications'], [])
+        self.assertEqual(response.json['application_count'], 0)
         self.assertEqual(response.json['name'], 'steve')
 
     def test_valid_user_invalid_update(self):
@@ -0,0 +1,268 @@
+"""Set-based persistence for loading many rows at once.
+
+The per-request routes build an ORM object graph per row. Here whole batches
+are written with one multi-row INSERT, or a Postgres COPY, per table, inside
+the caller's transaction.
+"""
+from collections import namedtuple
+from concurrent import futures
+from app import db, ids, models
+from engine import application_processor as ap
+from engine import policy as lending_policy
+import csv
+import io
+import itertools
+
+# Lightweight stand-ins with the attributes schemas.ApplicationSchema reads,
+# so bulk results serialize exactly like a single submitted application.
+ApplicationView = namedtuple(
+    'ApplicationView',
+    ['id', 'status', 'applicant_info', 'offer', 'offers', 'rejections'])
+ApplicantInfoView = namedtuple('ApplicantInfoView', ap.APPLICANT_FIELDS)
+RejectionView = namedtuple('RejectionView', ['reason'])
+UserView = namedtuple('UserView', ['id', 'name', 'application_count'])
+
+
+def copy_rows(table, columns, rows):
+    """Loads tuples of column values into table in the current transaction.
+
+    Uses COPY when connected to Postgres through psycopg2 and falls back to a
+    batched executemany otherwise.
+    """
+    connection = db.session.connection()
+    cursor = connection.connection.cursor()
+    if connection.dialect.name != 'postgresql' or not hasattr(
+            cursor, 'copy_expert'):
+        connection.execute(table.insert(),
+                           [dict(zip(columns, row)) for row in rows])
+        return
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    cursor.copy_expert(
+        'COPY %s (%s) FROM STDIN WITH (FORMAT csv)' %
+        (table.name, ', '.join(columns)), buffer)
+
+
+def insert_users(names):
+    """Inserts a user per name in the current transaction.
+
+    Returns a UserView per user, in input order.
+    """
+    users = [
+        UserView(id=ids.time_ordered_uuid(), name=name, application_count=0)
+        for name in names
+    ]
+    copy_rows(models.User.__table__, ('id', 'name'),
+              [(user.id, user.name) for user in users])
+    return users
+
+
+# COPY's text format escapes backslashes and the characters separating rows
+# and columns; any other character in a name is loaded as it is.
+_COPY_TEXT_ESCAPES = str.maketrans({
+    '\\': '\\\\',
+    '\t': '\\t',
+    '\n': '\\n',
+    '\r': '\\r'
+})
+
+# Rows formatted per string handed to COPY, so a batch is sent as it is
+# formatted rather than once all of it is in memory.
+_COPY_CHUNK_ROWS = 5000
+
+
+class _CopyStream:
+    """A file-like object reading (id, name) rows in COPY's text format."""
+
+    def __init__(self, user_ids, names):
+        # Escaping is only needed, one name at a time, when some name has a
+        # character COPY treats specially.
+        joined = ''.join(names)
+        if any(character in joined for character in '\\\t\n\r'):
+            names = [name.translate(_COPY_TEXT_ESCAPES) for name in names]
+        self._chunks = ('\n'.join(
+            map('\t'.join,
+                zip(user_ids[start:start + _COPY_CHUNK_ROWS],
+                    names[start:start + _COPY_CHUNK_ROWS]))) + '\n'
+                        for start in range(0, len(names), _COPY_CHUNK_ROWS))
+
+    def read(self, size=-1):
+        # COPY sends whatever each call returns, however long.
+        return next(self._chunks, '')
+
+
+def _load_users(connection, user_ids, names):
+    with connection.cursor() as cursor:
+        cursor.copy_expert('COPY %s (id, name) FROM STDIN' %
+                           models.User.__tablename__,
+                           _CopyStream(user_ids, names))
+    connection.commit()
+    return len(names)
+
+
+def _accepted_rows(batch, first_row, name_index, external_index):
+    """Returns the row numbers, external ids and names of rows with a name."""
+    names = [
+        values[name_index] if len(values) > name_index else ''
+        for values in batch
+    ]
+    if external_index is None:
+        external_ids = [''] * len(batch)
+    else:
+        external_ids = [
+            values[external_index] if len(values) > external_index else ''
+            for values in batch
+        ]
+    numbers = range(first_row, first_row + len(batch))
+    if all(names):
+        return numbers, external_ids, names
+    return (list(itertools.compress(numbers, names)),
+            list(itertools.compress(external_ids, names)),
+            list(filter(None, names)))
+
+
+def _write_mapping(mapping_file, numbers, external_ids, user_ids):
+    # Formatted directly, as csv.writer would, unless an external id needs
+    # quoting; ids and row numbers never do.
+    joined = ''.join(external_ids)
+    if any(character in joined for character in ',"\r\n'):
+        csv.writer(mapping_file).writerows(
+            zip(numbers, external_ids, user_ids))
+    else:
+        mapping_file.write(''.join(
+            map('%d,%s,%s\r\n'.__mod__, zip(numbers, external_ids,
+                                             user_ids))))
+
+
+def import_users(input_file, mapping_file, batch_size=50000):
+    """Streams users into the database, committing one batch at a time.
+
+    input_file is CSV with a header naming a 'name' column and optionally an
+    'external_id' one; ValueError is raised if there is no 'name' column. A
+    CSV line of row number, external id and generated user id is written to
+    mapping_file for every committed user. Rows without a name are skipped.
+    Returns a tuple of (imported, skipped) counts.
+
+    Batches are loaded over a connection of their own, on a second thread,
+    while the next batch is parsed; the current session is not used.
+    """
+    # Rows are read as lists rather than DictReader's dicts, and ids stay
+    # text throughout: per-row objects would cost more than the COPY.
+    reader = csv.reader(input_file)
+    header = next(reader, [])
+    if 'name' not in header:
+        raise ValueError('the input has no name column.')
+    name_index = header.index('name')
+    external_index = (header.index('external_id')
+                      if 'external_id' in header else None)
+    csv.writer(mapping_file).writerow(('row', 'external_id', 'id'))
+    imported = skipped = 0
+    connection = db.engine.raw_connection()
+    try:
+        with futures.ThreadPoolExecutor(max_workers=1) as loader:
+            loading = mapping_rows = None
+            for first_row in itertools.count(0, batch_size):
+                batch = list(itertools.islice(reader, batch_size))
+                if batch:
+                    numbers, external_ids, names = _accepted_rows(
+                        batch, first_row, name_index, external_index)
+                    skipped += len(batch) - len(names)
+                    user_ids = ids.time_ordered_uuid_texts(len(names))
+                # One batch loads at a time, and only once the one before it
+                # has committed, so the mapping lists exactly the users that
+                # were committed whichever batch fails.
+                if loading is not None:
+                    imported += loading.result()
+                    _write_mapping(mapping_file, *mapping_rows)
+                if not batch:
+                    break
+                loading = loader.submit(_load_users, connection, user_ids,
+                                        names)
+                mapping_rows = numbers, external_ids, user_ids
+    finally:
+        connection.close()
+    return imported, skipped
+
+
+def score_and_insert_applications(user_ids, applicant_infos):
+    """Scores and inserts one application per (user_id, applicant_info) pair.
+
+    applicant_infos are dicts of the seven applicant fields. Rows are added,
+    in the layout models.compact_storage selects, to the current session's
+    transaction; the caller commits. Returns an
+    ApplicationView per application, in input order.
+    """
+    if not applicant_infos:
+        return []
+    columns = {
+        field: [info[field] for info in applicant_infos]
+        for field in ap.APPLICANT_FIELDS
+    }
+    policy = lending_policy.current()
+    decisions = ap.process_applications_batch(
+        *(columns[field] for field in ap.APPLICANT_FIELDS), policy=policy)
+
+    compact = models.compact_storage()
+    application_rows, applicant_info_rows = [], []
+    offer_rows, rejection_rows = [], []
+    views = []
+    for user_id, info, rejection_mask, apr, monthly_payment in zip(
+            user_ids, applicant_infos, decisions.rejection_mask.tolist(),
+            decisions.apr.tolist(), decisions.monthly_payment.tolist()):
+        application_id = ids.time_ordered_uuid()
+        application_row = {'id': application_id, 'user_id': user_id}
+        offers, rejections = [], []
+        if rejection_mask == 0:
+            status = models.ApplicationStatus.APPROVED
+            offers.append(
+                ap.OfferTerms(apr=apr,
+                              monthly_payment=monthly_payment,
+                              term_length_months=policy.loan_length_in_months))
+        else:
+            status = models.ApplicationStatus.DECLINED
+            rejections = [
+                RejectionView(reason)
+                for reason in ap.reasons_from_mask(rejection_mask)
+            ]
+        application_row['status'] = status
+
+        if compact:
+            offer = offers[0] if offers else ap.OfferTerms(None, None, None)
+            application_row.update(info,
+                                   offer_apr=offer.apr,
+                                   offer_monthly_payment=offer.monthly_payment,
+                                   offer_term_length_months=(
+                                       offer.term_length_months),
+                                   rejection_mask=rejection_mask)
+        else:
+            applicant_info_rows.append(
+                dict(info,
+                     id=ids.time_ordered_uuid(),
+                     application_id=application_id))
+            offer_rows.extend(
+                dict(offer._asdict(),
+                     id=ids.time_ordered_uuid(),
+                     application_id=application_id) for offer in offers)
+            rejection_rows.extend({
+                'id': ids.time_ordered_uuid(),
+                'application_id': application_id,
+                'reason': rejection.reason,
+            } for rejection in rejections)
+        application_rows.append(application_row)
+        views.append(
+            ApplicationView(id=application_id,
+                            status=status,
+                            applicant_info=ApplicantInfoView(**info),
+                            offer=offers[0] if offers else None,
+                            offers=offers,
+                            rejections=rejections))
+
+    # Parents first, so that every foreign key already exists.
+    for model, rows in ((models.Application, application_rows),
+                        (models.ApplicantInfo, applicant_info_rows),
+                        (models.Offer, offer_rows),
+                        (models.Rejection, rejection_rows)):
+        if rows:
+            db.session.execute(model.__table__.insert(), rows)
+    return views
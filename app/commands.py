@@ -0,0 +1,290 @@
+"""Contains Flask CLI commands for the API.
+
+Commands are registered on the app in create_app and run with `flask <name>`.
+"""
+from app import (bulk, db, history_export, history_import, models, partitions,
+                 retention, schemas)
+from engine import applicant_stream, backtest, bulk_scoring, columnar_store
+from flask import current_app
+from flask.cli import with_appcontext
+from marshmallow import ValidationError
+import click
+import gzip
+import json
+import os
+
+
+@click.command('score-file')
+@click.argument('input_path', type=click.Path(exists=True, dir_okay=False))
+@click.argument('output_dir', type=click.Path(file_okay=False))
+@click.option('--format',
+              'input_format',
+              type=click.Choice(bulk_scoring.FORMATS),
+              default='jsonl',
+              show_default=True)
+@click.option('--chunk-size', type=click.IntRange(min=1), default=100000,
+              show_default=True)
+@click.option('--workers', type=click.IntRange(min=1), default=None,
+              help='Worker processes. Defaults to the number of CPUs.')
+def score_file(input_path, output_dir, input_format, chunk_size, workers):
+    """Scores applicant records from INPUT_PATH into OUTPUT_DIR.
+
+    Decisions are written as JSONL part files, one per chunk. Re-running the
+    command with the same arguments resumes from the first missing part.
+    """
+    try:
+        totals = bulk_scoring.score_file(input_path,
+                                         output_dir,
+                                         input_format=input_format,
+                                         chunk_size=chunk_size,
+                                         workers=workers)
+    except bulk_scoring.ScoringError as err:
+        raise click.ClickException(str(err))
+    click.echo(
+        'Scored {rows} rows in {chunks} chunks ({skipped_chunks} already done): '
+        '{approved} approved, {invalid} invalid.'.format(**totals))
+
+
+@click.command('export-applicants')
+@click.argument('path', type=click.Path(dir_okay=False))
+@click.option('--append',
+              'append_new',
+              is_flag=True,
+              help='Only add applications missing from an existing store.')
+@click.option('--chunk-size', type=click.IntRange(min=1), default=100000,
+              show_default=True)
+@with_appcontext
+def export_applicants(path, append_new, chunk_size):
+    """Exports applicant info into a memory-mapped column store at PATH."""
+    try:
+        written = columnar_store.export_applicant_info(path,
+                                                       append_new=append_new,
+                                                       chunk_size=chunk_size)
+    except columnar_store.StoreError as err:
+        raise click.ClickException(str(err))
+    _, row_count = columnar_store.read_header(path)
+    click.echo('Wrote %d rows; the store now holds %d rows.' %
+               (written, row_count))
+
+
+@click.command('backtest')
+@click.argument('candidate_paths',
+                nargs=-1,
+                required=True,
+                type=click.Path(exists=True, dir_okay=False))
+@click.option('--store',
+              'store_path',
+              type=click.Path(exists=True, dir_okay=False),
+              help='Replay a column store instead of the database.')
+@click.option('--chunk-size', type=click.IntRange(min=1), default=100000,
+              show_default=True)
+@with_appcontext
+def backtest_policies(candidate_paths, store_path, chunk_size):
+    """Replays stored applications under candidate constants files.
+
+    Each CANDIDATE_PATH is laid out like constants/constants.py. Prints a JSON
+    report comparing each candidate against the active constants.
+    """
+    candidates = {
+        os.path.splitext(os.path.basename(path))[0]:
+        backtest.load_constants_file(path)
+        for path in candidate_paths
+    }
+    if store_path:
+        chunks = columnar_store.iter_chunks(store_path, chunk_size)
+    else:
+        chunks = applicant_stream.iter_applicant_chunks(chunk_size)
+    click.echo(json.dumps(backtest.run(candidates, chunks), indent=2))
+
+
+@click.command('import-users')
+@click.argument('input_file', type=click.File('r'))
+@click.argument('mapping_file', type=click.File('w'))
+@click.option('--batch-size', type=click.IntRange(min=1), default=50000,
+              show_default=True)
+@with_appcontext
+def import_users(input_file, mapping_file, batch_size):
+    """Creates users from a CSV file with a `name` column.
+
+    An optional `external_id` column is carried into MAPPING_FILE, which
+    lists the generated id of every imported user.
+    """
+    try:
+        imported, skipped = bulk.import_users(input_file,
+                                              mapping_file,
+                                              batch_size=batch_size)
+    except ValueError as err:
+        raise click.ClickException(str(err))
+    click.echo('Imported %d users; skipped %d rows without a name.' %
+               (imported, skipped))
+
+
+@click.command('import-applications')
+@click.argument('input_path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--rescore', is_flag=True,
+              help='Recompute decisions with the current policy.')
+@click.option('--chunk-size', type=click.IntRange(min=1), default=50000,
+              show_default=True)
+@click.option('--rejects', 'rejects_file', type=click.File('w'), default=None,
+              help='Where to write the line numbers of rejected records.')
+@with_appcontext
+def import_applications(input_path, rescore, chunk_size, rejects_file):
+    """Imports applications with their decisions from an NDJSON file.
+
+    INPUT_PATH may be gzip-compressed. Prints a JSON report of imported and
+    rejected counts and throughput.
+    """
+    opener = gzip.open if input_path.endswith('.gz') else open
+    with opener(input_path, 'rt') as lines:
+        report = history_import.import_applications(lines,
+                                                    rescore=rescore,
+                                                    chunk_size=chunk_size,
+                                                    rejects_file=rejects_file)
+    click.echo(json.dumps(report, indent=2))
+
+
+def _write_progress(path, progress):
+    temporary_path = path + '.tmp'
+    with open(temporary_path, 'w') as f:
+        json.dump(progress, f)
+    os.replace(temporary_path, path)
+
+
+@click.command('export-applications')
+@click.argument('output_path', type=click.Path(dir_okay=False))
+@click.option('--status', default=None)
+@click.option('--min-id', default=None)
+@click.option('--max-id', default=None)
+@click.option('--cursor', default=None,
+              help='Start after the record carrying this cursor.')
+@click.option('--resume', is_flag=True,
+              help='Continue an interrupted export into OUTPUT_PATH.')
+@with_appcontext
+def export_applications(output_path, status, min_id, max_id, cursor, resume):
+    """Exports applications with their decisions to an NDJSON file.
+
+    OUTPUT_PATH is gzip-compressed when it ends in .gz. Progress is recorded
+    in OUTPUT_PATH.progress after every batch, so --resume can pick up where
+    an interrupted export stopped.
+    """
+    filters = {
+        key: value
+        for key, value in (('status', status), ('min_id', min_id),
+                           ('max_id', max_id), ('cursor', cursor))
+        if value is not None
+    }
+    progress_path = output_path + '.progress'
+    progress = {'filters': filters, 'bytes': 0, 'cursor': cursor}
+    if resume and os.path.exists(progress_path):
+        with open(progress_path) as f:
+            progress = json.load(f)
+        if progress['filters'] != filters:
+            raise click.ClickException(
+                '%s was written with different filters: %s' %
+                (output_path, progress['filters']))
+    try:
+        args = schemas.application_export_request_schema.load(
+            dict(filters, cursor=progress['cursor'])
+            if progress['cursor'] else filters)
+    except ValidationError as err:
+        raise click.ClickException(json.dumps(err.messages))
+
+    batches = history_export.iter_record_batches(
+        status=models.ApplicationStatus[args['status']]
+        if 'status' in args else None,
+        min_id=args.get('min_id'),
+        max_id=args.get('max_id'),
+        after=args['cursor']['id'] if 'cursor' in args else None)
+    exported = 0
+    with open(output_path, 'r+b' if progress['bytes'] else 'wb') as output:
+        output.truncate(progress['bytes'])
+        output.seek(progress['bytes'])
+        for batch in batches:
+            # Each batch is a complete gzip member, so the file stays valid
+            # at every checkpoint.
+            output.write(b''.join(
+                history_export.iter_ndjson([batch],
+                                           compress=output_path.endswith(
+                                               '.gz'))))
+            output.flush()
+            exported += len(batch)
+            progress.update(bytes=output.tell(), cursor=batch[-1]['cursor'])
+            _write_progress(progress_path, progress)
+    click.echo('Exported %d applications to %s.' % (exported, output_path))
+
+
+def _retention_days(retention_days):
+    if retention_days is None:
+        retention_days = current_app.config['APPLICATION_RETENTION_DAYS']
+    if retention_days is None:
+        raise click.ClickException(
+            'No retention period; set APPLICATION_RETENTION_DAYS or pass '
+            '--retention-days.')
+    return retention_days
+
+
+@click.command('purge-expired')
+@click.option('--retention-days', type=click.IntRange(min=1), default=None,
+              help='Defaults to the APPLICATION_RETENTION_DAYS setting.')
+@click.option('--batch-size', type=click.IntRange(min=1), default=1000,
+              show_default=True)
+@click.option('--pause', type=click.FloatRange(min=0), default=0.1,
+              show_default=True, help='Seconds to wait between batches.')
+@with_appcontext
+def purge_expired(retention_days, batch_size, pause):
+    """Deletes applications older than the retention period.
+
+    Prints a JSON report of the applications purged and throughput.
+    """
+    retention_days = _retention_days(retention_days)
+    report = retention.purge_expired(retention.cutoff(retention_days),
+                                     batch_size=batch_size,
+                                     pause=pause)
+    click.echo(json.dumps(report, indent=2))
+
+
+@click.group('partitions')
+def manage_partitions():
+    """Manages the monthly partitions of the application tables."""
+
+
+def _partitioned_connection():
+    connection = db.session.connection()
+    if not partitions.is_partitioned(connection):
+        raise click.ClickException(
+            'The application tables are not partitioned; see '
+            'PARTITION_APPLICATIONS.')
+    return connection
+
+
+@manage_partitions.command('create')
+@click.option('--months-ahead', type=click.IntRange(min=0), default=3,
+              show_default=True)
+@with_appcontext
+def create_partitions(months_ahead):
+    """Creates partitions for this month and the months ahead.
+
+    Run it at least monthly, so that new applications never land in the
+    default partitions.
+    """
+    created = partitions.create_partitions(_partitioned_connection(),
+                                             months_ahead=months_ahead)
+    db.session.commit()
+    click.echo('Created partitions for %d months: %s' %
+               (len(created), ', '.join(
+                   month.strftime('%Y-%m') for month in created)))
+
+
+@manage_partitions.command('drop-expired')
+@click.option('--retention-days', type=click.IntRange(min=1), default=None,
+              help='Defaults to the APPLICATION_RETENTION_DAYS setting.')
+@with_appcontext
+def drop_expired_partitions(retention_days):
+    """Drops the partitions of months older than the retention period."""
+    expired_before = retention.cutoff(_retention_days(retention_days))
+    dropped = partitions.drop_expired(_partitioned_connection(),
+                                        expired_before)
+    db.session.commit()
+    click.echo('Dropped partitions for %d months: %s' %
+               (len(dropped), ', '.join(
+                   month.strftime('%Y-%m') for month in dropped)))
@@ -0,0 +1,209 @@
+"""Streaming NDJSON export of applications with their decisions.
+
+Each line is an application in the shape the API returns, plus its `user_id`,
+its `created_at` time and a `cursor` from which an interrupted export can be
+resumed. Files written here can be loaded back with history_import.
+
+Applications joined to applicant_info, offers and rejections are read as
+three server-side cursors, all ordered by application id, and merged here, so
+memory stays constant however many applications are exported. Compactly
+stored applications need only the first. The cursors share one REPEATABLE
+READ, read-only transaction on a connection of their own, so they all see the
+same snapshot even while applications are written during the export.
+"""
+from app import db, models, schemas
+from constants import constants
+from engine import application_processor as ap
+import itertools
+import json
+import sqlalchemy as sa
+import zlib
+
+# Applications read from each server-side cursor per round trip, and the
+# number of records per yielded batch.
+BATCH_SIZE = 1000
+
+_INTEGER_FIELDS = frozenset(('credit_score', 'bankruptcies', 'delinquencies'))
+
+
+def _id_filters(column, min_id=None, max_id=None, after=None):
+    clauses = []
+    if min_id is not None:
+        clauses.append(column >= min_id)
+    if max_id is not None:
+        clauses.append(column <= max_id)
+    if after is not None:
+        clauses.append(column > after)
+    return clauses
+
+
+def _filters(application, status=None, min_id=None, max_id=None, after=None):
+    clauses = []
+    if status is not None:
+        clauses.append(application.c.status == status)
+    return clauses + _id_filters(application.c.id, min_id, max_id, after)
+
+
+def _stream(connection, statement):
+    """Yields the rows of statement from a server-side cursor."""
+    result = connection.execute(
+        statement.execution_options(stream_results=True,
+                                    max_row_buffer=BATCH_SIZE))
+    for rows in result.partitions(BATCH_SIZE):
+        yield from rows
+
+
+def _children(rows):
+    """Groups rows whose first column is an application id, in order."""
+    return itertools.groupby(rows, key=lambda row: row[0])
+
+
+def _take(groups, application_id, pending):
+    """Returns the child rows of application_id from ordered groups.
+
+    pending is a one-item list holding the group read ahead last time.
+    """
+    while True:
+        if pending[0] is None:
+            pending[0] = next(groups, (None, None))
+        group_id, rows = pending[0]
+        if group_id is None or group_id > application_id:
+            return []
+        pending[0] = None
+        if group_id == application_id:
+            return list(rows)
+
+
+def _number(field, value):
+    return int(value) if field in _INTEGER_FIELDS else float(value)
+
+
+def iter_record_batches(status=None, min_id=None, max_id=None, after=None):
+    """Yields lists of export records, in application id order.
+
+    status is a models.ApplicationStatus; min_id and max_id bound the
+    application ids inclusively and after exclusively. Must be called within
+    an app context.
+    """
+    application = models.Application.__table__
+    applicant_info = models.ApplicantInfo.__table__
+    id_range = (min_id, max_id, after)
+    clauses = _filters(application, status, *id_range)
+
+    # Compactly stored applications carry their applicant fields, offer and
+    # rejection mask on the application row and have no child rows. The id
+    # range is repeated in the join for the reason _merge gives.
+    application_query = sa.select(
+        application.c.id, application.c.user_id, application.c.status,
+        application.c.offer_apr, application.c.offer_monthly_payment,
+        application.c.offer_term_length_months, application.c.rejection_mask,
+        application.c.created_at,
+        *(sa.func.coalesce(application.c[field], applicant_info.c[field])
+          for field in ap.APPLICANT_FIELDS)).outerjoin_from(
+              application, applicant_info,
+              sa.and_(
+                  applicant_info.c.application_id == application.c.id,
+                  *_id_filters(applicant_info.c.application_id,
+                               *id_range))).where(*clauses).order_by(
+                                   application.c.id)
+    # The session picks the engine, so GET requests still read from a
+    # replica.
+    engine = db.session().get_bind(clause=application_query)
+    with engine.connect().execution_options(
+            isolation_level='REPEATABLE READ',
+            postgresql_readonly=True) as connection, connection.begin():
+        yield from _merge(connection, application_query, clauses, id_range)
+
+
+def _merge(connection, application_query, clauses, id_range):
+    """Yields record batches read from connection, as iter_record_batches.
+
+    id_range is the (min_id, max_id, after) the clauses were made from.
+    """
+    application = models.Application.__table__
+    offer = models.Offer.__table__
+    rejection = models.Rejection.__table__
+    applications = _stream(connection, application_query)
+    # Postgres carries equalities across a join but not ranges, so the id
+    # range is repeated on each child table for it to scan only that range.
+    offers = _children(
+        _stream(
+            connection,
+            sa.select(offer.c.application_id, offer.c.apr,
+                      offer.c.monthly_payment,
+                      offer.c.term_length_months).join_from(
+                          offer, application,
+                          offer.c.application_id == application.c.id).where(
+                              *clauses,
+                              *_id_filters(offer.c.application_id, *id_range)
+                          ).order_by(offer.c.application_id,
+                                     offer.c.term_length_months)))
+    rejections = _children(
+        _stream(
+            connection,
+            sa.select(rejection.c.application_id, rejection.c.reason).join_from(
+                rejection, application,
+                rejection.c.application_id == application.c.id).where(
+                    *clauses,
+                    *_id_filters(rejection.c.application_id, *id_range)
+                ).order_by(rejection.c.application_id, rejection.c.reason)))
+    pending_offer, pending_rejection = [None], [None]
+
+    while True:
+        batch = []
+        for row in itertools.islice(applications, BATCH_SIZE):
+            application_id = row[0]
+            offer_rows = _take(offers, application_id, pending_offer)
+            if row.offer_apr is not None:
+                offer_rows = [(application_id, row.offer_apr,
+                               row.offer_monthly_payment,
+                               row.offer_term_length_months)]
+            offer_list = [{
+                'apr': float(apr),
+                'monthly_payment': float(monthly_payment),
+                'term_length_months': int(term_length_months),
+            } for _, apr, monthly_payment, term_length_months in offer_rows]
+            reasons = [
+                reason for _, reason in _take(rejections, application_id,
+                                              pending_rejection)
+            ]
+            if row.rejection_mask is not None:
+                reasons = ap.reasons_from_mask(row.rejection_mask)
+            headline = next((offer for offer in offer_list
+                             if offer['term_length_months'] ==
+                             constants.LOAN_LENGTH_IN_MONTHS),
+                            offer_list[0] if offer_list else None)
+            batch.append({
+                'id': str(application_id),
+                'user_id': str(row[1]),
+                'status': row[2].name,
+                'applicant_info': {
+                    field: _number(field, value)
+                    for field, value in zip(ap.APPLICANT_FIELDS, row[8:])
+                },
+                'offer': headline,
+                'offers': offer_list,
+                'rejections': [{
+                    'reason': reason.name
+                } for reason in reasons],
+                'created_at': row.created_at.isoformat(),
+                'cursor': schemas.encode_cursor({'id': str(application_id)}),
+            })
+        if not batch:
+            return
+        yield batch
+
+
+def iter_ndjson(batches, compress=False):
+    """Encodes record batches as NDJSON bytes, one chunk per batch.
+
+    With compress, the chunks together form a single gzip stream.
+    """
+    compressor = zlib.compressobj(wbits=31) if compress else None
+    for batch in batches:
+        chunk = ''.join(
+            json.dumps(record, separators=(',', ':')) + '\n'
+            for record in batch).encode()
+        yield compressor.compress(chunk) if compressor else chunk
+    if compressor:
+        yield compressor.flush()
@@ -0,0 +1,219 @@
+"""Test coverage for the streaming application export."""
+from testing.flask_test_base import FlaskTest
+from testing.applications import STRONG_APPLICATION, WEAK_APPLICATION
+from app import db, history_export, history_import, models
+from sqlalchemy import event
+from unittest import mock
+import datetime
+import gzip
+import json
+import os
+import sqlalchemy as sa
+import tempfile
+import uuid
+
+
+_EXPORT_TOKEN = 'export-token'
+
+
+class ExportRouteAccessTests(FlaskTest):
+
+    def _export(self, authorization=None):
+        headers = self.get_api_headers()
+        if authorization is not None:
+            headers['Authorization'] = authorization
+        return self.client.get('/applications:export', headers=headers)
+
+    def test_off_by_default(self):
+        self.assertFalse(self.app.config['EXPORT_API_ENABLED'])
+        self.assertEqual(self._export().status_code, 404)
+        self.app.config['EXPORT_API_TOKEN'] = _EXPORT_TOKEN
+        self.assertEqual(
+            self._export('Bearer ' + _EXPORT_TOKEN).status_code, 404)
+
+    def test_requires_a_token(self):
+        self.app.config['EXPORT_API_ENABLED'] = True
+        self.assertEqual(self._export().status_code, 404)
+
+        self.app.config['EXPORT_API_TOKEN'] = _EXPORT_TOKEN
+        for authorization in (None, 'Bearer wrong', _EXPORT_TOKEN):
+            with self.subTest(authorization=authorization):
+                response = self._export(authorization)
+                self.assertEqual(response.status_code, 401)
+                self.assertEqual(response.headers['WWW-Authenticate'],
+                                 'Bearer')
+        self.assertEqual(
+            self._export('Bearer ' + _EXPORT_TOKEN).status_code, 200)
+
+
+class HistoryExportTests(FlaskTest):
+
+    def get_api_headers(self):
+        return dict(super().get_api_headers(),
+                    Authorization='Bearer ' + _EXPORT_TOKEN)
+
+    def setUp(self):
+        super().setUp()
+        self.app.config['EXPORT_API_ENABLED'] = True
+        self.app.config['EXPORT_API_TOKEN'] = _EXPORT_TOKEN
+        self.user_ids = [
+            self.post('/users', {'name': name}).json['id']
+            for name in ('steve', 'anna')
+        ]
+        self.applications = []
+        self.single_term_ids = []
+        for user_id in self.user_ids:
+            for applicant_info, terms in ((STRONG_APPLICATION, '36,60'),
+                                          (WEAK_APPLICATION, '36'),
+                                          (STRONG_APPLICATION, '24')):
+                application = self.post(
+                    '/users/%s/applications?terms=%s' % (user_id, terms),
+                    applicant_info).json
+                application['user_id'] = user_id
+                self.applications.append(application)
+                if terms == '24':
+                    self.single_term_ids.append(application['id'])
+        self.applications.sort(key=lambda app: uuid.UUID(app['id']))
+
+    def _export(self, query=''):
+        response = self.get('/applications:export' + query)
+        self.assertEqual(response.status_code, 200)
+        return [json.loads(line) for line in response.data.splitlines()]
+
+    def _as_api(self, records):
+        """Drops the keys the API's applications do not have."""
+        return [{
+            key: value
+            for key, value in record.items()
+            if key not in ('created_at', 'cursor')
+        } for record in records]
+
+    def test_records_match_the_api(self):
+        records = self._export()
+        self.assertEqual(self._as_api(records), self.applications)
+        # Applications that asked only for 24-month terms lead with one.
+        offers = {record['id']: record['offer'] for record in records}
+        for application_id in self.single_term_ids:
+            self.assertEqual(offers[application_id]['term_length_months'],
+                             24)
+
+    def test_compact_records_match_the_api(self):
+        self.app.config['COMPACT_APPLICATION_STORAGE'] = True
+        for applicant_info in (STRONG_APPLICATION, WEAK_APPLICATION):
+            application = self.post(
+                '/users/%s/applications' % self.user_ids[0],
+                applicant_info).json
+            application['user_id'] = self.user_ids[0]
+            self.applications.append(application)
+        self.applications.sort(key=lambda app: uuid.UUID(app['id']))
+        with mock.patch.object(history_export, 'BATCH_SIZE', 3):
+            records = self._export()
+        self.assertEqual(self._as_api(records), self.applications)
+
+    def test_reads_one_read_only_snapshot(self):
+        transactions = []
+
+        def record(conn):
+            transactions.append(
+                (conn.get_isolation_level(),
+                 conn.exec_driver_sql('SHOW transaction_read_only').scalar()))
+
+        event.listen(db.engine, 'begin', record)
+        try:
+            records = self._export()
+        finally:
+            event.remove(db.engine, 'begin', record)
+        self.assertEqual(len(records), len(self.applications))
+        self.assertEqual(transactions, [('REPEATABLE READ', 'on')])
+
+    def test_filters(self):
+        records = self._export('?status=DECLINED')
+        self.assertEqual([record['id'] for record in records], [
+            app['id'] for app in self.applications
+            if app['status'] == 'DECLINED'
+        ])
+
+        ids = [app['id'] for app in self.applications]
+        records = self._export('?min_id=%s&max_id=%s' % (ids[1], ids[3]))
+        self.assertEqual([record['id'] for record in records], ids[1:4])
+
+        response = self.get('/applications:export?status=LOST')
+        self.assertEqual(response.status_code, 422)
+
+    def test_resume_from_cursor(self):
+        records = self._export()
+        with mock.patch.object(history_export, 'BATCH_SIZE', 2):
+            resumed = self._export('?cursor=' + records[2]['cursor'])
+        self.assertEqual(resumed, records[3:])
+
+    def test_gzip(self):
+        response = self.get('/applications:export?gzip=true')
+        self.assertEqual(response.mimetype, 'application/gzip')
+        lines = gzip.decompress(response.data).splitlines()
+        self.assertEqual(self._as_api(map(json.loads, lines)),
+                         self.applications)
+
+    def test_export_can_be_imported(self):
+        db.session.execute(
+            sa.text("UPDATE application "
+                    "SET created_at = created_at - interval '400 days'"))
+        db.session.commit()
+        created_at = {
+            application.id: application.created_at
+            for application in models.Application.query
+        }
+        lines = self.get('/applications:export').data.decode().splitlines()
+        for app in self.applications:
+            self.delete('/users/%s/applications/%s' %
+                        (app['user_id'], app['id']))
+        self.assertEqual(models.Application.query.count(), 0)
+
+        report = history_import.import_applications(lines)
+        self.assertEqual(report['imported'], len(self.applications))
+        records = self._export()
+        self.assertEqual(self._as_api(records), self.applications)
+        self.assertEqual(
+            {
+                uuid.UUID(record['id']):
+                datetime.datetime.fromisoformat(record['created_at'])
+                for record in records
+            }, created_at)
+
+    def test_export_command_resumes(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'applications.jsonl.gz')
+            runner = self.app.test_cli_runner()
+            with mock.patch.object(history_export, 'BATCH_SIZE', 4):
+                result = runner.invoke(args=['export-applications', path])
+            self.assertEqual(result.exit_code, 0, result.output)
+            self.assertIn('Exported 6 applications', result.output)
+            with gzip.open(path) as f:
+                complete = f.read()
+
+            # Pretend the export died after the first batch, part-way
+            # through writing the second.
+            first_batch = gzip.compress(complete[:complete.index(b'\n', 0) +
+                                                 1])
+            records = complete.splitlines()
+            with open(path, 'wb') as f:
+                f.write(first_batch + b'\x1f\x8b partial')
+            with open(path + '.progress', 'w') as f:
+                json.dump(
+                    {
+                        'filters': {},
+                        'bytes': len(first_batch),
+                        'cursor': json.loads(records[0])['cursor'],
+                    }, f)
+            result = runner.invoke(
+                args=['export-applications', path, '--resume'])
+            self.assertEqual(result.exit_code, 0, result.output)
+            self.assertIn('Exported 5 applications', result.output)
+            with gzip.open(path) as f:
+                self.assertEqual(f.read(), complete)
+
+            result = runner.invoke(args=[
+                'export-applications', path, '--resume', '--status',
+                'APPROVED'
+            ])
+            self.assertEqual(result.exit_code, 1)
+            self.assertIn('different filters', result.output)
@@ -0,0 +1,298 @@
+"""Streaming bulk import of historical applications and their decisions.
+
+Input is newline-delimited JSON with one application per line, in the shape
+the API returns plus the owning `user_id`:
+
+    {"id": ..., "user_id": ..., "status": "APPROVED",
+     "applicant_info": {...}, "offers": [...], "rejections": [...]}
+
+`id` is optional and generated when absent; `offer` is accepted in place of
+`offers`. `created_at`, an ISO 8601 time with a UTC offset, is optional too
+and defaults to the time of the import. Each chunk is parsed in Python,
+COPYed into temp tables, validated against the live tables with set-based SQL
+and then moved into application, applicant_info, offer and rejection in
+dependency order. Every chunk commits on its own, so a failed import can be
+resumed by re-running it: applications already imported are reported as
+duplicates.
+"""
+from app import bulk, db, ids, models
+from engine import application_processor as ap
+from engine import policy as lending_policy
+import collections
+import datetime
+import itertools
+import json
+import math
+import sqlalchemy as sa
+import time
+import uuid
+
+_INTEGER_FIELDS = frozenset(('credit_score', 'bankruptcies', 'delinquencies'))
+
+# Staging table -> (target table, staged columns). Child rows get their ids
+# from ids.TIME_ORDERED_UUID_SQL as they are moved, which keeps them out of
+# the COPY.
+_STAGING_TABLES = {
+    'import_application': ('application',
+                           ('id', 'user_id', 'status', 'created_at')),
+    'import_applicant_info': ('applicant_info',
+                              ('application_id', ) + ap.APPLICANT_FIELDS),
+    'import_offer': ('offer', ('application_id', 'apr', 'monthly_payment',
+                               'term_length_months')),
+    'import_rejection': ('rejection', ('application_id', 'reason')),
+}
+
+# Staged columns moved through an expression rather than as they are.
+_MOVED_VALUES = {'created_at': 'coalesce(created_at, now())'}
+
+# Each query yields (line, reason) for staged applications that must not be
+# imported. A rejected application takes its child rows with it.
+_VALIDATION_QUERIES = (
+    """SELECT s.line, 'unknown user' FROM import_application s
+       WHERE NOT EXISTS (SELECT 1 FROM users u WHERE u.id = s.user_id)""",
+    """SELECT s.line, 'duplicate application id' FROM import_application s
+       WHERE EXISTS (SELECT 1 FROM application a WHERE a.id = s.id)""",
+    """SELECT line, 'duplicate application id' FROM (
+           SELECT line, count(*) OVER (PARTITION BY id) AS copies
+           FROM import_application) s
+       WHERE copies > 1""",
+    """SELECT line, 'duplicate offer term' FROM import_offer
+       GROUP BY line, term_length_months HAVING count(*) > 1""",
+    """SELECT line, 'duplicate rejection reason' FROM import_rejection
+       GROUP BY line, reason HAVING count(*) > 1""",
+    # Approved applications have offers, declined ones have rejections, and
+    # pending ones have neither.
+    """SELECT s.line, 'status does not match offers and rejections'
+       FROM import_application s
+       LEFT JOIN (SELECT DISTINCT line FROM import_offer) o
+           ON o.line = s.line
+       LEFT JOIN (SELECT DISTINCT line FROM import_rejection) r
+           ON r.line = s.line
+       WHERE CASE s.status
+           WHEN 'APPROVED' THEN o.line IS NULL OR r.line IS NOT NULL
+           WHEN 'DECLINED' THEN o.line IS NOT NULL OR r.line IS NULL
+           ELSE o.line IS NOT NULL OR r.line IS NOT NULL
+       END""",
+)
+
+_StagedApplication = collections.namedtuple(
+    '_StagedApplication',
+    ['line', 'id', 'user_id', 'status', 'created_at', 'applicant_info',
+     'offers', 'reasons'])
+
+
+class MalformedRecord(ValueError):
+    pass
+
+
+def _number(info, field):
+    value = info[field]
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise MalformedRecord('%s must be a number' % field)
+    if not math.isfinite(value):
+        raise MalformedRecord('%s must be finite' % field)
+    if field in _INTEGER_FIELDS:
+        if value != int(value):
+            raise MalformedRecord('%s must be an integer' % field)
+        return int(value)
+    return float(value)
+
+
+def _timestamp(value):
+    if value is None:
+        return None
+    when = datetime.datetime.fromisoformat(value)
+    if when.tzinfo is None:
+        raise MalformedRecord('created_at must have a UTC offset')
+    return when
+
+
+def parse_record(line, text):
+    """Parses one input line into a _StagedApplication.
+
+    Raises MalformedRecord describing the first problem found.
+    """
+    try:
+        record = json.loads(text)
+        info = record['applicant_info']
+        offers = record.get('offers')
+        if offers is None:
+            offers = [record['offer']] if record.get('offer') else []
+        return _StagedApplication(
+            line=line,
+            id=str(
+                uuid.UUID(record['id'])
+                if record.get('id') else ids.time_ordered_uuid()),
+            user_id=str(uuid.UUID(record['user_id'])),
+            status=models.ApplicationStatus[record['status']],
+            created_at=_timestamp(record.get('created_at')),
+            applicant_info=tuple(
+                _number(info, field) for field in ap.APPLICANT_FIELDS),
+            offers=[
+                ap.OfferTerms(apr=_number(offer, 'apr'),
+                              monthly_payment=_number(
+                                  offer, 'monthly_payment'),
+                              term_length_months=int(
+                                  _number(offer, 'term_length_months')))
+                for offer in offers
+            ],
+            reasons=[
+                models.RejectionReason[rejection['reason']]
+                for rejection in record.get('rejections') or []
+            ])
+    except MalformedRecord:
+        raise
+    except KeyError as e:
+        raise MalformedRecord('missing or unknown value %s' % e)
+    except (AttributeError, TypeError, ValueError) as e:
+        raise MalformedRecord(str(e) or type(e).__name__)
+
+
+def _rescore(applications, policy):
+    """Replaces the stored decisions with the engine's, using the batch path.
+
+    Returns the re-scored applications and how many changed status.
+    """
+    columns = list(zip(*(staged.applicant_info for staged in applications)))
+    decisions = ap.process_applications_batch(*columns, policy=policy)
+    rescored, changed = [], 0
+    for staged, rejection_mask, apr, monthly_payment in zip(
+            applications, decisions.rejection_mask.tolist(),
+            decisions.apr.tolist(), decisions.monthly_payment.tolist()):
+        if rejection_mask == 0:
+            status = models.ApplicationStatus.APPROVED
+            offers = [
+                ap.OfferTerms(apr=apr,
+                              monthly_payment=monthly_payment,
+                              term_length_months=policy.loan_length_in_months)
+            ]
+        else:
+            status = models.ApplicationStatus.DECLINED
+            offers = []
+        changed += status != staged.status
+        rescored.append(
+            staged._replace(status=status,
+                            offers=offers,
+                            reasons=ap.reasons_from_mask(rejection_mask)))
+    return rescored, changed
+
+
+def _create_staging_tables():
+    # Dropped at commit, so pooled connections never keep them around.
+    for staging, (table, columns) in _STAGING_TABLES.items():
+        db.session.execute(
+            sa.text('CREATE TEMP TABLE %s ON COMMIT DROP AS SELECT '
+                    'NULL::bigint AS line, %s FROM %s WITH NO DATA' %
+                    (staging, ', '.join(columns), table)))
+    db.session.execute(
+        sa.text('CREATE TEMP TABLE import_rejected (line bigint, reason text) '
+                'ON COMMIT DROP'))
+
+
+def _stage(applications):
+    rows = {staging: [] for staging in _STAGING_TABLES}
+    for staged in applications:
+        rows['import_application'].append(
+            (staged.line, staged.id, staged.user_id, staged.status.name,
+             staged.created_at))
+        rows['import_applicant_info'].append((staged.line, staged.id) +
+                                             staged.applicant_info)
+        for offer in staged.offers:
+            rows['import_offer'].append((staged.line, staged.id) + offer)
+        for reason in staged.reasons:
+            rows['import_rejection'].append(
+                (staged.line, staged.id, reason.name))
+    for staging, (_, columns) in _STAGING_TABLES.items():
+        if rows[staging]:
+            columns = ('line', ) + columns
+            bulk.copy_rows(sa.table(staging, *map(sa.column, columns)),
+                           columns, rows[staging])
+
+
+def _load_chunk(applications):
+    """Stages, validates and inserts one chunk in the current transaction.
+
+    Returns a dict of rejected line number to its reasons.
+    """
+    _create_staging_tables()
+    _stage(applications)
+    db.session.execute(
+        sa.text('INSERT INTO import_rejected (line, reason) ' +
+                ' UNION ALL '.join(_VALIDATION_QUERIES)))
+    for staging, (table, columns) in _STAGING_TABLES.items():
+        values = ', '.join(
+            _MOVED_VALUES.get(column, column) for column in columns)
+        if 'id' not in columns:
+            columns = ('id', ) + columns
+            values = ids.TIME_ORDERED_UUID_SQL + ', ' + values
+        db.session.execute(
+            sa.text('INSERT INTO {table} ({columns}) SELECT {values} '
+                    'FROM {staging} s WHERE NOT EXISTS ('
+                    'SELECT 1 FROM import_rejected r WHERE r.line = s.line)'.
+                    format(table=table,
+                           columns=', '.join(columns),
+                           values=values,
+                           staging=staging)))
+    rejected = collections.defaultdict(list)
+    for line, reason in db.session.execute(
+            sa.text('SELECT DISTINCT line, reason FROM import_rejected '
+                    'ORDER BY line, reason')):
+        rejected[line].append(reason)
+    return rejected
+
+
+def import_applications(lines, rescore=False, chunk_size=50000,
+                        rejects_file=None):
+    """Imports NDJSON application records from an iterable of text lines.
+
+    With rescore, each application's status, offer and rejections are
+    recomputed with the current policy rather than taken from the input.
+    Rejected records are written to rejects_file, when given, as JSON lines
+    of {"line": ..., "reasons": [...]}. Returns a report dict of counts and
+    throughput.
+    """
+    policy = lending_policy.current() if rescore else None
+    report = {
+        'rows_read': 0,
+        'imported': 0,
+        'rejected': 0,
+        'rejections_by_reason': collections.Counter(),
+        'decisions_changed': 0 if rescore else None,
+    }
+    start = time.perf_counter()
+    numbered = ((number, text)
+                for number, text in enumerate(lines, start=1)
+                if text.strip())
+    while True:
+        chunk = list(itertools.islice(numbered, chunk_size))
+        if not chunk:
+            break
+        report['rows_read'] += len(chunk)
+        applications, rejected = [], {}
+        for number, text in chunk:
+            try:
+                applications.append(parse_record(number, text))
+            except MalformedRecord as e:
+                rejected[number] = ['malformed record: %s' % e]
+        if applications and rescore:
+            applications, changed = _rescore(applications, policy)
+            report['decisions_changed'] += changed
+        if applications:
+            rejected.update(_load_chunk(applications))
+        db.session.commit()
+
+        report['imported'] += len(chunk) - len(rejected)
+        report['rejected'] += len(rejected)
+        for number in sorted(rejected):
+            report['rejections_by_reason'].update(rejected[number])
+            if rejects_file is not None:
+                rejects_file.write(
+                    json.dumps({
+                        'line': number,
+                        'reasons': rejected[number]
+                    }) + '\n')
+    report['seconds'] = round(time.perf_counter() - start, 3)
+    report['rows_per_second'] = round(
+        report['rows_read'] / report['seconds']) if report['seconds'] else None
+    report['rejections_by_reason'] = dict(report['rejections_by_reason'])
+    return report
@@ -0,0 +1,201 @@
+"""Test coverage for the bulk historical application import."""
+from testing.flask_test_base import FlaskTest
+from testing.applications import STRONG_APPLICATION, WEAK_APPLICATION
+from app import history_import, models
+import datetime
+import gzip
+import io
+import json
+import os
+import tempfile
+import uuid
+
+
+class HistoryImportTests(FlaskTest):
+
+    def setUp(self):
+        super().setUp()
+        self.user_id = self.post('/users', {'name': 'steve'}).json['id']
+
+    def _record(self, applicant_info, **overrides):
+        record = {
+            'id': str(uuid.uuid4()),
+            'user_id': self.user_id,
+            'status': 'DECLINED',
+            'applicant_info': applicant_info,
+            'offers': [],
+            'rejections': [{
+                'reason': 'INSUFFICIENT_CREDIT_SCORE'
+            }],
+        }
+        record.update(overrides)
+        return record
+
+    def _import(self, records, **kwargs):
+        lines = [
+            record if isinstance(record, str) else json.dumps(record)
+            for record in records
+        ]
+        return history_import.import_applications(lines, **kwargs)
+
+    def _get(self, record):
+        return self.get('/users/%s/applications/%s' %
+                        (record['user_id'], record['id']))
+
+    def test_imported_applications_round_trip_through_the_api(self):
+        offer = {'apr': 0.02, 'monthly_payment': 11.43,
+                 'term_length_months': 36}
+        approved = self._record(STRONG_APPLICATION,
+                                status='APPROVED',
+                                offers=[offer],
+                                rejections=[])
+        declined = self._record(WEAK_APPLICATION,
+                                rejections=[{
+                                    'reason': 'EXCESSIVE_BANKRUPTCIES'
+                                }, {
+                                    'reason': 'EXCESSIVE_DELINQUENCIES'
+                                }])
+        report = self._import([approved, declined], chunk_size=1)
+        self.assertEqual(report['imported'], 2)
+        self.assertEqual(report['rejected'], 0)
+        self.assertIsNone(report['decisions_changed'])
+
+        response = self._get(approved)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json['status'], 'APPROVED')
+        self.assertEqual(response.json['offers'], [offer])
+        self.assertEqual(response.json['applicant_info'], STRONG_APPLICATION)
+        response = self._get(declined)
+        self.assertEqual(response.json['offer'], None)
+        self.assertCountEqual(response.json['rejections'],
+                              declined['rejections'])
+
+    def test_invalid_records_are_rejected_without_their_children(self):
+        existing_id = self.post('/users/%s/applications' % self.user_id,
+                                STRONG_APPLICATION).json['id']
+        offer = {'apr': 0.02, 'monthly_payment': 11.43,
+                 'term_length_months': 36}
+        good = self._record(STRONG_APPLICATION)
+        repeated = self._record(STRONG_APPLICATION)
+        records = [
+            good,
+            self._record(STRONG_APPLICATION, user_id=str(uuid.uuid4())),
+            self._record(STRONG_APPLICATION, id=existing_id),
+            repeated,
+            repeated,
+            self._record(STRONG_APPLICATION,
+                         status='APPROVED',
+                         offers=[offer, offer],
+                         rejections=[]),
+            '{"id": ',
+            self._record(dict(STRONG_APPLICATION, credit_score='high')),
+            self._record(
+                dict(STRONG_APPLICATION,
+                     monthly_income=float('nan'),
+                     vehicle_value=float('inf'),
+                     loan_amount=float('nan'))),
+            self._record(STRONG_APPLICATION,
+                         status='APPROVED',
+                         offers=[dict(offer, monthly_payment=float('nan'))],
+                         rejections=[]),
+        ]
+        rejects = io.StringIO()
+        report = self._import(records, rejects_file=rejects)
+
+        self.assertEqual(report['rows_read'], 10)
+        self.assertEqual(report['imported'], 1)
+        self.assertEqual(report['rejected'], 9)
+        self.assertEqual(
+            report['rejections_by_reason'], {
+                'unknown user': 1,
+                'duplicate application id': 3,
+                'duplicate offer term': 1,
+                'malformed record: Expecting value: line 1 column 8 (char 7)':
+                1,
+                'malformed record: credit_score must be a number': 1,
+                'malformed record: monthly_income must be finite': 1,
+                'malformed record: monthly_payment must be finite': 1,
+            })
+        self.assertEqual([
+            json.loads(line)['line']
+            for line in rejects.getvalue().splitlines()
+        ], [2, 3, 4, 5, 6, 7, 8, 9, 10])
+        self.assertEqual(self._get(good).status_code, 200)
+        self.assertEqual(models.Application.query.count(), 2)
+        self.assertEqual(models.ApplicantInfo.query.count(), 2)
+        self.assertEqual(models.Offer.query.count(), 1)
+
+    def test_status_must_match_offers_and_rejections(self):
+        offer = {'apr': 0.02, 'monthly_payment': 11.43,
+                 'term_length_months': 36}
+        pending = self._record(STRONG_APPLICATION,
+                               status='PENDING',
+                               rejections=[])
+        records = [
+            pending,
+            self._record(STRONG_APPLICATION,
+                         status='APPROVED',
+                         rejections=[]),
+            self._record(STRONG_APPLICATION,
+                         status='APPROVED',
+                         offers=[offer]),
+            self._record(WEAK_APPLICATION, offers=[offer]),
+            self._record(WEAK_APPLICATION, rejections=[]),
+            self._record(WEAK_APPLICATION, status='PENDING'),
+        ]
+        report = self._import(records)
+        self.assertEqual(report['imported'], 1)
+        self.assertEqual(report['rejections_by_reason'],
+                         {'status does not match offers and rejections': 5})
+        self.assertEqual(self._get(pending).json['status'], 'PENDING')
+        self.assertEqual(models.Offer.query.count(), 0)
+        self.assertEqual(models.Rejection.query.count(), 0)
+
+    def test_created_at_is_kept_or_defaulted(self):
+        kept = self._record(STRONG_APPLICATION,
+                            created_at='2020-05-01T12:30:00+02:00')
+        defaulted = self._record(STRONG_APPLICATION)
+        naive = self._record(STRONG_APPLICATION,
+                             created_at='2020-05-01T12:30:00')
+        before = datetime.datetime.now(datetime.timezone.utc)
+        report = self._import([kept, defaulted, naive])
+        self.assertEqual(report['imported'], 2)
+        self.assertEqual(report['rejections_by_reason'], {
+            'malformed record: created_at must have a UTC offset': 1,
+        })
+        self.assertEqual(
+            models.Application.query.get(kept['id']).created_at,
+            datetime.datetime(2020, 5, 1, 10, 30,
+                              tzinfo=datetime.timezone.utc))
+        self.assertGreaterEqual(
+            models.Application.query.get(defaulted['id']).created_at,
+            before - datetime.timedelta(seconds=1))
+
+    def test_rescore_replaces_stored_decisions(self):
+        record = self._record(STRONG_APPLICATION,
+                              rejections=[{
+                                  'reason': 'INSUFFICIENT_CREDIT_SCORE'
+                              }])
+        report = self._import([record], rescore=True)
+        self.assertEqual(report['imported'], 1)
+        self.assertEqual(report['decisions_changed'], 1)
+
+        expected = self.post('/users/%s/applications' % self.user_id,
+                             STRONG_APPLICATION).json
+        imported = self._get(record).json
+        for key in ('status', 'offer', 'offers', 'rejections'):
+            self.assertEqual(imported[key], expected[key])
+
+    def test_import_command_reads_gzip(self):
+        record = self._record(WEAK_APPLICATION)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'applications.jsonl.gz')
+            with gzip.open(path, 'wt') as f:
+                f.write(json.dumps(record) + '\n\n')
+            result = self.app.test_cli_runner().invoke(
+                args=['import-applications', path, '--rescore'])
+        self.assertEqual(result.exit_code, 0, result.output)
+        report = json.loads(result.output)
+        self.assertEqual((report['rows_read'], report['imported']), (1, 1))
+        self.assertEqual(report['decisions_changed'], 0)
+        self.assertEqual(self._get(record).json['status'], 'DECLINED')
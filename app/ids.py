@@ -0,0 +1,81 @@
+"""Time-ordered identifiers.
+
+time_ordered_uuid returns UUIDs laid out like UUIDv7: a 48-bit Unix time in
+milliseconds, then random bits, with the version and variant bits set as
+RFC 4122 requires. They sort by creation time, in Python and in Postgres,
+and are ordinary UUIDs everywhere else. As primary keys, each new row goes
+to the right-hand edge of the index rather than a random leaf page, so
+inserts touch few pages and rarely split full ones.
+
+Ids made within the same millisecond are ordered randomly among themselves.
+"""
+import datetime
+import os
+import time
+import uuid
+
+_VERSION = 7
+
+# A Postgres expression for a new time-ordered UUID, for rows created in
+# SQL: a random UUID with its first 48 bits overwritten by the time in
+# milliseconds and its version changed from 4 to 7.
+TIME_ORDERED_UUID_SQL = (
+    "encode(set_bit(set_bit(overlay(uuid_send(gen_random_uuid()) placing "
+    "substring(int8send(floor(extract(epoch FROM clock_timestamp()) * 1000)"
+    "::bigint) FROM 3) FROM 1 FOR 6), 52, 1), 53, 1), 'hex')::uuid")
+
+
+def _milliseconds(when):
+    return int(when.timestamp() * 1000)
+
+
+def time_ordered_uuid(when=None):
+    """Returns a new UUID ordered by when, a datetime, or else by now."""
+    milliseconds = (time.time_ns() // 1000000
+                    if when is None else _milliseconds(when))
+    value = (milliseconds << 80) | int.from_bytes(os.urandom(10), 'big')
+    value &= ~(0xf << 76 | 0x3 << 62)
+    value |= _VERSION << 76 | 0x2 << 62
+    return uuid.UUID(int=value)
+
+
+# Each hex digit -> the digit with the RFC 4122 variant bits, 10, set.
+_VARIANT_DIGITS = {
+    digit: '%x' % (int(digit, 16) & 0x3 | 0x8)
+    for digit in '0123456789abcdef'
+}
+
+
+def time_ordered_uuid_texts(count):
+    """Returns count new time-ordered UUIDs as text, for loading in bulk.
+
+    Laid out as time_ordered_uuid's, but all from the same millisecond, and
+    formatted straight from one buffer of random bytes rather than through a
+    UUID object each.
+    """
+    milliseconds = time.time_ns() // 1000000
+    prefix = '%08x-%04x-%x' % (milliseconds >> 16, milliseconds & 0xffff,
+                               _VERSION)
+    digits = os.urandom(10 * count).hex()
+    return [
+        prefix + digits[i:i + 3] + '-' + _VARIANT_DIGITS[digits[i + 3]] +
+        digits[i + 4:i + 7] + '-' + digits[i + 7:i + 19]
+        for i in range(0, 20 * count, 20)
+    ]
+
+
+def lower_bound(when):
+    """Returns the smallest time-ordered UUID for when, a datetime.
+
+    Every UUID time_ordered_uuid makes at or after when sorts at or above it,
+    and every one made before sorts below it.
+    """
+    return uuid.UUID(int=_milliseconds(when) << 80)
+
+
+def created_at(value):
+    """Returns the UTC datetime a time-ordered UUID encodes, else None."""
+    if value.version != _VERSION:
+        return None
+    return datetime.datetime.fromtimestamp((value.int >> 80) / 1000,
+                                           datetime.timezone.utc)
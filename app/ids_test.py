@@ -0,0 +1,84 @@
+"""Test coverage for time-ordered identifiers."""
+from testing.flask_test_base import FlaskTest
+from app import db, ids, models
+import datetime
+import sqlalchemy as sa
+import uuid
+
+
+class TimeOrderedUuidTests(FlaskTest):
+
+    def test_layout(self):
+        when = datetime.datetime(2026, 10, 18, 12, 30, 15, 123000,
+                                 datetime.timezone.utc)
+        value = ids.time_ordered_uuid(when)
+        self.assertEqual(value.version, 7)
+        self.assertEqual(value.variant, uuid.RFC_4122)
+        self.assertEqual(ids.created_at(value), when)
+        self.assertIsNone(ids.created_at(uuid.uuid4()))
+
+    def test_sorts_by_time(self):
+        start = datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc)
+        times = [start + datetime.timedelta(milliseconds=i) for i in range(50)]
+        values = [ids.time_ordered_uuid(when) for when in times]
+        self.assertEqual(sorted(values), values)
+        # Postgres compares uuids bytewise, as Python compares them.
+        self.assertEqual(sorted(values, key=str), values)
+        for when, value in zip(times, values):
+            self.assertLessEqual(ids.lower_bound(when), value)
+            self.assertLess(value,
+                            ids.lower_bound(when + datetime.timedelta(
+                                milliseconds=1)))
+
+    def test_texts(self):
+        before = ids.time_ordered_uuid()
+        texts = ids.time_ordered_uuid_texts(1000)
+        self.assertEqual(len(set(texts)), 1000)
+        for text in texts:
+            value = uuid.UUID(text)
+            self.assertEqual(str(value), text)
+            self.assertEqual(value.version, 7)
+            self.assertEqual(value.variant, uuid.RFC_4122)
+            self.assertLessEqual(ids.lower_bound(ids.created_at(before)),
+                                 value)
+        self.assertEqual(ids.time_ordered_uuid_texts(0), [])
+
+    def test_sql_expression(self):
+        before = ids.time_ordered_uuid()
+        value = uuid.UUID(
+            str(
+                db.session.execute(
+                    sa.text('SELECT ' + ids.TIME_ORDERED_UUID_SQL)).scalar()))
+        after = ids.time_ordered_uuid()
+        self.assertEqual(value.version, 7)
+        self.assertEqual(value.variant, uuid.RFC_4122)
+        self.assertLessEqual(ids.lower_bound(ids.created_at(before)), value)
+        self.assertLess(
+            value,
+            ids.lower_bound(
+                ids.created_at(after) + datetime.timedelta(milliseconds=1)))
+
+    def test_new_and_random_ids_are_served(self):
+        legacy = models.User(id=uuid.uuid4(), name='legacy')
+        db.session.add(legacy)
+        db.session.commit()
+        new_id = self.post('/users', {'name': 'new'}).json['id']
+        self.assertEqual(uuid.UUID(new_id).version, 7)
+        for user_id in (str(legacy.id), new_id):
+            response = self.post('/users/%s/applications' % user_id, {
+                'bankruptcies': 0,
+                'credit_score': 1000,
+                'monthly_debt': 0,
+                'loan_amount': 399,
+                'vehicle_value': 2000,
+                'monthly_income': 4444444,
+                'delinquencies': 0,
+            })
+            self.assertEqual(response.status_code, 201, response.data)
+            self.assertEqual(uuid.UUID(response.json['id']).version, 7)
+            response = self.get('/users/%s/applications/%s' %
+                                (user_id, response.json['id']))
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(self.get('/users/' + user_id).status_code, 200)
+        child = models.Offer.query.first()
+        self.assertEqual(child.id.version, 7)
@@ -1,33 +1,46 @@
 """Contains SQLAlchemy models for the API.
 
-All objects persisted to the database are represented as models.
+All objects persisted to the database are represented as models. Their ids
+are time-ordered UUIDs from ids.py, which keep inserts local to the right-hand
+edge of each primary key index; rows created earlier keep their random ones.
 """
-from sqlalchemy.dialects.postgresql import UUID
-from app import db
+from flask import current_app
+from sqlalchemy.dialects.postgresql import ARRAY, UUID
+from app import db, ids
+from constants import constants
+import collections
 import enum
-import uuid
 
 
 class User(db.Model):
     __tablename__ = 'users'
-    id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = db.Column(UUID(as_uuid=True),
+                   primary_key=True,
+                   default=ids.time_ordered_uuid)
     applications = db.relationship(
         'Application',
         backref='rollup',
-        lazy='selectin',
+        lazy='select',
         cascade="all,delete-orphan",
+        passive_deletes=True,
     )
     name = db.Column(db.String)
 
 
 class ApplicantInfo(db.Model):
     """The user-provided info for a loan application."""
-    id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = db.Column(UUID(as_uuid=True),
+                   primary_key=True,
+                   default=ids.time_ordered_uuid)
+    # Offer and Rejection are indexed on application_id by their unique
+    # constraints; this is the only child table that needs its own index.
     application_id = db.Column(UUID(as_uuid=True),
-                               db.ForeignKey('application.id'),
-                               nullable=False)
+                               db.ForeignKey('application.id',
+                                             ondelete='CASCADE'),
+                               nullable=False,
+                               index=True)
     application = db.relationship("Application",
-                                  back_populates="applicant_info")
+                                  back_populates="applicant_info_row")
     credit_score = db.Column(db.Integer, nullable=False)
     monthly_debt = db.Column(db.Float, nullable=False)
     monthly_income = db.Column(db.Float, nullable=False)
@@ -39,14 +52,20 @@ class ApplicantInfo(db.Model):
 
 class Offer(db.Model):
     """A loan offer for which the user would be eligible."""
-    id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = db.Column(UUID(as_uuid=True),
+                   primary_key=True,
+                   default=ids.time_ordered_uuid)
     application_id = db.Column(UUID(as_uuid=True),
-                               db.ForeignKey('application.id'),
+                               db.ForeignKey('application.id',
+                                             ondelete='CASCADE'),
                                nullable=False)
-    application = db.relationship("Application", back_populates="offer")
+    application = db.relationship("Application", back_populates="offer_rows")
     apr = db.Column(db.Float, nullable=False)
     monthly_payment = db.Column(db.Float, nullable=False)
     term_length_months = db.Column(db.Integer, nullable=False)
+    __table_args__ = (db.UniqueConstraint('application_id',
+                                          'term_length_months',
+                                          name='_application_offer_term_uc'), )
 
 
 class RejectionReason(enum.IntEnum):
@@ -60,9 +79,12 @@ class RejectionReason(enum.IntEnum):
 
 class Rejection(db.Model):
     """A item that has been determined to make the user ineligible for a loan."""
-    id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = db.Column(UUID(as_uuid=True),
+                   primary_key=True,
+                   default=ids.time_ordered_uuid)
     application_id = db.Column(UUID(as_uuid=True),
-                               db.ForeignKey('application.id'),
+                               db.ForeignKey('application.id',
+                                             ondelete='CASCADE'),
                                nullable=False)
     reason = db.Column(db.Enum(RejectionReason), nullable=False)
     __table_args__ = (db.UniqueConstraint('application_id',
@@ -76,23 +98,190 @@ class ApplicationStatus(enum.IntEnum):
     PENDING = 3
 
 
+class InlineApplicantInfo(object):
+    """The applicant info of a compactly stored application.
+
+    Reads and writes go straight to the application's own columns, so it can
+    be used wherever an ApplicantInfo row is.
+    """
+    FIELDS = ('credit_score', 'monthly_debt', 'monthly_income', 'bankruptcies',
+              'delinquencies', 'vehicle_value', 'loan_amount')
+
+    def __init__(self, application):
+        object.__setattr__(self, '_application', application)
+
+    def __getattr__(self, name):
+        if name not in self.FIELDS:
+            raise AttributeError(name)
+        return getattr(self._application, name)
+
+    def __setattr__(self, name, value):
+        if name not in self.FIELDS:
+            raise AttributeError(name)
+        setattr(self._application, name, value)
+
+
+InlineOffer = collections.namedtuple(
+    'InlineOffer', ['apr', 'monthly_payment', 'term_length_months'])
+InlineRejection = collections.namedtuple('InlineRejection', ['reason'])
+
+
+def compact_storage():
+    """Whether new decisions are written in the compact layout."""
+    return current_app.config.get('COMPACT_APPLICATION_STORAGE', False)
+
+
 class Application(db.Model):
-    """An application for a loan. Contains both user-provided info and loan decision."""
-    id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    """An application for a loan. Contains both user-provided info and loan decision.
+
+    Decisions are stored in one of two layouts. The normalized layout keeps
+    the applicant info, each offer and each rejection reason in rows of their
+    own tables. The compact layout, used for new writes when the app's
+    COMPACT_APPLICATION_STORAGE setting is on, keeps them all on this row:
+    the applicant fields, at most one offer, and a rejection bitmask.
+    applicant_info, offers and rejections read whichever layout a row uses.
+    """
+    # partitions.py partitions on this by month.
+    id = db.Column(UUID(as_uuid=True),
+                   primary_key=True,
+                   default=ids.time_ordered_uuid)
     user_id = db.Column(UUID(as_uuid=True),
-                        db.ForeignKey('users.id'),
-                        nullable=False,
-                        index=True)
-    applicant_info = db.relationship("ApplicantInfo",
-                                     back_populates="application",
-                                     cascade="all,delete-orphan",
-                                     uselist=False)
+                        db.ForeignKey('users.id', ondelete='CASCADE'),
+                        nullable=False)
+    applicant_info_row = db.relationship("ApplicantInfo",
+                                         back_populates="application",
+                                         cascade="all,delete-orphan",
+                                         passive_deletes=True,
+                                         uselist=False)
     status = db.Column(db.Enum(ApplicationStatus))
-    offer = db.relationship("Offer",
-                            back_populates="application",
-                            cascade="all,delete-orphan",
-                            uselist=False)
-    rejections = db.relationship('Rejection',
-                                 backref='rollup',
+    created_at = db.Column(db.DateTime(timezone=True),
+                           nullable=False,
+                           server_default=db.func.now())
+    # The loan terms the client asked for, shortest first, which updates
+    # reprice. Null for the policy's default term.
+    requested_terms = db.Column(ARRAY(db.Integer))
+    offer_rows = db.relationship("Offer",
+                                 back_populates="application",
                                  cascade="all,delete-orphan",
+                                 passive_deletes=True,
+                                 order_by="Offer.term_length_months",
                                  lazy='selectin')
+    rejection_rows = db.relationship('Rejection',
+                                     backref='rollup',
+                                     cascade="all,delete-orphan",
+                                     passive_deletes=True,
+                                     lazy='selectin')
+    # The compact layout. All are null for normalized rows.
+    credit_score = db.Column(db.Integer)
+    monthly_debt = db.Column(db.Float)
+    monthly_income = db.Column(db.Float)
+    bankruptcies = db.Column(db.Integer)
+    delinquencies = db.Column(db.Integer)
+    vehicle_value = db.Column(db.Float)
+    loan_amount = db.Column(db.Float)
+    offer_apr = db.Column(db.Float)
+    offer_monthly_payment = db.Column(db.Float)
+    offer_term_length_months = db.Column(db.Integer)
+    rejection_mask = db.Column(db.Integer)
+    __table_args__ = (
+        # Serves both lookups by user and the keyset-paginated listing.
+        db.Index('ix_application_user_id_id', 'user_id', 'id'),
+        # Lets the retention purge walk applications oldest first.
+        db.Index('ix_application_created_at_id', 'created_at', 'id'),
+    )
+
+    @property
+    def applicant_info(self):
+        if self.credit_score is not None:
+            return InlineApplicantInfo(self)
+        return self.applicant_info_row
+
+    @applicant_info.setter
+    def applicant_info(self, applicant_info):
+        """Stores applicant_info, an ApplicantInfo, in the current layout."""
+        if compact_storage():
+            for field in InlineApplicantInfo.FIELDS:
+                setattr(self, field, getattr(applicant_info, field))
+            self.applicant_info_row = None
+        else:
+            for field in InlineApplicantInfo.FIELDS:
+                setattr(self, field, None)
+            self.applicant_info_row = applicant_info
+
+    @property
+    def offers(self):
+        """The offers, shortest term first."""
+        if self.offer_apr is not None:
+            return [
+                InlineOffer(self.offer_apr, self.offer_monthly_payment,
+                            self.offer_term_length_months)
+            ]
+        return self.offer_rows
+
+    def set_offers(self, offers):
+        """Replaces the offers with offers, a list of OfferTerms.
+
+        A single offer is inlined in the compact layout; several are always
+        kept as rows. Rows for terms that are offered again are reused, so
+        that replacing the offers never collides with the unique
+        (application, term) constraint.
+        """
+        inline = compact_storage() and len(offers) == 1
+        self.offer_apr, self.offer_monthly_payment, \
+            self.offer_term_length_months = (
+                tuple(offers[0]) if inline else (None, None, None))
+        existing = {offer.term_length_months: offer for offer in self.offer_rows}
+        updated = []
+        for offer_terms in ([] if inline else offers):
+            offer = existing.get(offer_terms.term_length_months) or Offer()
+            for key, val in offer_terms._asdict().items():
+                setattr(offer, key, val)
+            updated.append(offer)
+        self.offer_rows = sorted(updated,
+                                 key=lambda offer: offer.term_length_months)
+
+    @property
+    def rejections(self):
+        if self.rejection_mask is not None:
+            from engine import application_processor as ap
+            return [
+                InlineRejection(reason)
+                for reason in ap.reasons_from_mask(self.rejection_mask)
+            ]
+        return self.rejection_rows
+
+    def set_rejection_reasons(self, reasons):
+        """Replaces the rejections with one per reason in reasons.
+
+        Rows for reasons that still apply are kept, which avoids colliding
+        with the unique (application, reason) constraint.
+        """
+        if compact_storage():
+            from engine import application_processor as ap
+            self.rejection_mask = sum(
+                ap.rejection_bit(reason) for reason in set(reasons))
+            self.rejection_rows = []
+            return
+        self.rejection_mask = None
+        existing = {rejection.reason: rejection
+                    for rejection in self.rejection_rows}
+        self.rejection_rows = [
+            existing.get(reason) or Rejection(reason=reason)
+            for reason in reasons
+        ]
+
+    @property
+    def offer(self):
+        """The headline offer: the standard term if offered, else the shortest."""
+        for offer in self.offers:
+            if offer.term_length_months == constants.LOAN_LENGTH_IN_MONTHS:
+                return offer
+        return self.offers[0] if self.offers else None
+
+
+# Loaded only when read, as a COUNT against ix_application_user_id_id.
+User.application_count = db.column_property(
+    db.select(db.func.count(Application.id)).where(
+        Application.user_id == User.id).correlate_except(
+            Application).scalar_subquery(),
+    deferred=True)
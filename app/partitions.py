@@ -0,0 +1,148 @@
+"""Optional monthly partitioning of the application tables.
+
+When partitioned, application is range-partitioned on id, and
+applicant_info, offer and rejection on application_id, into one partition
+per month. Application ids are time-ordered (see ids.py), so a month's
+partitions hold the applications created that month along with all of their
+child rows. Queries that name an application id, as the routes do, prune to
+one partition of each table, and an expired month is removed by dropping its
+partitions instead of deleting rows.
+
+Ids that are not time-ordered, from before partitioning or imported, land in
+each table's default partition unless their random prefix happens to fall in
+a month. purge-expired still deletes those by created_at.
+
+The migration that partitions the tables, with the frozen DDL in
+migrations/partitioning_b53ea58291bf.py, only does so when the app's
+PARTITION_APPLICATIONS setting is on. This module is what the `flask
+partitions` commands use afterwards to create upcoming months and drop
+expired ones.
+"""
+from app import ids
+import datetime
+import re
+import sqlalchemy as sa
+
+# Parents before children, the order they are created and filled in.
+TABLES = ('application', 'applicant_info', 'offer', 'rejection')
+
+_PARTITION_KEYS = {
+    'application': 'id',
+    'applicant_info': 'application_id',
+    'offer': 'application_id',
+    'rejection': 'application_id',
+}
+
+_PARTITION_NAME = re.compile(r'^(%s)_(p(\d{4})_(\d{2})|default)$' %
+                             '|'.join(TABLES))
+
+
+def is_partition_name(name):
+    """Whether name is that of a partition this module manages."""
+    return _PARTITION_NAME.match(name) is not None
+
+
+def month_start(when):
+    """Returns the first instant, in UTC, of the month containing when."""
+    when = when.astimezone(datetime.timezone.utc)
+    return datetime.datetime(when.year, when.month, 1,
+                             tzinfo=datetime.timezone.utc)
+
+
+def _next_month(month):
+    return month_start(month + datetime.timedelta(days=32))
+
+
+def _partition_name(table, month):
+    return '%s_p%04d_%02d' % (table, month.year, month.month)
+
+
+def is_partitioned(connection):
+    return connection.execute(
+        sa.text('SELECT EXISTS (SELECT 1 FROM pg_partitioned_table '
+                "WHERE partrelid = to_regclass('application'))")).scalar()
+
+
+def partition_months(connection):
+    """Returns the months that have partitions, in order."""
+    names = connection.execute(
+        sa.text('SELECT child.relname FROM pg_inherits '
+                'JOIN pg_class child ON child.oid = pg_inherits.inhrelid '
+                "WHERE inhparent = to_regclass('application')")).scalars()
+    months = []
+    for name in names:
+        match = _PARTITION_NAME.match(name)
+        if match.group(3):
+            months.append(
+                datetime.datetime(int(match.group(3)),
+                                  int(match.group(4)),
+                                  1,
+                                  tzinfo=datetime.timezone.utc))
+    return sorted(months)
+
+
+def _bounds(month):
+    return "FROM ('%s') TO ('%s')" % (ids.lower_bound(month),
+                                     ids.lower_bound(_next_month(month)))
+
+
+def create_partitions(connection, months_ahead=3, now=None):
+    """Creates the partitions for this month and the next months_ahead.
+
+    Each month is built as a plain table and then attached, which locks the
+    parent tables less than creating partitions of them directly. Rows that
+    went to the default partitions because their month had no partition yet
+    are moved into it first. Returns the months created.
+    """
+    existing = set(partition_months(connection))
+    month = month_start(now or datetime.datetime.now(datetime.timezone.utc))
+    created = []
+    for _ in range(months_ahead + 1):
+        if month not in existing:
+            _create_month(connection, month)
+            created.append(month)
+        month = _next_month(month)
+    return created
+
+
+def _create_month(connection, month):
+    lower, upper = ids.lower_bound(month), ids.lower_bound(_next_month(month))
+    # Children first, so that moving applications cascades to nothing.
+    for name in reversed(TABLES):
+        partition = _partition_name(name, month)
+        key = _PARTITION_KEYS[name]
+        connection.execute(
+            sa.text('CREATE TABLE %s (LIKE %s INCLUDING DEFAULTS)' %
+                    (partition, name)))
+        connection.execute(
+            sa.text('WITH moved AS (DELETE FROM %s_default '
+                    'WHERE %s >= CAST(:lower AS uuid) '
+                    'AND %s < CAST(:upper AS uuid) RETURNING *) '
+                    'INSERT INTO %s SELECT * FROM moved' %
+                    (name, key, key, partition)), {
+                        'lower': str(lower),
+                        'upper': str(upper)
+                    })
+    for name in TABLES:
+        connection.execute(
+            sa.text('ALTER TABLE %s ATTACH PARTITION %s FOR VALUES %s' %
+                    (name, _partition_name(name, month), _bounds(month))))
+
+
+def drop_expired(connection, expired_before):
+    """Drops the partitions of months that ended at or before expired_before.
+
+    Returns the months dropped.
+    """
+    dropped = []
+    for month in partition_months(connection):
+        if _next_month(month) > expired_before:
+            break
+        for name in reversed(TABLES):
+            partition = _partition_name(name, month)
+            connection.execute(
+                sa.text('ALTER TABLE %s DETACH PARTITION %s' %
+                        (name, partition)))
+            connection.execute(sa.text('DROP TABLE %s' % partition))
+        dropped.append(month)
+    return dropped
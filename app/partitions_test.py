@@ -0,0 +1,212 @@
+"""Test coverage for the monthly partitioning of the application tables."""
+from testing.flask_test_base import FlaskTest
+from testing.applications import STRONG_APPLICATION, WEAK_APPLICATION
+from app import db, ids, partitions, retention
+from migrations import partitioning_b53ea58291bf as partitioning
+from sqlalchemy import event
+import datetime
+import sqlalchemy as sa
+import uuid
+
+# A random UUID, as applications had before their ids were time-ordered.
+_LEGACY_ID = 'f3d1c2b0-9a8e-4c7d-b6a5-948372615000'
+
+
+def _add_later_columns(connection):
+    """Adds the columns of migrations after the frozen partitioning one."""
+    connection.execute(
+        sa.text('ALTER TABLE application ADD COLUMN requested_terms integer[]'))
+
+
+def _plan_relations(plan):
+    if 'Relation Name' in plan:
+        yield plan['Relation Name']
+    for child in plan.get('Plans', []):
+        yield from _plan_relations(child)
+
+
+class PartitionTests(FlaskTest):
+
+    def setUp(self):
+        super().setUp()
+        self.now = datetime.datetime.now(datetime.timezone.utc)
+        self.user_url = '/users/%s' % self.post('/users', {
+            'name': 'steve'
+        }).json['id']
+        self.old_id = str(
+            ids.time_ordered_uuid(self.now - datetime.timedelta(days=200)))
+        self._rekey(self._apply(WEAK_APPLICATION), self.old_id)
+        partitioning.partition_tables(db.session.connection(), months_ahead=1)
+        _add_later_columns(db.session.connection())
+        db.session.commit()
+
+    def _apply(self, applicant_info):
+        return self.post(self.user_url + '/applications',
+                         applicant_info).json['id']
+
+    def _rekey(self, application_id, new_id):
+        """Gives an application and its child rows a different id."""
+        connection = db.session.connection()
+        parameters = {'old': application_id, 'new': new_id}
+        connection.execute(
+            sa.text('CREATE TEMPORARY TABLE rekeyed AS '
+                    'SELECT * FROM application WHERE id = :old'), parameters)
+        connection.execute(sa.text('UPDATE rekeyed SET id = :new'),
+                           parameters)
+        connection.execute(
+            sa.text('INSERT INTO application SELECT * FROM rekeyed'))
+        for table in partitions.TABLES[1:]:
+            connection.execute(
+                sa.text('UPDATE %s SET application_id = :new '
+                        'WHERE application_id = :old' % table), parameters)
+        connection.execute(sa.text('DELETE FROM application WHERE id = :old'),
+                           parameters)
+        connection.execute(sa.text('DROP TABLE rekeyed'))
+        db.session.commit()
+
+    def _partitions_holding(self, application_id):
+        """Returns the partition holding each of the application's rows."""
+        holding = set()
+        for table in partitions.TABLES:
+            key = 'id' if table == 'application' else 'application_id'
+            holding.update(
+                db.session.execute(
+                    sa.text('SELECT tableoid::regclass::text FROM %s '
+                            'WHERE %s = :id' % (table, key)), {
+                                'id': application_id
+                            }).scalars())
+        return holding
+
+    def _month_partitions(self, month):
+        return {'%s_p%s' % (table, month.strftime('%Y_%m'))
+                for table in partitions.TABLES}
+
+    def test_partitions_months_through_months_ahead(self):
+        months = partitions.partition_months(db.session.connection())
+        self.assertEqual(months[0], partitions.month_start(
+            ids.created_at(uuid.UUID(self.old_id))))
+        self.assertEqual(months[-1], partitions.month_start(
+            self.now + datetime.timedelta(days=31)))
+        self.assertEqual(self._partitions_holding(self.old_id),
+                         {'application_p%s' % months[0].strftime('%Y_%m'),
+                          'applicant_info_p%s' % months[0].strftime('%Y_%m'),
+                          'rejection_p%s' % months[0].strftime('%Y_%m')})
+
+    def test_routes_read_one_month_partition(self):
+        application_id = self._apply(STRONG_APPLICATION)
+        self.assertTrue(
+            self._partitions_holding(application_id).issubset(
+                self._month_partitions(self.now)))
+
+        executed = []
+
+        def record(conn, cursor, statement, parameters, context,
+                   executemany):
+            executed.append((statement, parameters))
+
+        application_url = self.user_url + '/applications/' + application_id
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            response = self.get(application_url)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json['offers'])
+        (statement, parameters), = executed
+        plan = db.session.connection().exec_driver_sql(
+            'EXPLAIN (FORMAT JSON) ' + statement, parameters).scalar()[0]
+        self.assertTrue(
+            set(_plan_relations(plan['Plan'])).issubset(
+                self._month_partitions(self.now)))
+
+        response = self.put(application_url, WEAK_APPLICATION)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json['rejections'])
+        self.assertEqual(self.delete(application_url).status_code, 204)
+        self.assertEqual(self._partitions_holding(application_id), set())
+
+    def test_legacy_ids_use_default_partitions(self):
+        self._rekey(self._apply(STRONG_APPLICATION), _LEGACY_ID)
+        self.assertEqual(
+            self._partitions_holding(_LEGACY_ID),
+            {'application_default', 'applicant_info_default', 'offer_default'})
+        response = self.get(self.user_url + '/applications/' + _LEGACY_ID)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json['id'], _LEGACY_ID)
+
+    def test_create_partitions_moves_rows_from_default(self):
+        later = self.now + datetime.timedelta(days=93)
+        later_id = str(ids.time_ordered_uuid(later))
+        self._rekey(self._apply(STRONG_APPLICATION), later_id)
+        self.assertEqual(
+            self._partitions_holding(later_id),
+            {'application_default', 'applicant_info_default', 'offer_default'})
+
+        created = partitions.create_partitions(db.session.connection(),
+                                               months_ahead=4)
+        db.session.commit()
+        self.assertEqual(len(created), 3)
+        self.assertIn(partitions.month_start(later), created)
+        self.assertTrue(
+            self._partitions_holding(later_id).issubset(
+                self._month_partitions(later)))
+        self.assertEqual(
+            self.get(self.user_url + '/applications/' +
+                     later_id).status_code, 200)
+        self.assertEqual(
+            partitions.create_partitions(db.session.connection(),
+                                         months_ahead=4), [])
+
+    def test_drop_expired(self):
+        current_id = self._apply(STRONG_APPLICATION)
+        dropped = partitions.drop_expired(db.session.connection(),
+                                          retention.cutoff(100))
+        db.session.commit()
+        self.assertTrue(dropped)
+        self.assertEqual(dropped[0], partitions.month_start(
+            ids.created_at(uuid.UUID(self.old_id))))
+        self.assertEqual(self._partitions_holding(self.old_id), set())
+        self.assertEqual(
+            self.get(self.user_url + '/applications/' +
+                     self.old_id).status_code, 404)
+        self.assertEqual(
+            self.get(self.user_url + '/applications/' +
+                     current_id).status_code, 200)
+        self.assertEqual(
+            partitions.partition_months(db.session.connection())[0],
+            partitions.month_start(retention.cutoff(100)))
+
+    def test_unpartition(self):
+        current_id = self._apply(STRONG_APPLICATION)
+        partitioning.unpartition_tables(db.session.connection())
+        _add_later_columns(db.session.connection())
+        db.session.commit()
+        self.assertFalse(partitions.is_partitioned(db.session.connection()))
+        self.assertEqual(self._partitions_holding(current_id),
+                         {'application', 'applicant_info', 'offer'})
+        self.assertEqual(
+            self.get(self.user_url + '/applications/' +
+                     self.old_id).status_code, 200)
+        self.assertEqual(self.delete(self.user_url).status_code, 204)
+        self.assertEqual(
+            db.session.execute(
+                sa.text('SELECT count(*) FROM applicant_info')).scalar(), 0)
+
+    def test_commands(self):
+        runner = self.app.test_cli_runner()
+        result = runner.invoke(
+            args=['partitions', 'create', '--months-ahead', '2'])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn('Created partitions for 1 months', result.output)
+
+        result = runner.invoke(
+            args=['partitions', 'drop-expired', '--retention-days', '100'])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertNotIn('for 0 months', result.output)
+
+        partitioning.unpartition_tables(db.session.connection())
+        _add_later_columns(db.session.connection())
+        db.session.commit()
+        result = runner.invoke(args=['partitions', 'create'])
+        self.assertEqual(result.exit_code, 1)
+        self.assertIn('not partitioned', result.output)
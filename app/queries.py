@@ -0,0 +1,28 @@
+"""Shared lookups for the API routes."""
+from app import db, models
+
+
+def get_user_application(user_id, application_id):
+    """Returns the application with application_id if user_id owns it.
+
+    The application and its applicant info, offers and rejections are read
+    in one query; an application can have offers or rejections, not both, so
+    joining them never multiplies rows. Returns None when there is no such
+    application or it belongs to another user.
+    """
+    return models.Application.query.filter_by(
+        id=application_id, user_id=user_id).options(
+            db.joinedload(models.Application.applicant_info_row),
+            db.joinedload(models.Application.offer_rows),
+            db.joinedload(models.Application.rejection_rows)).one_or_none()
+
+
+def delete_user_application(user_id, application_id):
+    """Deletes the application with application_id if user_id owns it.
+
+    One statement; the database cascades the delete to the application's
+    child rows. Returns whether an application was deleted.
+    """
+    return models.Application.query.filter_by(
+        id=application_id,
+        user_id=user_id).delete(synchronize_session=False) > 0
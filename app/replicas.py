@@ -0,0 +1,143 @@
+"""Routes the reads of GET requests to read-only replicas.
+
+Replicas are the binds in the app's SQLALCHEMY_BINDS whose keys start with
+'replica'; create_app adds one per URL in DATABASE_REPLICA_URLS. With none,
+every statement goes to the primary as before.
+
+At the start of a GET request, one replica whose lag is within the app's
+REPLICA_MAX_LAG_SECONDS is chosen at random, and the request's SELECTs are
+sent to it. Everything else stays on the primary: other requests, writes, and
+any statement that is not a SELECT. Once the session has flushed or written
+anything, its reads go to the primary too for the rest of the request, so it
+always reads its own writes. If every replica lags too far or cannot be
+reached, the request reads from the primary.
+
+A replica's lag is measured at most once every _LAG_CHECK_SECONDS per
+process, as the time since the last transaction it replayed, or zero when it
+is streaming from the primary and has replayed everything it has received. A
+replica that is not streaming has received nothing since it lost the
+primary, so it counts as lagging however recently it replayed. A database
+that is not in recovery, such as the primary itself standing in for a
+replica, has no lag.
+"""
+from flask import request
+from flask_sqlalchemy import SignallingSession, SQLAlchemy, get_state
+from sqlalchemy import orm
+import math
+import random
+import sqlalchemy as sa
+import time
+
+REPLICA_BIND_PREFIX = 'replica'
+
+_LAG_CHECK_SECONDS = 1.0
+
+# The WAL receiver's status is hidden from roles without pg_read_all_stats;
+# for those, a running WAL receiver counts as streaming.
+_LAG_QUERY = sa.text(
+    'SELECT pg_is_in_recovery(), '
+    'EXISTS (SELECT 1 FROM pg_stat_wal_receiver '
+    "WHERE coalesce(status, 'streaming') = 'streaming'), "
+    'pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn(), '
+    'extract(epoch FROM now() - pg_last_xact_replay_timestamp())')
+
+# Replica engine -> (monotonic time checked, lag in seconds or None).
+_lag_checks = {}
+
+
+class RoutingSession(SignallingSession):
+    """A session that sends SELECTs to the replica its info names."""
+
+    def get_bind(self, mapper=None, clause=None):
+        replica = self.info.get('replica')
+        if (replica is not None and not self.info.get('wrote') and
+                getattr(clause, 'is_select', False)):
+            return get_state(self.app).db.get_engine(self.app, bind=replica)
+        return super().get_bind(mapper, clause)
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+
+    def create_session(self, options):
+        session_factory = orm.sessionmaker(class_=RoutingSession,
+                                           db=self,
+                                           **options)
+        sa.event.listen(session_factory, 'before_flush', _record_write)
+        sa.event.listen(session_factory, 'do_orm_execute', _record_dml)
+        return session_factory
+
+
+def _record_write(session, flush_context, instances):
+    session.info['wrote'] = True
+
+
+def _record_dml(orm_execute_state):
+    if not orm_execute_state.is_select:
+        orm_execute_state.session.info['wrote'] = True
+
+
+def replica_binds(app):
+    return sorted(bind for bind in app.config['SQLALCHEMY_BINDS'] or ()
+                  if bind.startswith(REPLICA_BIND_PREFIX))
+
+
+def replication_lag(in_recovery, streaming, caught_up, seconds_since_replay):
+    """Returns the lag in seconds of a database in the given state, or None.
+
+    caught_up is whether it has replayed all the WAL it has received, and
+    seconds_since_replay the time since it last replayed a transaction, None
+    if it never has.
+    """
+    if not in_recovery:
+        return 0.0
+    if not streaming:
+        return math.inf
+    if caught_up:
+        return 0.0
+    return None if seconds_since_replay is None else float(
+        seconds_since_replay)
+
+
+def measure_lag(engine):
+    """Returns engine's replication lag in seconds, or None if unreachable."""
+    try:
+        with engine.connect() as connection:
+            state = connection.execute(_LAG_QUERY).one()
+    except sa.exc.DBAPIError:
+        return None
+    return replication_lag(*state)
+
+
+def _lag(engine):
+    checked_at, lag = _lag_checks.get(engine, (None, None))
+    now = time.monotonic()
+    if checked_at is None or now - checked_at >= _LAG_CHECK_SECONDS:
+        lag = measure_lag(engine)
+        _lag_checks[engine] = (now, lag)
+    return lag
+
+
+def choose_replica(db, app):
+    """Returns a replica bind fresh enough to read from, or None."""
+    fresh = []
+    for bind in replica_binds(app):
+        lag = _lag(db.get_engine(app, bind=bind))
+        if lag is not None and lag <= app.config['REPLICA_MAX_LAG_SECONDS']:
+            fresh.append(bind)
+    return random.choice(fresh) if fresh else None
+
+
+def init_app(app, db):
+    """Routes the reads of app's GET requests through db's session."""
+    if not replica_binds(app):
+        return
+
+    @app.before_request
+    def route_reads_to_replica():
+        if request.method in ('GET', 'HEAD'):
+            db.session.info['replica'] = choose_replica(db, app)
+
+    @app.teardown_request
+    def stop_routing_reads(exception):
+        db.session.info.pop('replica', None)
+        db.session.info.pop('wrote', None)
@@ -0,0 +1,138 @@
+"""Test coverage for routing GET requests' reads to replicas.
+
+The replicas are stand-ins: the test database again, opened with every
+transaction read-only, so any write routed to one fails.
+"""
+from testing.flask_test_base import FlaskTest
+from testing.applications import STRONG_APPLICATION
+from app import db, models, replicas
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from unittest import mock
+import os
+import sqlalchemy as sa
+
+
+def _read_only_url():
+    return str(
+        make_url(os.environ['DATABASE_URL']).update_query_dict(
+            {'options': '-c default_transaction_read_only=on'}))
+
+
+class ReplicaRoutingTests(FlaskTest):
+
+    def setUp(self):
+        environment = mock.patch.dict(
+            os.environ,
+            {'DATABASE_REPLICA_URLS': ','.join([_read_only_url()] * 2)})
+        environment.start()
+        self.addCleanup(environment.stop)
+        super().setUp()
+        self.user_id = self.post('/users', {'name': 'steve'}).json['id']
+        self.application_id = self.post(
+            '/users/%s/applications' % self.user_id,
+            STRONG_APPLICATION).json['id']
+        self.executed = []
+        for bind in [None] + replicas.replica_binds(self.app):
+            engine = db.get_engine(self.app, bind=bind)
+            event.listen(engine, 'before_cursor_execute',
+                         self._recorder(bind or 'primary'))
+
+    def _recorder(self, bind):
+
+        def record(conn, cursor, statement, parameters, context,
+                   executemany):
+            # Leaves out the lag checks, which go to every replica.
+            if 'pg_is_in_recovery' not in statement:
+                self.executed.append(bind)
+
+        return record
+
+    def _binds_used(self, method, *args):
+        del self.executed[:]
+        response = method(*args)
+        self.assertLess(response.status_code, 300, response.data)
+        return set(self.executed)
+
+    def test_gets_read_from_a_replica(self):
+        user_url = '/users/' + self.user_id
+        application_url = '%s/applications/%s' % (user_url,
+                                                  self.application_id)
+        for url in (user_url, user_url + '/applications', application_url):
+            with self.subTest(url=url):
+                binds = self._binds_used(self.get, url)
+                self.assertEqual(len(binds), 1)
+                self.assertTrue(binds.issubset(replicas.replica_binds(
+                    self.app)))
+        self.assertEqual(self.get(application_url).json['id'],
+                         self.application_id)
+
+        self.assertEqual(
+            self._binds_used(self.put, application_url, STRONG_APPLICATION),
+            {'primary'})
+        self.assertEqual(self._binds_used(self.delete, application_url),
+                         {'primary'})
+        self.assertEqual(
+            self._binds_used(self.post, user_url + '/applications',
+                             STRONG_APPLICATION), {'primary'})
+
+    def test_reads_follow_writes_to_the_primary(self):
+        db.session.info['replica'] = replicas.replica_binds(self.app)[0]
+        del self.executed[:]
+        models.User.query.get(self.user_id)
+        self.assertEqual(self.executed, ['replica_0'])
+
+        del self.executed[:]
+        db.session.add(models.User(name='new'))
+        self.assertEqual(models.User.query.filter_by(name='new').count(), 1)
+        self.assertEqual(set(self.executed), {'primary'})
+
+        del self.executed[:]
+        models.User.query.get(self.user_id)
+        self.assertEqual(self.executed, ['primary'])
+        db.session.rollback()
+
+    def test_statements_other_than_selects_use_the_primary(self):
+        db.session.info['replica'] = replicas.replica_binds(self.app)[0]
+        del self.executed[:]
+        db.session.execute(
+            sa.text('UPDATE users SET name = :name'), {'name': 'renamed'})
+        models.User.query.get(self.user_id)
+        self.assertEqual(self.executed, ['primary', 'primary'])
+        db.session.rollback()
+
+    def test_lagging_replicas_are_skipped(self):
+        lags = {
+            db.get_engine(self.app, bind='replica_0'): 60.0,
+            db.get_engine(self.app, bind='replica_1'): 0.5,
+        }
+        with mock.patch.object(replicas, 'measure_lag', lags.get):
+            for _ in range(5):
+                self.assertEqual(
+                    self._binds_used(self.get, '/users/' + self.user_id),
+                    {'replica_1'})
+
+    def test_falls_back_to_the_primary(self):
+        with mock.patch.object(replicas, 'measure_lag', return_value=None):
+            self.assertEqual(
+                self._binds_used(self.get, '/users/' + self.user_id),
+                {'primary'})
+
+    def test_replication_lag(self):
+        self.assertEqual(replicas.replication_lag(False, False, None, None),
+                         0.0)
+        self.assertEqual(replicas.replication_lag(True, True, True, 900), 0.0)
+        self.assertEqual(replicas.replication_lag(True, True, False, 2.5),
+                         2.5)
+        self.assertIsNone(replicas.replication_lag(True, True, False, None))
+        # A disconnected replica has replayed all it received, yet lags.
+        self.assertEqual(replicas.replication_lag(True, False, True, 0.1),
+                         float('inf'))
+
+    def test_measure_lag(self):
+        self.assertEqual(
+            replicas.measure_lag(db.get_engine(self.app, bind='replica_0')),
+            0.0)
+        unreachable = sa.create_engine(
+            make_url(os.environ['DATABASE_URL']).set(port=1))
+        self.assertIsNone(replicas.measure_lag(unreachable))
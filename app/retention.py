@@ -0,0 +1,58 @@
+"""Purges applications that are older than the retention period.
+
+Applications are deleted oldest first in small batches, each in its own
+transaction, so no batch holds locks for long or produces more WAL than
+replicas can apply between batches. The database cascades each delete to
+the application's applicant info, offers and rejections.
+"""
+from app import db, models
+import datetime
+import sqlalchemy as sa
+import time
+
+
+def cutoff(retention_days, now=None):
+    """Returns the creation time before which applications have expired."""
+    if now is None:
+        now = datetime.datetime.now(datetime.timezone.utc)
+    return now - datetime.timedelta(days=retention_days)
+
+
+def purge_expired(expired_before, batch_size=1000, pause=0.1):
+    """Deletes the applications created before expired_before.
+
+    Batches of at most batch_size applications are chosen by walking
+    (created_at, id) from where the previous batch ended, and pause seconds
+    are slept between batches. Must be called within an app context. Returns
+    a report dict of counts and throughput.
+    """
+    application = models.Application.__table__
+    report = {'purged': 0, 'batches': 0}
+    start = time.perf_counter()
+    after = None
+    while True:
+        batch = sa.select(application.c.id).where(
+            application.c.created_at < expired_before)
+        if after is not None:
+            batch = batch.where(
+                sa.tuple_(application.c.created_at, application.c.id) >
+                sa.tuple_(*after))
+        batch = batch.order_by(application.c.created_at,
+                               application.c.id).limit(batch_size)
+        deleted = db.session.execute(application.delete().where(
+            application.c.id.in_(batch)).returning(
+                application.c.created_at, application.c.id)).fetchall()
+        db.session.commit()
+        if not deleted:
+            break
+        report['purged'] += len(deleted)
+        report['batches'] += 1
+        after = tuple(max(deleted))
+        if len(deleted) < batch_size:
+            break
+        time.sleep(pause)
+
+    report['seconds'] = round(time.perf_counter() - start, 3)
+    report['rows_per_second'] = round(
+        report['purged'] / report['seconds']) if report['seconds'] else None
+    return report
@@ -0,0 +1,82 @@
+"""Test coverage for the retention purge."""
+from testing.flask_test_base import FlaskTest
+from testing.applications import STRONG_APPLICATION, WEAK_APPLICATION
+from app import db, models, retention
+from unittest import mock
+import datetime
+import json
+
+
+class RetentionTests(FlaskTest):
+
+    def setUp(self):
+        super().setUp()
+        user_id = self.post('/users', {'name': 'steve'}).json['id']
+        self.ids = []
+        for days_old in (400, 400, 200, 100, 10):
+            for applicant_info in (STRONG_APPLICATION, WEAK_APPLICATION):
+                application_id = self.post(
+                    '/users/%s/applications' % user_id,
+                    applicant_info).json['id']
+                self._age(application_id, days_old)
+                self.ids.append(application_id)
+
+    def _age(self, application_id, days):
+        models.Application.query.filter_by(id=application_id).update(
+            {'created_at': retention.cutoff(days)})
+        db.session.commit()
+
+    def _remaining(self):
+        return sorted(
+            str(application.id)
+            for application in models.Application.query.all())
+
+    def test_purges_only_expired_applications(self):
+        with mock.patch('time.sleep') as sleep:
+            report = retention.purge_expired(retention.cutoff(150),
+                                             batch_size=2,
+                                             pause=0.5)
+        self.assertEqual(report['purged'], 6)
+        self.assertEqual(report['batches'], 3)
+        self.assertIn('rows_per_second', report)
+        sleep.assert_called_with(0.5)
+        self.assertEqual(self._remaining(), sorted(self.ids[6:]))
+        # Children go with their applications.
+        self.assertEqual(models.ApplicantInfo.query.count(), 4)
+        self.assertEqual(models.Offer.query.count(), 2)
+        self.assertEqual(models.Rejection.query.filter(
+            models.Rejection.application_id.notin_(self.ids[6:])).count(), 0)
+
+    def test_nothing_expired(self):
+        report = retention.purge_expired(retention.cutoff(1000))
+        self.assertEqual(report['purged'], 0)
+        self.assertEqual(report['batches'], 0)
+        self.assertEqual(len(self._remaining()), len(self.ids))
+
+    def test_new_applications_are_stamped(self):
+        created_at = models.Application.query.get(self.ids[-1]).created_at
+        self.assertIsNotNone(created_at)
+        application_id = self.post(
+            '/users/%s/applications' % models.User.query.one().id,
+            STRONG_APPLICATION).json['id']
+        created_at = models.Application.query.get(application_id).created_at
+        self.assertLess(
+            datetime.datetime.now(datetime.timezone.utc) - created_at,
+            datetime.timedelta(minutes=1))
+
+    def test_command(self):
+        runner = self.app.test_cli_runner()
+        result = runner.invoke(args=['purge-expired'])
+        self.assertEqual(result.exit_code, 1)
+        self.assertIn('No retention period', result.output)
+
+        self.app.config['APPLICATION_RETENTION_DAYS'] = 300
+        result = runner.invoke(args=['purge-expired', '--pause', '0'])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertEqual(json.loads(result.output)['purged'], 4)
+
+        result = runner.invoke(
+            args=['purge-expired', '--retention-days', '50'])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertEqual(json.loads(result.output)['purged'], 4)
+        self.assertEqual(self._remaining(), sorted(self.ids[8:]))
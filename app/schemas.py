@@ -3,8 +3,13 @@
 All objects that the user sees or sends are represented as schemas.
 """
 
-from app import ma
-from marshmallow import Schema, fields, validate
+from app import ma, models
+from flask import url_for
+from marshmallow import Schema, ValidationError, fields, validate
+from webargs.fields import DelimitedList
+import base64
+import binascii
+import json
 
 _ERROR_MSG_TMPL = {
     'required': 'Missing data for required field \'{field_name}\'.',
@@ -41,6 +46,14 @@ applicant_info_schema = ApplicantInfoSchema()
 applicant_infos_schema = ApplicantInfoSchema(many=True)
 
 
+class UserApplicantInfoSchema(ApplicantInfoSchema):
+    user_id = fields.UUID(required=True,
+                          error_messages=_build_err_msg_dict('user_id'))
+
+
+user_applicant_infos_schema = UserApplicantInfoSchema(many=True)
+
+
 class OfferSchema(Schema):
     apr = fields.Float()
     monthly_payment = fields.Float()
@@ -51,15 +64,55 @@ offer_schema = OfferSchema()
 offers_schema = OfferSchema(many=True)
 
 
+class OfferTermsRequestSchema(Schema):
+    terms = DelimitedList(
+        fields.Integer(validate=validate.Range(min=1),
+                       error_messages=_build_err_msg_dict('terms')),
+        validate=validate.Length(min=1, max=12),
+        error_messages=_build_err_msg_dict('terms'))
+
+
+offer_terms_request_schema = OfferTermsRequestSchema()
+
+
 class RejectionSchema(Schema):
     reason = fields.Function(lambda obj: obj.reason.name)
 
 
+class MaximumLoanAmountRequestSchema(ApplicantInfoSchema,
+                                     OfferTermsRequestSchema):
+
+    class Meta:
+        exclude = ('loan_amount', )
+
+
+maximum_loan_amount_request_schema = MaximumLoanAmountRequestSchema()
+
+
+class MaximumLoanSchema(Schema):
+    apr = fields.Float()
+    term_length_months = fields.Integer()
+    loan_amount = fields.Float()
+    monthly_payment = fields.Float()
+
+
+class MaximumLoanAmountSchema(Schema):
+    maximum_loan_amount = fields.Float(allow_none=True)
+    offers = fields.Nested(MaximumLoanSchema, many=True)
+    rejections = fields.Function(lambda obj: [{
+        'reason': reason.name
+    } for reason in obj['rejection_reasons']])
+
+
+maximum_loan_amount_schema = MaximumLoanAmountSchema()
+
+
 class ApplicationSchema(Schema):
     id = fields.UUID()
     status = fields.Function(lambda obj: obj.status.name)
     applicant_info = fields.Nested(ApplicantInfoSchema)
     offer = fields.Nested(OfferSchema)
+    offers = fields.Nested(OfferSchema, many=True)
     rejections = fields.Nested(RejectionSchema, many=True)
 
 
@@ -67,11 +120,60 @@ application_schema = ApplicationSchema()
 applications_schema = ApplicationSchema(many=True)
 
 
+def encode_cursor(values):
+    """Packs a dict of JSON-serializable values into an opaque cursor."""
+    packed = json.dumps(values, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(packed).rstrip(b'=').decode()
+
+
+class Cursor(fields.Field):
+    """An opaque pagination cursor made by encode_cursor.
+
+    Deserializes to a dict loaded with a schema built from `cursor_fields`.
+    """
+    default_error_messages = {'invalid': 'Invalid cursor.'}
+
+    def __init__(self, cursor_fields, **kwargs):
+        super().__init__(**kwargs)
+        self.cursor_schema = Schema.from_dict(cursor_fields)()
+
+    def _deserialize(self, value, attr, data, **kwargs):
+        try:
+            packed = base64.urlsafe_b64decode(value + '=' * (-len(value) % 4))
+            return self.cursor_schema.load(json.loads(packed))
+        except (binascii.Error, TypeError, ValueError, ValidationError):
+            raise self.make_error('invalid')
+
+
+class ApplicationListRequestSchema(Schema):
+    limit = fields.Integer(load_default=50,
+                           validate=validate.Range(min=1, max=500),
+                           error_messages=_build_err_msg_dict('limit'))
+    cursor = Cursor({'id': fields.UUID(required=True)})
+
+
+application_list_request_schema = ApplicationListRequestSchema()
+
+
+class ApplicationExportRequestSchema(Schema):
+    status = fields.String(validate=validate.OneOf(
+        [status.name for status in models.ApplicationStatus]),
+                           error_messages=_build_err_msg_dict('status'))
+    min_id = fields.UUID(error_messages=_build_err_msg_dict('min_id'))
+    max_id = fields.UUID(error_messages=_build_err_msg_dict('max_id'))
+    cursor = Cursor({'id': fields.UUID(required=True)})
+    gzip = fields.Boolean(load_default=False)
+
+
+application_export_request_schema = ApplicationExportRequestSchema()
+
+
 class UserSchema(Schema):
     name = fields.String()
     id = fields.UUID()
-    applications = fields.Nested(
-        ApplicationSchema(only=('id', 'status'), many=True))
+    application_count = fields.Integer()
+    applications_url = fields.Function(lambda obj: url_for(
+        'api.list_applications', user_id=obj.id))
 
 
 user_schema = UserSchema()
@@ -89,4 +191,5 @@ class UserUpdateRequestSchema(Schema):
 
 
 user_create_request_schema = UserCreateRequestSchema()
+user_create_requests_schema = UserCreateRequestSchema(many=True)
 user_update_request_schema = UserUpdateRequestSchema()
@@ -0,0 +1,114 @@
+"""Specialized dump functions compiled from the response schemas.
+
+Marshmallow walks every field of every schema, through several layers of
+indirection, on each dump. compile_schema instead generates, once, the source
+of a plain Python function for one schema instance: attribute reads,
+`str`/`int`/`float` conversions, direct calls to `fields.Function` callables
+and nested functions compiled the same way. Fields it has no specialization
+for are serialized through the field itself, so output always equals
+`schema.dump(obj)` for objects. Dicts are not supported: every schema
+compiled here dumps models or the views in app.bulk.
+"""
+from flask import current_app, jsonify as flask_jsonify
+from marshmallow import decorators, fields, missing, utils
+from app import schemas
+import json
+
+_CONVERSIONS = {
+    fields.UUID: 'str',
+    fields.String: 'str',
+    fields.Integer: 'int',
+    fields.Float: 'float',
+}
+
+
+def _conversion(field):
+    """Returns the builtin that serializes field, or None to use the field."""
+    if field.dump_default is not missing or getattr(field, 'as_string', False):
+        return None
+    return _CONVERSIONS.get(type(field))
+
+
+def _is_plain_function(field):
+    # Functions that also take the schema context go through the field.
+    return (type(field) is fields.Function and field.serialize_func is not None
+            and len(utils.get_func_args(field.serialize_func)) == 1)
+
+
+def _compile_fields(schema, name, namespace):
+    """Adds a function `name` that dumps one object to namespace."""
+    if schema._has_processors(decorators.PRE_DUMP) or \
+            schema._has_processors(decorators.POST_DUMP):
+        namespace[name] = lambda obj: schema.dump(obj, many=False)
+        return
+    lines = ['def %s(obj):' % name, '    out = {}']
+    for index, (field_name, field) in enumerate(schema.dump_fields.items()):
+        key = field.data_key or field_name
+        attribute = field.attribute or field_name
+        reference = 'field_%s_%d' % (name, index)
+        namespace[reference] = field
+        if _is_plain_function(field):
+            namespace[reference + '_func'] = field.serialize_func
+            lines.append('    out[%r] = %s_func(obj)' % (key, reference))
+            continue
+        conversion = _conversion(field)
+        nested = type(field) is fields.Nested and field.dump_default is missing
+        if '.' in attribute or (conversion is None and not nested):
+            namespace['schema_' + name] = schema
+            lines.append('    value = %s.serialize(%r, obj, '
+                         'accessor=schema_%s.get_attribute)' %
+                         (reference, attribute, name))
+            lines.append('    if value is not missing:')
+            lines.append('        out[%r] = value' % key)
+            continue
+        lines.append('    value = getattr(obj, %r, missing)' % attribute)
+        lines.append('    if value is not missing:')
+        if conversion is not None:
+            expression = '%s(value)' % conversion
+        else:
+            nested_name = name + '_' + field_name
+            _compile_fields(field.schema, nested_name, namespace)
+            if field.schema.many or field.many:
+                expression = '[%s(item) for item in value]' % nested_name
+            else:
+                expression = '%s(value)' % nested_name
+        lines.append('        out[%r] = None if value is None else %s' %
+                     (key, expression))
+    lines.append('    return out')
+    exec(compile('\n'.join(lines), '<serializer %s>' % name, 'exec'),
+         namespace)
+
+
+def compile_schema(schema):
+    """Returns a function equivalent to schema.dump for objects."""
+    namespace = {'missing': missing}
+    _compile_fields(schema, 'dump_one', namespace)
+    dump_one = namespace['dump_one']
+    if schema.many:
+        return lambda objs: [dump_one(obj) for obj in objs]
+    return dump_one
+
+
+dump_application = compile_schema(schemas.application_schema)
+dump_applications = compile_schema(schemas.applications_schema)
+dump_user = compile_schema(schemas.user_schema)
+dump_users = compile_schema(schemas.users_schema)
+
+# The C encoder with the arguments flask.jsonify uses by default. The dump
+# functions only produce JSON-native types, so Flask's encoder class, which
+# adds support for dates, UUIDs and the like, is never needed.
+_encode = json.JSONEncoder(separators=(',', ':'), sort_keys=True).encode
+
+
+def jsonify(data):
+    """flask.jsonify for data made by the dump functions above.
+
+    Produces the same bytes, deferring to flask.jsonify whenever the app is
+    configured away from jsonify's defaults.
+    """
+    config = current_app.config
+    if (current_app.debug or config['JSONIFY_PRETTYPRINT_REGULAR']
+            or not config['JSON_SORT_KEYS'] or not config['JSON_AS_ASCII']):
+        return flask_jsonify(data)
+    return current_app.response_class(_encode(data) + '\n',
+                                      mimetype=config['JSONIFY_MIMETYPE'])
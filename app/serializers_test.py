@@ -0,0 +1,93 @@
+"""Test coverage for the compiled response serializers."""
+from testing.flask_test_base import FlaskTest
+from testing.applications import STRONG_APPLICATION, WEAK_APPLICATION
+from app import bulk, models, schemas, serializers
+from flask import jsonify
+from marshmallow import Schema, fields, post_dump
+import collections
+import uuid
+
+_Thing = collections.namedtuple('_Thing', ['id', 'size', 'inner', 'label'])
+_Inner = collections.namedtuple('_Inner', ['name'])
+
+
+class _InnerSchema(Schema):
+    name = fields.String()
+
+    @post_dump
+    def shout(self, data, **kwargs):
+        return {'name': data['name'].upper()}
+
+
+class _ThingSchema(Schema):
+    id = fields.UUID()
+    size = fields.Integer(as_string=True)
+    inner_name = fields.String(attribute='inner.name', data_key='innerName')
+    inner = fields.Nested(_InnerSchema)
+    label = fields.String(dump_default='none')
+    absent = fields.Float()
+    doubled = fields.Function(lambda obj, context: obj.size * context['by'])
+
+
+class SerializerTests(FlaskTest):
+
+    def setUp(self):
+        super().setUp()
+        self.user_id = self.post('/users', {'name': 'steve'}).json['id']
+        for applicant_info, terms in ((STRONG_APPLICATION, '24,36,60'),
+                                      (WEAK_APPLICATION, '36')):
+            self.post(
+                '/users/%s/applications?terms=%s' % (self.user_id, terms),
+                applicant_info)
+
+    def _assert_same_response(self, data, expected):
+        self.assertEqual(
+            serializers.jsonify(data).get_data(),
+            jsonify(expected).get_data())
+
+    def test_models_dump_identically(self):
+        applications = models.Application.query.all()
+        user = models.User.query.get(self.user_id)
+        with self.app.test_request_context():
+            self.assertEqual(serializers.dump_applications(applications),
+                             schemas.applications_schema.dump(applications))
+            self.assertEqual(serializers.dump_user(user),
+                             schemas.user_schema.dump(user))
+            for application in applications:
+                self._assert_same_response(
+                    serializers.dump_application(application),
+                    schemas.application_schema.dump(application))
+            self._assert_same_response(serializers.dump_users([user]),
+                                       schemas.users_schema.dump([user]))
+
+    def test_bulk_views_dump_identically(self):
+        views = bulk.score_and_insert_applications(
+            [self.user_id] * 2, [STRONG_APPLICATION, WEAK_APPLICATION])
+        users = bulk.insert_users(['anna', 'bo'])
+        with self.app.test_request_context():
+            self._assert_same_response(serializers.dump_applications(views),
+                                       schemas.applications_schema.dump(views))
+            self._assert_same_response(serializers.dump_users(users),
+                                       schemas.users_schema.dump(users))
+
+    def test_unspecialized_fields_go_through_marshmallow(self):
+        schema = _ThingSchema(context={'by': 2})
+        dump = serializers.compile_schema(schema)
+        thing = _Thing(id=uuid.uuid4(), size=3, inner=_Inner('x'), label=None)
+        self.assertEqual(dump(thing), schema.dump(thing))
+        self.assertEqual(dump(thing)['inner'], {'name': 'X'})
+        self.assertEqual(dump(thing)['innerName'], 'x')
+        self.assertNotIn('absent', dump(thing))
+
+    def test_jsonify_defers_to_flask_when_pretty_printing(self):
+        self.app.config['JSONIFY_PRETTYPRINT_REGULAR'] = True
+        with self.app.test_request_context():
+            self.assertEqual(
+                serializers.jsonify({
+                    'b': 1,
+                    'a': [1.5, None]
+                }).get_data(),
+                jsonify({
+                    'b': 1,
+                    'a': [1.5, None]
+                }).get_data())
@@ -0,0 +1,122 @@
+"""Compiled fast-path request loading for flat numeric schemas.
+
+webargs hands every request body to marshmallow, which walks the schema's
+fields and error-message machinery even when the payload is fine.
+compile_loader generates, once, a function that loads a JSON object in one
+pass when it can prove marshmallow would produce the same result: exactly
+the schema's keys, with `int` values for Integer fields and finite `int` or
+`float` values for Float fields. It returns None for anything else, and
+use_args then parses the request the normal webargs way, which builds the
+exact same 422 body the app's error handler has always returned.
+"""
+from marshmallow import decorators, fields
+from webargs import core
+from webargs.flaskparser import is_json_request, use_args as webargs_use_args
+from flask import request
+import functools
+
+# Integers beyond this many bits may not survive float() exactly, or at all;
+# they go through marshmallow instead.
+_FLOAT_SAFE_BITS = 53
+
+_INTEGER_TEMPLATE = '''\
+        if type(value) is not int:
+            return None
+        out[%(attribute)r] = value'''
+
+_FLOAT_TEMPLATE = '''\
+        if type(value) is float:
+            if value - value != 0.0:  # NaN or infinity
+                return None
+        elif type(value) is int and value.bit_length() <= %(bits)d:
+            value = float(value)
+        else:
+            return None
+        out[%(attribute)r] = value'''
+
+
+def _template(field):
+    if field.validators:
+        return None
+    if type(field) is fields.Integer:
+        return _INTEGER_TEMPLATE
+    if type(field) is fields.Float:
+        return _FLOAT_TEMPLATE
+    return None
+
+
+def compile_loader(schema):
+    """Returns a fast loader for schema, or None if it cannot have one.
+
+    The loader takes decoded JSON and returns the dict schema.load would, or
+    None when the payload must go through marshmallow.
+    """
+    if schema.many or any(
+            schema._has_processors(tag)
+            for tag in (decorators.PRE_LOAD, decorators.POST_LOAD,
+                        decorators.VALIDATES_SCHEMA)):
+        return None
+    load_fields = schema.load_fields
+    templates = {name: _template(field) for name, field in load_fields.items()}
+    if not load_fields or None in templates.values():
+        return None
+
+    keys = tuple(field.data_key or name for name, field in load_fields.items())
+    lines = ['def load(data):', '    if type(data) is not dict:',
+             '        return None']
+    if schema.partial is True:
+        lines += ['    if not data.keys() <= KEYS:', '        return None']
+    elif not schema.partial and all(
+            field.required for field in load_fields.values()):
+        lines += ['    if len(data) != %d:' % len(keys), '        return None']
+    else:
+        return None
+    lines.append('    out = {}')
+    for (name, field), key in zip(load_fields.items(), keys):
+        lines += [
+            '    value = data.get(%r, MISSING)' % key,
+            '    if value is not MISSING:',
+        ]
+        lines.append(templates[name] % {
+            'attribute': field.attribute or name,
+            'bits': _FLOAT_SAFE_BITS,
+        })
+        if schema.partial is not True:
+            lines += ['    else:', '        return None']
+    lines.append('    return out')
+
+    namespace = {'KEYS': frozenset(keys), 'MISSING': object()}
+    exec(compile('\n'.join(lines), '<loader %s>' % type(schema).__name__,
+                 'exec'), namespace)
+    return namespace['load']
+
+
+def use_args(schema):
+    """webargs' use_args for JSON bodies, with a compiled fast path.
+
+    Loaded arguments are passed the way webargs passes them, after any other
+    positional arguments.
+    """
+    load = compile_loader(schema)
+
+    def decorator(func):
+        parse_with_webargs = webargs_use_args(schema)(func)
+        if load is None:
+            return parse_with_webargs
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            loaded = None
+            if is_json_request(request):
+                try:
+                    loaded = load(core.parse_json(
+                        request.get_data(cache=True)))
+                except ValueError:
+                    pass
+            if loaded is None:
+                return parse_with_webargs(*args, **kwargs)
+            return func(*args, loaded, **kwargs)
+
+        return wrapper
+
+    return decorator
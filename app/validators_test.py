@@ -0,0 +1,124 @@
+"""Test coverage for the compiled request loaders."""
+from testing.flask_test_base import FlaskTest
+from testing.applications import STRONG_APPLICATION
+from app import schemas, validators
+from marshmallow import ValidationError
+from unittest import mock
+import json
+import unittest
+
+# Each is merged over STRONG_APPLICATION; None values delete the key.
+_VARIANTS = [
+    {},
+    {'monthly_debt': 12.5, 'vehicle_value': 2000.75},
+    {'monthly_income': 2**53},
+    {'monthly_income': 2**80},
+    {'monthly_income': 10**400},
+    {'credit_score': 700.0},
+    {'credit_score': 700.5},
+    {'credit_score': '700'},
+    {'credit_score': True},
+    {'monthly_debt': False},
+    {'monthly_debt': '12.5'},
+    {'monthly_debt': float('nan')},
+    {'monthly_debt': float('inf')},
+    {'monthly_debt': [1]},
+    {'loan_amount': None},
+    {'unexpected': 1},
+]
+
+
+def _payload(variant):
+    payload = dict(STRONG_APPLICATION, **variant)
+    if 'loan_amount' in variant and variant['loan_amount'] is None:
+        del payload['loan_amount']
+    return payload
+
+
+def _marshmallow_load(schema, payload):
+    try:
+        return schema.load(payload)
+    except ValidationError:
+        return None
+
+
+class CompiledLoaderTests(unittest.TestCase):
+
+    def _assert_agrees_with_marshmallow(self, schema, payload):
+        loaded = validators.compile_loader(schema)(payload)
+        if loaded is not None:
+            expected = _marshmallow_load(schema, payload)
+            self.assertEqual(loaded, expected)
+            self.assertEqual([type(value) for value in loaded.values()],
+                             [type(expected[key]) for key in loaded])
+        return loaded
+
+    def test_agrees_with_marshmallow(self):
+        for schema in (schemas.ApplicantInfoSchema(),
+                       schemas.ApplicantInfoSchema(partial=True)):
+            for variant in _VARIANTS:
+                with self.subTest(partial=schema.partial, variant=variant):
+                    self._assert_agrees_with_marshmallow(
+                        schema, _payload(variant))
+            for payload in ([], 'x', None, {}, {'credit_score': 700}):
+                with self.subTest(partial=schema.partial, payload=payload):
+                    self._assert_agrees_with_marshmallow(schema, payload)
+
+    def test_common_payloads_take_the_fast_path(self):
+        load = validators.compile_loader(schemas.ApplicantInfoSchema())
+        self.assertIsNotNone(load(STRONG_APPLICATION))
+        self.assertIsNotNone(load(_payload(_VARIANTS[1])))
+        self.assertIsNone(load(_payload({'credit_score': '700'})))
+        self.assertIsNone(load(_payload({'loan_amount': None})))
+
+        load = validators.compile_loader(
+            schemas.ApplicantInfoSchema(partial=True))
+        self.assertEqual(load({}), {})
+        self.assertEqual(load({'monthly_debt': 3}), {'monthly_debt': 3.0})
+
+    def test_schemas_it_cannot_prove_are_not_compiled(self):
+        self.assertIsNone(
+            validators.compile_loader(schemas.user_create_request_schema))
+        self.assertIsNone(
+            validators.compile_loader(schemas.applicant_infos_schema))
+        self.assertIsNone(
+            validators.compile_loader(
+                schemas.maximum_loan_amount_request_schema))
+
+
+class UseArgsTests(FlaskTest):
+
+    def setUp(self):
+        super().setUp()
+        self.user_id = self.post('/users', {'name': 'steve'}).json['id']
+
+    def _submit(self, payload):
+        return self.client.post('/users/%s/applications' % self.user_id,
+                                headers=self.get_api_headers(),
+                                data=payload)
+
+    def test_fast_path_skips_marshmallow(self):
+        with mock.patch.object(schemas.ApplicantInfoSchema,
+                               'load') as schema_load:
+            response = self.post('/users/%s/applications' % self.user_id,
+                                 STRONG_APPLICATION)
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(schema_load.called)
+        self.assertEqual(response.json['applicant_info'], STRONG_APPLICATION)
+
+    def test_other_payloads_get_marshmallow_behaviour(self):
+        response = self.post('/users/%s/applications' % self.user_id,
+                             _payload({'credit_score': '1000'}))
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json['applicant_info']['credit_score'],
+                         1000)
+
+        response = self._submit(
+            json.dumps(_payload({'monthly_debt': float('nan')})))
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(response.json['messages'],
+                         {'monthly_debt': ['Special numeric values (nan or '
+                                           'infinity) are not permitted.']})
+
+        response = self._submit('{"credit_score": ')
+        self.assertEqual(response.status_code, 400)
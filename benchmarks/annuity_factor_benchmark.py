@@ -0,0 +1,60 @@
+"""Compares monthly payments from npf.pmt with the cached annuity factors.
+
+Run with `python -m benchmarks.annuity_factor_benchmark`. Exits non-zero if
+any payment differs from the npf.pmt result by half a cent or more.
+"""
+from constants import constants
+from engine import policy as lending_policy
+import numpy as np
+import numpy_financial as npf
+import sys
+import timeit
+
+_SAMPLE_SIZE = 100000
+
+
+def _sample_loans(count, seed=0):
+    rng = np.random.default_rng(seed)
+    aprs = rng.choice([band['apr'] for band in constants.CREDIT_BANDS], count)
+    principals = np.round(rng.uniform(1000, 100000, count), 2)
+    return [(float(apr), float(principal))
+            for apr, principal in zip(aprs, principals)]
+
+
+def _pmt_payments(loans, term):
+    return [-1 * npf.pmt(apr / 12, term, principal) for apr, principal in loans]
+
+
+def _cached_payments(loans, term):
+    return [
+        principal * lending_policy.annuity_factor(apr, term)
+        for apr, principal in loans
+    ]
+
+
+def main():
+    term = constants.LOAN_LENGTH_IN_MONTHS
+    loans = _sample_loans(_SAMPLE_SIZE)
+
+    pmt_seconds = min(
+        timeit.repeat(lambda: _pmt_payments(loans, term), number=1, repeat=3))
+    cached_seconds = min(
+        timeit.repeat(lambda: _cached_payments(loans, term),
+                      number=1,
+                      repeat=3))
+    print('npf.pmt:        %8.0f payments/s' % (_SAMPLE_SIZE / pmt_seconds))
+    print('annuity factor: %8.0f payments/s' % (_SAMPLE_SIZE / cached_seconds))
+    print('speedup:        %8.1fx' % (pmt_seconds / cached_seconds))
+
+    differences = np.abs(
+        np.array(_pmt_payments(loans, term)) -
+        np.array(_cached_payments(loans, term)))
+    print('max difference: %.3e' % differences.max())
+    if differences.max() >= 0.005:
+        print('Payments do not match to the cent.')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,80 @@
+"""Times deleting users with many applications.
+
+Run with `python -m benchmarks.cascade_delete_benchmark` and DATABASE_URL set
+to a migrated database. For each size, seeds a user with that many
+normalized applications and deletes it twice: once by loading and deleting
+every object through the ORM, the way the API used to, and once through
+DELETE /users/<id>, which leaves the cascade to the database.
+"""
+from app import bulk, db, models
+from tenet import app
+import random
+import sys
+import time
+import warnings
+
+_SIZES = (10, 1000, 10000)
+
+_APPLICANT_INFO = {
+    'bankruptcies': 0,
+    'monthly_debt': 100,
+    'loan_amount': 10000,
+    'vehicle_value': 20000,
+    'monthly_income': 5000,
+    'delinquencies': 0,
+}
+
+
+def _seed_user(application_count, rng):
+    user_id = bulk.insert_users(['benchmark'])[0].id
+    bulk.score_and_insert_applications(
+        [user_id] * application_count, [
+            dict(_APPLICANT_INFO, credit_score=rng.randint(300, 1000))
+            for _ in range(application_count)
+        ])
+    db.session.commit()
+    return user_id
+
+
+def _delete_with_orm(user_id):
+    user = models.User.query.get(user_id)
+    for application in user.applications:
+        children = list(application.offer_rows) + list(
+            application.rejection_rows)
+        if application.applicant_info_row is not None:
+            children.append(application.applicant_info_row)
+        for child in children:
+            db.session.delete(child)
+        db.session.delete(application)
+    db.session.delete(user)
+    db.session.commit()
+
+
+def _delete_with_route(user_id):
+    response = app.test_client().delete('/users/%s' % user_id)
+    assert response.status_code == 204, response.status_code
+
+
+def _seconds(delete, user_id):
+    start = time.perf_counter()
+    delete(user_id)
+    return time.perf_counter() - start
+
+
+def main():
+    # Batched executemany DELETEs report unreliable row counts; the rows are
+    # all deleted regardless.
+    warnings.filterwarnings('ignore', message='DELETE statement on table')
+    rng = random.Random(0)
+    app.config['COMPACT_APPLICATION_STORAGE'] = False
+    print('%12s %12s %12s' % ('applications', 'ORM cascade', 'DB cascade'))
+    with app.app_context():
+        for size in _SIZES:
+            orm = _seconds(_delete_with_orm, _seed_user(size, rng))
+            route = _seconds(_delete_with_route, _seed_user(size, rng))
+            print('%12d %11.3fs %11.3fs' % (size, orm, route))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,99 @@
+"""Compares the compiled serializers with marshmallow's schema.dump.
+
+Run with `python -m benchmarks.serializer_benchmark` and DATABASE_URL set (no
+connection is made). Builds transient applications like the ones the routes
+return, times dumping each of them and encoding the result, and exits
+non-zero if any response body differs from the flask.jsonify one.
+"""
+from app import models, schemas, serializers
+from flask import jsonify
+from tenet import app
+import random
+import sys
+import timeit
+import uuid
+
+_SAMPLE_SIZE = 10000
+
+
+def _sample_applications(count, seed=0):
+    rng = random.Random(seed)
+    applications = []
+    for _ in range(count):
+        application = models.Application(
+            id=uuid.uuid4(),
+            user_id=uuid.uuid4(),
+            applicant_info_row=models.ApplicantInfo(
+                credit_score=rng.randint(300, 1000),
+                monthly_debt=rng.uniform(0, 3000),
+                monthly_income=rng.uniform(1000, 20000),
+                bankruptcies=rng.randint(0, 2),
+                delinquencies=rng.randint(0, 3),
+                vehicle_value=rng.uniform(5000, 50000),
+                loan_amount=rng.uniform(1000, 60000)))
+        if rng.random() < 0.5:
+            application.status = models.ApplicationStatus.APPROVED
+            application.offer_rows = [
+                models.Offer(apr=0.05,
+                             monthly_payment=rng.uniform(50, 2000),
+                             term_length_months=term)
+                for term in rng.sample([24, 36, 48, 60], rng.randint(1, 3))
+            ]
+        else:
+            application.status = models.ApplicationStatus.DECLINED
+            application.rejection_rows = [
+                models.Rejection(reason=reason) for reason in rng.sample(
+                    list(models.RejectionReason), rng.randint(1, 3))
+            ]
+        applications.append(application)
+    return applications
+
+
+def _marshmallow_bodies(applications):
+    return [
+        jsonify(schemas.application_schema.dump(application)).get_data()
+        for application in applications
+    ]
+
+
+def _compiled_bodies(applications):
+    return [
+        serializers.jsonify(
+            serializers.dump_application(application)).get_data()
+        for application in applications
+    ]
+
+
+def _rate(function, *args):
+    seconds = min(timeit.repeat(lambda: function(*args), number=1, repeat=3))
+    return _SAMPLE_SIZE / seconds
+
+
+def main():
+    applications = _sample_applications(_SAMPLE_SIZE)
+    with app.test_request_context():
+        rates = [
+            ('schema.dump', _rate(
+                lambda: [schemas.application_schema.dump(a)
+                         for a in applications])),
+            ('compiled dump', _rate(
+                lambda: [serializers.dump_application(a)
+                         for a in applications])),
+            ('dump + flask.jsonify', _rate(_marshmallow_bodies, applications)),
+            ('compiled + jsonify', _rate(_compiled_bodies, applications)),
+        ]
+        for name, rate in rates:
+            print('%-22s %8.0f applications/s' % (name + ':', rate))
+        print('dump speedup:          %8.1fx' % (rates[1][1] / rates[0][1]))
+        print('response speedup:      %8.1fx' % (rates[3][1] / rates[2][1]))
+
+        mismatches = sum(
+            expected != actual
+            for expected, actual in zip(_marshmallow_bodies(applications),
+                                        _compiled_bodies(applications)))
+    print('mismatched bodies:     %8d' % mismatches)
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
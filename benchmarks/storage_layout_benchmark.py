@@ -0,0 +1,75 @@
+"""Compares writing decisions in the normalized and compact layouts.
+
+Run with `python -m benchmarks.storage_layout_benchmark` and DATABASE_URL set
+to a migrated database. Scores and inserts the same applications in each
+layout through bulk.score_and_insert_applications, reports the rows and index
+entries written and the insert rate, and rolls everything back.
+"""
+from app import bulk, db, models
+from tenet import app
+import random
+import sys
+import time
+
+_SAMPLE_SIZE = 20000
+
+
+def _sample_applicant_infos(count, seed=0):
+    rng = random.Random(seed)
+    return [{
+        'credit_score': rng.randint(300, 1000),
+        'monthly_debt': rng.uniform(0, 3000),
+        'monthly_income': rng.uniform(1000, 20000),
+        'bankruptcies': rng.randint(0, 2),
+        'delinquencies': rng.randint(0, 3),
+        'vehicle_value': rng.uniform(5000, 50000),
+        'loan_amount': rng.uniform(1000, 60000),
+    } for _ in range(count)]
+
+
+def _index_count(model):
+    return len(model.__table__.indexes) + sum(
+        1 for constraint in model.__table__.constraints
+        if isinstance(constraint,
+                      (db.PrimaryKeyConstraint, db.UniqueConstraint)))
+
+
+def _measure(applicant_infos, compact):
+    app.config['COMPACT_APPLICATION_STORAGE'] = compact
+    user_id = bulk.insert_users(['benchmark'])[0].id
+    start = time.perf_counter()
+    bulk.score_and_insert_applications([user_id] * len(applicant_infos),
+                                       applicant_infos)
+    db.session.flush()
+    seconds = time.perf_counter() - start
+    rows = entries = 0
+    for model in (models.Application, models.ApplicantInfo, models.Offer,
+                  models.Rejection):
+        count = model.query.count()
+        rows += count
+        entries += count * _index_count(model)
+    db.session.rollback()
+    return rows, entries, len(applicant_infos) / seconds
+
+
+def main():
+    applicant_infos = _sample_applicant_infos(_SAMPLE_SIZE)
+    with app.app_context():
+        # Compare against empty tables, so that only these rows are counted.
+        if models.Application.query.count():
+            print('Run against an empty database.')
+            return 1
+        results = [(name, _measure(applicant_infos, compact))
+                   for name, compact in (('normalized', False),
+                                         ('compact', True))]
+    for name, (rows, entries, rate) in results:
+        print('%-11s %6d rows %7d index entries %8.0f applications/s' %
+              (name + ':', rows, entries, rate))
+    (_, normalized), (_, compact) = results
+    print('rows written:   %5.1fx fewer' % (normalized[0] / compact[0]))
+    print('index entries:  %5.1fx fewer' % (normalized[1] / compact[1]))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,68 @@
+"""Compares random and time-ordered UUID primary keys.
+
+Run with `python -m benchmarks.uuid_key_benchmark` and DATABASE_URL set to a
+Postgres database. For each key generator, inserts the same number of rows
+into a scratch table shaped like offer, in small committed batches as the API
+writes them, and reports the insert rate and the size of the primary key
+index. Random keys split leaf pages all over the index, leaving them about
+two-thirds full, where time-ordered keys fill each page before starting the
+next. The scratch tables are dropped afterwards.
+"""
+from app import db, ids
+from tenet import app
+import sqlalchemy as sa
+import sys
+import time
+import uuid
+
+_ROW_COUNT = 500000
+_BATCH_SIZE = 100
+
+_GENERATORS = (('uuid4', uuid.uuid4), ('time-ordered', ids.time_ordered_uuid))
+
+
+def _scratch_table(name):
+    return sa.Table(name, sa.MetaData(),
+                    sa.Column('id', sa.dialects.postgresql.UUID,
+                              primary_key=True),
+                    sa.Column('application_id', sa.dialects.postgresql.UUID,
+                              nullable=False),
+                    sa.Column('apr', sa.Float, nullable=False))
+
+
+def _measure(table, generate):
+    connection = db.session.connection()
+    table.create(connection)
+    db.session.commit()
+    start = time.perf_counter()
+    for _ in range(_ROW_COUNT // _BATCH_SIZE):
+        application_id = str(generate())
+        db.session.execute(table.insert(), [{
+            'id': str(generate()),
+            'application_id': application_id,
+            'apr': 0.05,
+        } for _ in range(_BATCH_SIZE)])
+        db.session.commit()
+    seconds = time.perf_counter() - start
+    index = table.name + '_pkey'
+    size = db.session.execute(sa.text('SELECT pg_relation_size(:index)'),
+                              {'index': index}).scalar()
+    db.session.commit()
+    table.drop(db.session.connection())
+    db.session.commit()
+    return _ROW_COUNT / seconds, size
+
+
+def main():
+    print('%14s %12s %14s' % ('key', 'rows/s', 'pkey size'))
+    with app.app_context():
+        for name, generate in _GENERATORS:
+            table = _scratch_table('uuid_key_benchmark_' +
+                                   name.replace('-', '_'))
+            rate, size = _measure(table, generate)
+            print('%14s %12.0f %11.1f MB' % (name, rate, size / 2**20))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
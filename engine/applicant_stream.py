@@ -0,0 +1,33 @@
+"""Streams stored applicant inputs out of the database in column chunks."""
+from app import db, models
+from engine import application_processor as ap
+import numpy as np
+
+# Column chunks carry the application id followed by the applicant fields.
+COLUMNS = ('application_id', ) + ap.APPLICANT_FIELDS
+
+
+def iter_applicant_chunks(chunk_size=100000):
+    """Yields dicts of column name -> NumPy array for every applicant.
+
+    Covers applicant_info rows and compactly stored applications. Rows are
+    read through a server-side cursor, so only one chunk is held in memory at
+    a time. application_id values are uuid.UUID objects. Must be called
+    within an app context.
+    """
+    application = models.Application.__table__
+    query = db.union_all(
+        db.select([
+            getattr(models.ApplicantInfo, column) for column in COLUMNS
+        ]),
+        db.select([application.c.id.label('application_id')] + [
+            application.c[field] for field in ap.APPLICANT_FIELDS
+        ]).where(application.c.credit_score.isnot(None)),
+    ).execution_options(stream_results=True)
+    for rows in db.session.execute(query).partitions(chunk_size):
+        chunk = dict(zip(COLUMNS, zip(*rows)))
+        yield {
+            column: np.array(values, dtype=object)
+            if column == 'application_id' else np.array(values)
+            for column, values in chunk.items()
+        }
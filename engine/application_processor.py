@@ -1,52 +1,271 @@
 """Loan processing logic."""
-from constants import constants
-import numpy_financial as npf
+from collections import namedtuple
+import math
+import numpy as np
 from app import models
+from engine import policy as lending_policy
 
+# Rejection reasons in the order that process_application reports them.
+_REJECTION_REASON_ORDER = (
+    models.RejectionReason.EXCESSIVE_BANKRUPTCIES,
+    models.RejectionReason.EXCESSIVE_DELINQUENCIES,
+    models.RejectionReason.INSUFFICIENT_CREDIT_SCORE,
+    models.RejectionReason.EXCESSIVE_LOAN_TO_VALUE_RATIO,
+    models.RejectionReason.EXCESSIVE_DEBT_TO_INCOME_RATIO,
+)
 
-def process_application(applicant_info):
-    """Returns a tuple containing either an offer or a list of rejection reasons."""
+# The applicant inputs that every decision is based on.
+APPLICANT_FIELDS = ('credit_score', 'monthly_debt', 'monthly_income',
+                    'bankruptcies', 'delinquencies', 'vehicle_value',
+                    'loan_amount')
+
+# Lightweight engine input. process_application also accepts anything with
+# these attributes, such as models.ApplicantInfo, but building a record does
+# not need an app context, a database session or ORM instrumentation.
+ApplicantRecord = namedtuple('ApplicantRecord', APPLICANT_FIELDS)
+
+# The terms of a loan offer. Persist it with models.Offer(**offer._asdict()).
+OfferTerms = namedtuple('OfferTerms',
+                        ['apr', 'monthly_payment', 'term_length_months'])
+
+# The largest loan approvable for one term, and its monthly payment.
+MaximumLoan = namedtuple(
+    'MaximumLoan',
+    ['apr', 'term_length_months', 'loan_amount', 'monthly_payment'])
+
+# Columnar result of process_applications_batch. Each field is an array with
+# one entry per applicant. apr and monthly_payment are NaN for applicants who
+# do not qualify for any credit band.
+BatchDecisions = namedtuple(
+    'BatchDecisions',
+    ['approved', 'apr', 'monthly_payment', 'rejection_mask'])
+
+
+def rejection_bit(reason):
+    """Returns the bit representing a rejection reason in a rejection mask."""
+    return 1 << (int(reason) - 1)
+
+
+def reasons_from_mask(mask):
+    """Expands a rejection mask into the list process_application would return."""
+    mask = int(mask)
+    return [
+        reason for reason in _REJECTION_REASON_ORDER
+        if mask & rejection_bit(reason)
+    ]
+
+
+def _ratio(numerator, denominator):
+    """Divides the way NumPy does: x/0 is +/-inf and 0/0 is NaN."""
+    try:
+        return numerator / denominator
+    except ZeroDivisionError:
+        if numerator == 0 or math.isnan(numerator):
+            return math.nan
+        return math.copysign(math.inf, numerator) * math.copysign(
+            1.0, denominator)
+
+
+def process_application(applicant_info, policy=None, terms=None):
+    """Returns a tuple containing either an offer or a list of rejection reasons.
+
+    Applications are evaluated under the active constants unless a compiled
+    policy.Policy is given. When a sequence of term lengths is given, the
+    first element is instead a list of offers, one for each of those terms
+    that the applicant can afford; the application is declined for debt to
+    income only if no term is affordable.
+    """
+    policy = policy or lending_policy.current()
     reasons_to_decline = []
 
     # Check for ineligible loans according to current criteria.
-    if applicant_info.bankruptcies > constants.MAXIMUM_BANKRUPTCIES:
+    if applicant_info.bankruptcies > policy.maximum_bankruptcies:
         reasons_to_decline.append(models.RejectionReason.EXCESSIVE_BANKRUPTCIES)
 
-    if applicant_info.delinquencies > constants.MAXIMUM_DELINQUENCIES:
+    if applicant_info.delinquencies > policy.maximum_delinquencies:
         reasons_to_decline.append(models.RejectionReason.EXCESSIVE_DELINQUENCIES)
 
-    eligible_rate = None
-    for band in constants.CREDIT_BANDS:
-        if applicant_info.credit_score >= band['minimum_score_required']:
-            eligible_rate = band['apr']
-            break
+    band = policy.band_for_score(applicant_info.credit_score)
+    eligible_rate = None if band is None else band[0]
 
     if eligible_rate is None:
         reasons_to_decline.append(models.RejectionReason.INSUFFICIENT_CREDIT_SCORE)
 
-    loan_to_value_ratio = applicant_info.loan_amount / applicant_info.vehicle_value
-    if loan_to_value_ratio > 1:
+    loan_to_value_ratio = _ratio(applicant_info.loan_amount,
+                                 applicant_info.vehicle_value)
+    if loan_to_value_ratio > policy.maximum_loan_to_value_ratio:
         reasons_to_decline.append(models.RejectionReason.EXCESSIVE_LOAN_TO_VALUE_RATIO)
 
     tenet_monthly_payment = None
     if eligible_rate is None:
-        debt_to_income_ratio = applicant_info.monthly_debt / applicant_info.monthly_income
-        if debt_to_income_ratio > constants.MAXIMUM_DEBT_TO_INCOME_RATIO:
+        debt_to_income_ratio = _ratio(applicant_info.monthly_debt,
+                                      applicant_info.monthly_income)
+        if debt_to_income_ratio > policy.maximum_debt_to_income_ratio:
+            reasons_to_decline.append(models.RejectionReason.EXCESSIVE_DEBT_TO_INCOME_RATIO)
+    elif terms is not None:
+        # Price every requested term together.
+        term_lengths_months = tuple(terms)
+        monthly_payments = applicant_info.loan_amount * \
+            lending_policy.annuity_factors(eligible_rate, term_lengths_months)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            debt_to_income_ratios = (monthly_payments +
+                                     applicant_info.monthly_debt) / np.float64(
+                                         applicant_info.monthly_income)
+        affordable = ~(debt_to_income_ratios >
+                       policy.maximum_debt_to_income_ratio)
+        if not affordable.any():
             reasons_to_decline.append(models.RejectionReason.EXCESSIVE_DEBT_TO_INCOME_RATIO)
     else:
         # Calculate the appropriate loan.
-        principal = applicant_info.loan_amount
-        rate = eligible_rate / 12
-        periods = constants.LOAN_LENGTH_IN_MONTHS
-        tenet_monthly_payment = -1 * npf.pmt(rate, periods, principal)
+        tenet_monthly_payment = applicant_info.loan_amount * band[1]
         new_monthly_debt = tenet_monthly_payment + applicant_info.monthly_debt
-        new_debt_to_income_ratio = new_monthly_debt / applicant_info.monthly_income
-        if new_debt_to_income_ratio > constants.MAXIMUM_DEBT_TO_INCOME_RATIO:
+        new_debt_to_income_ratio = _ratio(new_monthly_debt,
+                                          applicant_info.monthly_income)
+        if new_debt_to_income_ratio > policy.maximum_debt_to_income_ratio:
             reasons_to_decline.append(models.RejectionReason.EXCESSIVE_DEBT_TO_INCOME_RATIO)
 
     if len(reasons_to_decline) > 0:
-        return None, reasons_to_decline
+        return (None if terms is None else []), reasons_to_decline
+    elif terms is not None:
+        return [
+            OfferTerms(apr=eligible_rate,
+                       monthly_payment=monthly_payment,
+                       term_length_months=term_length_months)
+            for term_length_months, monthly_payment, is_affordable in zip(
+                term_lengths_months, monthly_payments.tolist(),
+                affordable.tolist()) if is_affordable
+        ], []
     else:
-        return models.Offer(apr=eligible_rate,
-                     monthly_payment=tenet_monthly_payment,
-                     term_length_months=constants.LOAN_LENGTH_IN_MONTHS), []
+        return OfferTerms(apr=eligible_rate,
+                          monthly_payment=tenet_monthly_payment,
+                          term_length_months=policy.loan_length_in_months), []
+
+
+def process_applications_batch(credit_score, monthly_debt, monthly_income,
+                               bankruptcies, delinquencies, vehicle_value,
+                               loan_amount, policy=None):
+    """Evaluates many applications at once from columnar inputs.
+
+    Each argument is an array-like with one entry per applicant. The decision
+    for every row matches what process_application returns for the same
+    inputs and policy; rejection reasons are reported as a bitmask (see
+    rejection_bit and reasons_from_mask).
+    """
+    policy = policy or lending_policy.current()
+    credit_score = np.asarray(credit_score)
+    monthly_debt = np.asarray(monthly_debt, dtype=np.float64)
+    monthly_income = np.asarray(monthly_income, dtype=np.float64)
+    bankruptcies = np.asarray(bankruptcies)
+    delinquencies = np.asarray(delinquencies)
+    vehicle_value = np.asarray(vehicle_value, dtype=np.float64)
+    loan_amount = np.asarray(loan_amount, dtype=np.float64)
+
+    rejection_mask = np.zeros(credit_score.shape, dtype=np.uint8)
+
+    # Check for ineligible loans according to current criteria.
+    rejection_mask[bankruptcies > policy.maximum_bankruptcies] |= \
+        rejection_bit(models.RejectionReason.EXCESSIVE_BANKRUPTCIES)
+    rejection_mask[delinquencies > policy.maximum_delinquencies] |= \
+        rejection_bit(models.RejectionReason.EXCESSIVE_DELINQUENCIES)
+
+    apr = policy.aprs_for_scores(credit_score)
+    has_band = ~np.isnan(apr)
+    rejection_mask[~has_band] |= rejection_bit(
+        models.RejectionReason.INSUFFICIENT_CREDIT_SCORE)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        loan_to_value_ratio = loan_amount / vehicle_value
+        rejection_mask[
+            loan_to_value_ratio > policy.maximum_loan_to_value_ratio] |= \
+            rejection_bit(models.RejectionReason.EXCESSIVE_LOAN_TO_VALUE_RATIO)
+
+        # Applicants without a band are held to their existing debt only.
+        monthly_payment = loan_amount * policy.payment_factors_for_scores(
+            credit_score)
+        new_monthly_debt = np.where(has_band, monthly_payment + monthly_debt,
+                                    monthly_debt)
+        debt_to_income_ratio = new_monthly_debt / monthly_income
+        rejection_mask[
+            debt_to_income_ratio > policy.maximum_debt_to_income_ratio] |= \
+            rejection_bit(models.RejectionReason.EXCESSIVE_DEBT_TO_INCOME_RATIO)
+
+    return BatchDecisions(approved=rejection_mask == 0,
+                          apr=apr,
+                          monthly_payment=monthly_payment,
+                          rejection_mask=rejection_mask)
+
+
+def _floor_to_cents(amount):
+    # Round first so that 40478.52 * 100 == 4047851.9999... stays 40478.52.
+    return math.floor(round(amount * 100, 6)) / 100
+
+
+def maximum_loan_amounts(applicant_info, policy=None, terms=None):
+    """Returns the largest approvable loan for each term, and any rejections.
+
+    Solves the loan-to-value and debt-to-income limits for the principal
+    instead of searching for it. The applicant's loan_amount is ignored. The
+    first element of the result holds a MaximumLoan, in whole cents, for
+    every term with a positive approvable amount; the rejection reasons
+    explain why there is none when that list is empty.
+    """
+    policy = policy or lending_policy.current()
+    if terms is None:
+        terms = (policy.loan_length_in_months, )
+    term_lengths_months = tuple(terms)
+
+    reasons_to_decline = []
+    if applicant_info.bankruptcies > policy.maximum_bankruptcies:
+        reasons_to_decline.append(models.RejectionReason.EXCESSIVE_BANKRUPTCIES)
+    if applicant_info.delinquencies > policy.maximum_delinquencies:
+        reasons_to_decline.append(models.RejectionReason.EXCESSIVE_DELINQUENCIES)
+    eligible_rate = policy.apr_for_score(applicant_info.credit_score)
+    if eligible_rate is None:
+        reasons_to_decline.append(models.RejectionReason.INSUFFICIENT_CREDIT_SCORE)
+    if reasons_to_decline:
+        return [], reasons_to_decline
+
+    # loan / vehicle_value <= max LTV, and
+    # (loan * factor + monthly_debt) / monthly_income <= max DTI.
+    loan_to_value_limit = (policy.maximum_loan_to_value_ratio *
+                           applicant_info.vehicle_value
+                           if applicant_info.vehicle_value > 0 else 0.0)
+    factors = lending_policy.annuity_factors(eligible_rate,
+                                             term_lengths_months)
+    debt_to_income_limits = (
+        policy.maximum_debt_to_income_ratio * applicant_info.monthly_income -
+        applicant_info.monthly_debt) / factors
+    if applicant_info.monthly_income <= 0:
+        debt_to_income_limits[:] = 0.0
+    limits = np.minimum(debt_to_income_limits, loan_to_value_limit)
+
+    record = ApplicantRecord(
+        *(getattr(applicant_info, field) for field in APPLICANT_FIELDS[:-1]),
+        loan_amount=0.0)
+    maximum_loans = []
+    for term_length_months, limit in zip(term_lengths_months, limits.tolist()):
+        loan_amount = _floor_to_cents(limit)
+        # Rounding can leave the closed-form answer a hair over a limit, so
+        # confirm it with the engine and step down a cent if needed.
+        for _ in range(3):
+            if loan_amount <= 0:
+                break
+            offers, _ = process_application(
+                record._replace(loan_amount=loan_amount),
+                policy=policy,
+                terms=(term_length_months, ))
+            if offers:
+                maximum_loans.append(
+                    MaximumLoan(apr=eligible_rate,
+                                term_length_months=term_length_months,
+                                loan_amount=loan_amount,
+                                monthly_payment=offers[0].monthly_payment))
+                break
+            loan_amount = round(loan_amount - 0.01, 2)
+
+    if not maximum_loans:
+        if loan_to_value_limit < 0.01:
+            reasons_to_decline.append(models.RejectionReason.EXCESSIVE_LOAN_TO_VALUE_RATIO)
+        if (debt_to_income_limits < 0.01).all():
+            reasons_to_decline.append(models.RejectionReason.EXCESSIVE_DEBT_TO_INCOME_RATIO)
+    return maximum_loans, reasons_to_decline
@@ -2,8 +2,11 @@
 from testing.flask_test_base import FlaskTest
 from app import models
 from engine import application_processor as ap
+from engine import policy
 from constants import constants
 from numpy import testing
+import numpy as np
+import unittest
 
 def _make_great_applicant_info():
     return models.ApplicantInfo(credit_score=1000.0,
@@ -236,3 +239,243 @@ class LoanValueCalculationTests(FlaskTest):
         info.loan_amount = 10000
         offer, rejection_reasons = ap.process_application(info)
         testing.assert_almost_equal(offer.monthly_payment, 147.504, decimal=3)
+
+
+def _random_applicant_columns(count, seed=0):
+    rng = np.random.default_rng(seed)
+    return {
+        'credit_score': rng.integers(500, 1001, count),
+        'monthly_debt': np.round(rng.uniform(0, 3000, count), 2),
+        'monthly_income': np.round(rng.uniform(500, 10000, count), 2),
+        'bankruptcies': rng.integers(0, 2, count),
+        'delinquencies': rng.integers(0, 3, count),
+        'vehicle_value': np.round(rng.uniform(1000, 60000, count), 2),
+        'loan_amount': np.round(rng.uniform(1000, 60000, count), 2),
+    }
+
+
+class BatchProcessingTests(FlaskTest):
+    """Make sure the batch engine agrees with the scalar engine."""
+
+    def test_batch_matches_scalar_exactly(self):
+        columns = _random_applicant_columns(2000)
+        decisions = ap.process_applications_batch(**columns)
+        for i in range(2000):
+            info = models.ApplicantInfo(
+                **{key: values[i].item() for key, values in columns.items()})
+            offer, rejection_reasons = ap.process_application(info)
+            self.assertEqual(
+                ap.reasons_from_mask(decisions.rejection_mask[i]),
+                rejection_reasons)
+            self.assertEqual(bool(decisions.approved[i]), offer is not None)
+            if offer is not None:
+                self.assertEqual(decisions.apr[i], offer.apr)
+                self.assertEqual(decisions.monthly_payment[i],
+                                 offer.monthly_payment)
+
+    def test_batch_reports_every_reason(self):
+        decisions = ap.process_applications_batch(credit_score=[4],
+                                                  monthly_debt=[4000.0],
+                                                  monthly_income=[1000.0],
+                                                  bankruptcies=[3],
+                                                  delinquencies=[5],
+                                                  vehicle_value=[200.0],
+                                                  loan_amount=[30000.0])
+        self.assertFalse(decisions.approved[0])
+        self.assertTrue(np.isnan(decisions.apr[0]))
+        self.assertTrue(np.isnan(decisions.monthly_payment[0]))
+        self.assertEqual(ap.reasons_from_mask(decisions.rejection_mask[0]), [
+            models.RejectionReason.EXCESSIVE_BANKRUPTCIES,
+            models.RejectionReason.EXCESSIVE_DELINQUENCIES,
+            models.RejectionReason.INSUFFICIENT_CREDIT_SCORE,
+            models.RejectionReason.EXCESSIVE_LOAN_TO_VALUE_RATIO,
+            models.RejectionReason.EXCESSIVE_DEBT_TO_INCOME_RATIO,
+        ])
+
+    def test_batch_payment_for_simple_loan(self):
+        decisions = ap.process_applications_batch(credit_score=[1000],
+                                                  monthly_debt=[0.0],
+                                                  monthly_income=[1000.0],
+                                                  bankruptcies=[0],
+                                                  delinquencies=[0],
+                                                  vehicle_value=[10000.0],
+                                                  loan_amount=[10000.0])
+        self.assertTrue(decisions.approved[0])
+        self.assertEqual(decisions.apr[0], 0.02)
+        testing.assert_almost_equal(decisions.monthly_payment[0],
+                                    147.504,
+                                    decimal=3)
+
+    def test_zero_income_is_declined_for_debt_to_income(self):
+        decisions = ap.process_applications_batch(credit_score=[1000],
+                                                  monthly_debt=[10.0],
+                                                  monthly_income=[0.0],
+                                                  bankruptcies=[0],
+                                                  delinquencies=[0],
+                                                  vehicle_value=[10000.0],
+                                                  loan_amount=[1000.0])
+        self.assertEqual(ap.reasons_from_mask(decisions.rejection_mask[0]),
+                         [models.RejectionReason.EXCESSIVE_DEBT_TO_INCOME_RATIO])
+
+    def test_zero_divisors_match_scalar(self):
+        columns = {
+            'credit_score': [1000, 1000, 0, 0],
+            'monthly_debt': [10.0, 0.0, 10.0, 0.0],
+            'monthly_income': [0.0, 0.0, 0.0, 0.0],
+            'bankruptcies': [0, 0, 0, 0],
+            'delinquencies': [0, 0, 0, 0],
+            'vehicle_value': [0.0, 0.0, 0.0, 0.0],
+            'loan_amount': [1000.0, 0.0, 1000.0, 0.0],
+        }
+        decisions = ap.process_applications_batch(**columns)
+        for i in range(4):
+            info = models.ApplicantInfo(
+                **{key: values[i] for key, values in columns.items()})
+            offer, rejection_reasons = ap.process_application(info)
+            self.assertEqual(
+                ap.reasons_from_mask(decisions.rejection_mask[i]),
+                rejection_reasons)
+
+    def test_candidate_policy_matches_scalar(self):
+        candidate = policy.Policy(credit_bands=[{
+            'minimum_score_required': 600,
+            'apr': 0.12
+        }],
+                                  maximum_bankruptcies=1,
+                                  maximum_delinquencies=0,
+                                  maximum_debt_to_income_ratio=0.4,
+                                  maximum_loan_to_value_ratio=0.9,
+                                  loan_length_in_months=48)
+        columns = _random_applicant_columns(500, seed=1)
+        decisions = ap.process_applications_batch(**columns, policy=candidate)
+        for i in range(500):
+            info = ap.ApplicantRecord(
+                **{key: values[i].item() for key, values in columns.items()})
+            offer, rejection_reasons = ap.process_application(info, candidate)
+            self.assertEqual(
+                ap.reasons_from_mask(decisions.rejection_mask[i]),
+                rejection_reasons)
+            if offer is not None:
+                self.assertEqual(offer.term_length_months, 48)
+                self.assertEqual(decisions.monthly_payment[i],
+                                 offer.monthly_payment)
+
+
+class ApplicantRecordTests(unittest.TestCase):
+    """The engine must work without an app context or database session."""
+
+    def test_record_is_processed_without_app_context(self):
+        record = ap.ApplicantRecord(credit_score=1000,
+                                    monthly_debt=0.0,
+                                    monthly_income=1000.0,
+                                    bankruptcies=0,
+                                    delinquencies=0,
+                                    vehicle_value=10000.0,
+                                    loan_amount=2000.0)
+        offer, rejection_reasons = ap.process_application(record)
+        self.assertEqual(rejection_reasons, [])
+        self.assertEqual(offer.apr, 0.02)
+        testing.assert_almost_equal(offer.monthly_payment, 29.50, decimal=3)
+        self.assertEqual(offer.term_length_months, 72)
+
+    def test_record_matches_orm_input(self):
+        fields = dict(credit_score=700,
+                      monthly_debt=500.0,
+                      monthly_income=1000.0,
+                      bankruptcies=1,
+                      delinquencies=0,
+                      vehicle_value=10000.0,
+                      loan_amount=20000.0)
+        self.assertEqual(
+            ap.process_application(ap.ApplicantRecord(**fields)),
+            ap.process_application(models.ApplicantInfo(**fields)))
+
+    def test_offer_terms_build_an_offer_model(self):
+        record = ap.ApplicantRecord(credit_score=1000,
+                                    monthly_debt=0.0,
+                                    monthly_income=1000.0,
+                                    bankruptcies=0,
+                                    delinquencies=0,
+                                    vehicle_value=10000.0,
+                                    loan_amount=2000.0)
+        offer, _ = ap.process_application(record)
+        offer_model = models.Offer(**offer._asdict())
+        self.assertEqual(offer_model.apr, offer.apr)
+        self.assertEqual(offer_model.monthly_payment, offer.monthly_payment)
+        self.assertEqual(offer_model.term_length_months, 72)
+
+
+class OfferGridTests(FlaskTest):
+    """Make sure the offer grid agrees with pricing one term at a time."""
+
+    def test_grid_matches_single_term_pricing(self):
+        info = _make_great_applicant_info()
+        offers, rejection_reasons = ap.process_application(
+            info, terms=[36, 48, 60, 72, 84])
+        self.assertEqual(rejection_reasons, [])
+        self.assertEqual([offer.term_length_months for offer in offers],
+                         [36, 48, 60, 72, 84])
+        single_offer, _ = ap.process_application(info)
+        self.assertEqual(offers[3], single_offer)
+        self.assertTrue(
+            all(a.monthly_payment > b.monthly_payment
+                for a, b in zip(offers, offers[1:])))
+
+    def test_unaffordable_terms_are_dropped(self):
+        info = _make_great_applicant_info()
+        info.loan_amount = 30000.0
+        info.vehicle_value = 30000.0
+        offers, rejection_reasons = ap.process_application(info,
+                                                           terms=[36, 84])
+        self.assertEqual(rejection_reasons, [])
+        self.assertEqual([offer.term_length_months for offer in offers], [84])
+
+    def test_no_affordable_terms_is_declined(self):
+        info = _make_great_applicant_info()
+        info.monthly_debt = 99999.99
+        offers, rejection_reasons = ap.process_application(info,
+                                                           terms=[36, 84])
+        self.assertEqual(offers, [])
+        self.assertEqual(rejection_reasons,
+                         [models.RejectionReason.EXCESSIVE_DEBT_TO_INCOME_RATIO])
+
+    def test_hard_cuts_decline_every_term(self):
+        info = _make_great_applicant_info()
+        info.bankruptcies = constants.MAXIMUM_BANKRUPTCIES + 1
+        offers, rejection_reasons = ap.process_application(info, terms=[36])
+        self.assertEqual(offers, [])
+        self.assertEqual(rejection_reasons,
+                         [models.RejectionReason.EXCESSIVE_BANKRUPTCIES])
+
+
+class MaximumLoanAmountTests(FlaskTest):
+    """Make sure the solved amounts sit exactly on the approval boundary."""
+
+    def test_solved_amounts_are_the_largest_approvable(self):
+        columns = _random_applicant_columns(300, seed=2)
+        for i in range(300):
+            record = ap.ApplicantRecord(
+                **{key: values[i].item() for key, values in columns.items()})
+            maximum_loans, rejection_reasons = ap.maximum_loan_amounts(
+                record, terms=[36, 72, 84])
+            for loan in maximum_loans:
+                offers, _ = ap.process_application(
+                    record._replace(loan_amount=loan.loan_amount),
+                    terms=[loan.term_length_months])
+                self.assertEqual(len(offers), 1)
+                self.assertEqual(offers[0].monthly_payment,
+                                 loan.monthly_payment)
+                offers, _ = ap.process_application(
+                    record._replace(loan_amount=loan.loan_amount + 0.01),
+                    terms=[loan.term_length_months])
+                self.assertEqual(offers, [])
+            if not maximum_loans:
+                self.assertNotEqual(rejection_reasons, [])
+
+    def test_zero_income_has_no_amount(self):
+        info = _make_great_applicant_info()
+        info.monthly_income = 0.0
+        maximum_loans, rejection_reasons = ap.maximum_loan_amounts(info)
+        self.assertEqual(maximum_loans, [])
+        self.assertEqual(rejection_reasons,
+                         [models.RejectionReason.EXCESSIVE_DEBT_TO_INCOME_RATIO])
@@ -0,0 +1,167 @@
+"""Replays stored applications under candidate lending policies.
+
+Before the constants change we want to know how approval rates and payments
+would shift across our whole history. A backtest reads the applicant columns
+once, evaluates the baseline policy and every candidate on each chunk with
+the batch engine, and accumulates summary statistics as it goes.
+"""
+from app import models
+from engine import application_processor as ap
+from engine import policy as lending_policy
+import importlib.util
+import os
+import uuid
+import numpy as np
+
+# Approved monthly payments are bucketed to estimate their distribution.
+PAYMENT_BUCKET_WIDTH = 25.0
+PAYMENT_BUCKET_COUNT = 400
+PAYMENT_QUANTILES = (0.1, 0.5, 0.9)
+
+# How many flipped application ids to report per direction and candidate.
+MAXIMUM_FLIP_EXAMPLES = 10
+
+
+def load_constants_file(path):
+    """Compiles a policy from a file laid out like constants/constants.py."""
+    name = os.path.splitext(os.path.basename(path))[0]
+    spec = importlib.util.spec_from_file_location('candidate_' + name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return lending_policy.Policy.from_constants(module)
+
+
+def _format_id(application_id):
+    if isinstance(application_id, uuid.UUID):
+        return str(application_id)
+    return str(uuid.UUID(bytes=bytes(application_id)))
+
+
+class PolicySummary:
+    """Running totals for the decisions made under one policy."""
+
+    def __init__(self):
+        self.rows = 0
+        self.approved = 0
+        self.reason_counts = {reason: 0 for reason in models.RejectionReason}
+        self.payment_total = 0.0
+        self.payment_histogram = np.zeros(PAYMENT_BUCKET_COUNT, dtype=np.int64)
+
+    def add(self, decisions):
+        self.rows += len(decisions.approved)
+        self.approved += int(decisions.approved.sum())
+        for reason in self.reason_counts:
+            self.reason_counts[reason] += int(
+                np.count_nonzero(decisions.rejection_mask &
+                                 ap.rejection_bit(reason)))
+        payments = decisions.monthly_payment[decisions.approved]
+        self.payment_total += float(payments.sum())
+        buckets = np.clip(payments // PAYMENT_BUCKET_WIDTH, 0,
+                          PAYMENT_BUCKET_COUNT - 1).astype(np.intp)
+        self.payment_histogram += np.bincount(buckets,
+                                              minlength=PAYMENT_BUCKET_COUNT)
+
+    def payment_quantile(self, quantile):
+        """Returns the upper edge of the bucket holding the given quantile."""
+        if self.approved == 0:
+            return None
+        cumulative = np.cumsum(self.payment_histogram)
+        bucket = int(np.searchsorted(cumulative, quantile * self.approved))
+        return (bucket + 1) * PAYMENT_BUCKET_WIDTH
+
+    def to_dict(self):
+        return {
+            'rows': self.rows,
+            'approved': self.approved,
+            'approval_rate': self.approved / self.rows if self.rows else None,
+            'rejections': {
+                reason.name: count
+                for reason, count in self.reason_counts.items()
+            },
+            'monthly_payment': {
+                'mean':
+                self.payment_total / self.approved if self.approved else None,
+                **{
+                    'p%d' % round(quantile * 100):
+                    self.payment_quantile(quantile)
+                    for quantile in PAYMENT_QUANTILES
+                },
+            },
+        }
+
+
+class _Flips:
+
+    def __init__(self):
+        self.newly_approved = 0
+        self.newly_declined = 0
+        self.newly_approved_examples = []
+        self.newly_declined_examples = []
+
+    def add(self, application_ids, baseline, candidate):
+        for flipped, attribute in (
+            (candidate.approved & ~baseline.approved, 'newly_approved'),
+            (baseline.approved & ~candidate.approved, 'newly_declined'),
+        ):
+            setattr(self, attribute,
+                    getattr(self, attribute) + int(flipped.sum()))
+            examples = getattr(self, attribute + '_examples')
+            room = MAXIMUM_FLIP_EXAMPLES - len(examples)
+            if room > 0:
+                examples.extend(
+                    _format_id(application_id)
+                    for application_id in application_ids[flipped][:room])
+
+
+class Backtest:
+    """Evaluates a baseline policy and candidate policies side by side."""
+
+    def __init__(self, candidates, baseline=None):
+        self.baseline = baseline or lending_policy.current()
+        self.candidates = dict(candidates)
+        self.baseline_summary = PolicySummary()
+        self.candidate_summaries = {
+            name: PolicySummary()
+            for name in self.candidates
+        }
+        self.flips = {name: _Flips() for name in self.candidates}
+
+    def add_chunk(self, columns):
+        """Evaluates one dict of applicant columns under every policy."""
+        inputs = [columns[field] for field in ap.APPLICANT_FIELDS]
+        baseline = ap.process_applications_batch(*inputs,
+                                                 policy=self.baseline)
+        self.baseline_summary.add(baseline)
+        for name, policy in self.candidates.items():
+            candidate = ap.process_applications_batch(*inputs, policy=policy)
+            self.candidate_summaries[name].add(candidate)
+            self.flips[name].add(columns['application_id'], baseline,
+                                 candidate)
+
+    def report(self):
+        baseline = self.baseline_summary.to_dict()
+        report = {'baseline': baseline, 'candidates': {}}
+        for name, summary in self.candidate_summaries.items():
+            candidate = summary.to_dict()
+            flips = self.flips[name]
+            candidate['changes'] = {
+                'newly_approved': flips.newly_approved,
+                'newly_declined': flips.newly_declined,
+                'newly_approved_examples': flips.newly_approved_examples,
+                'newly_declined_examples': flips.newly_declined_examples,
+                'approved_delta': candidate['approved'] - baseline['approved'],
+                'rejection_deltas': {
+                    reason: count - baseline['rejections'][reason]
+                    for reason, count in candidate['rejections'].items()
+                },
+            }
+            report['candidates'][name] = candidate
+        return report
+
+
+def run(candidates, chunks, baseline=None):
+    """Runs a backtest over an iterable of column chunks and returns its report."""
+    backtest = Backtest(candidates, baseline=baseline)
+    for columns in chunks:
+        backtest.add_chunk(columns)
+    return backtest.report()
@@ -0,0 +1,136 @@
+"""Test coverage for policy backtests."""
+from testing.flask_test_base import FlaskTest
+from constants import constants
+from engine import application_processor as ap
+from engine import applicant_stream
+from engine import backtest
+from engine import columnar_store
+from engine import policy as lending_policy
+import json
+import numpy as np
+import os
+import tempfile
+import uuid
+
+_CANDIDATE_CONSTANTS = """
+CREDIT_BANDS = [{
+    "minimum_score_required": 600,
+    "apr": 0.12,
+}]
+MAXIMUM_BANKRUPTCIES = 0
+MAXIMUM_DELINQUENCIES = 1
+MAXIMUM_DEBT_TO_INCOME_RATIO = 0.60
+MAXIMUM_LOAN_TO_VALUE_RATIO = 1
+LOAN_LENGTH_IN_MONTHS = 60
+"""
+
+
+def _make_columns(credit_scores):
+    count = len(credit_scores)
+    return {
+        'application_id': np.array([uuid.uuid4() for _ in range(count)],
+                                   dtype=object),
+        'credit_score': np.array(credit_scores),
+        'monthly_debt': np.zeros(count),
+        'monthly_income': np.full(count, 5000.0),
+        'bankruptcies': np.zeros(count, dtype=int),
+        'delinquencies': np.zeros(count, dtype=int),
+        'vehicle_value': np.full(count, 20000.0),
+        'loan_amount': np.full(count, 10000.0),
+    }
+
+
+class BacktestTests(FlaskTest):
+
+    def setUp(self):
+        super().setUp()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.candidate_path = os.path.join(self.temp_dir.name, 'loose.py')
+        with open(self.candidate_path, 'w') as candidate_file:
+            candidate_file.write(_CANDIDATE_CONSTANTS)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+        super().tearDown()
+
+    def test_load_constants_file(self):
+        policy = backtest.load_constants_file(self.candidate_path)
+        self.assertEqual(policy.apr_for_score(650), 0.12)
+        self.assertIsNone(policy.apr_for_score(599))
+        self.assertEqual(policy.loan_length_in_months, 60)
+
+    def test_flips_and_deltas(self):
+        candidate = backtest.load_constants_file(self.candidate_path)
+        columns = _make_columns([500, 620, 700, 800])
+        report = backtest.run({'loose': candidate},
+                              [columns, _make_columns([650])])
+
+        self.assertEqual(report['baseline']['rows'], 5)
+        # The baseline approves scores of 660 and up; the candidate 600 and up.
+        self.assertEqual(report['baseline']['approved'], 2)
+        loose = report['candidates']['loose']
+        self.assertEqual(loose['approved'], 4)
+        self.assertEqual(loose['changes']['newly_approved'], 2)
+        self.assertEqual(loose['changes']['newly_declined'], 0)
+        self.assertIn(str(columns['application_id'][1]),
+                      loose['changes']['newly_approved_examples'])
+        self.assertEqual(
+            loose['changes']['rejection_deltas']['INSUFFICIENT_CREDIT_SCORE'],
+            -2)
+
+    def test_payment_summary_matches_engine(self):
+        columns = _make_columns([800] * 10)
+        report = backtest.run({}, [columns])
+        offer, _ = ap.process_application(
+            ap.ApplicantRecord(
+                **{field: columns[field][0]
+                   for field in ap.APPLICANT_FIELDS}))
+        payments = report['baseline']['monthly_payment']
+        self.assertAlmostEqual(payments['mean'], offer.monthly_payment)
+        self.assertLessEqual(offer.monthly_payment, payments['p50'])
+        self.assertGreater(offer.monthly_payment,
+                           payments['p50'] - backtest.PAYMENT_BUCKET_WIDTH)
+
+    def test_identical_candidate_changes_nothing(self):
+        report = backtest.run(
+            {'same': lending_policy.Policy.from_constants(constants)},
+            [_make_columns([500, 700, 800])])
+        changes = report['candidates']['same']['changes']
+        self.assertEqual(changes['newly_approved'], 0)
+        self.assertEqual(changes['newly_declined'], 0)
+        self.assertTrue(
+            all(delta == 0 for delta in changes['rejection_deltas'].values()))
+
+    def test_backtest_command_reads_database_and_store(self):
+        user_id = self.post('/users', {'name': 'steve'}).json['id']
+        for credit_score in (620, 700):
+            self.post(
+                '/users/' + user_id + '/applications', {
+                    'bankruptcies': 0,
+                    'credit_score': credit_score,
+                    'monthly_debt': 0,
+                    'loan_amount': 10000,
+                    'vehicle_value': 20000,
+                    'monthly_income': 5000,
+                    'delinquencies': 0,
+                })
+        self.assertEqual(
+            sum(len(chunk['credit_score'])
+                for chunk in applicant_stream.iter_applicant_chunks(1)), 2)
+
+        runner = self.app.test_cli_runner()
+        result = runner.invoke(args=['backtest', self.candidate_path])
+        self.assertEqual(result.exit_code, 0, result.output)
+        from_database = json.loads(result.output)
+
+        store_path = os.path.join(self.temp_dir.name, 'applicants.cols')
+        columnar_store.export_applicant_info(store_path)
+        result = runner.invoke(
+            args=['backtest', self.candidate_path, '--store', store_path])
+        self.assertEqual(result.exit_code, 0, result.output)
+        from_store = json.loads(result.output)
+
+        for report in (from_database, from_store):
+            self.assertEqual(report['baseline']['approved'], 1)
+            self.assertEqual(
+                report['candidates']['loose']['changes']['newly_approved'], 1)
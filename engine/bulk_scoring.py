@@ -0,0 +1,204 @@
+"""Offline scoring of large CSV or JSONL files of applicant records.
+
+Input is read as a stream and cut into fixed-size chunks of lines. Each chunk
+is parsed, scored with the batch engine and written to its own part file by a
+worker process, so memory stays bounded by the number of chunks in flight.
+A part file only appears once its chunk is complete; re-running the same job
+skips chunks whose part file already exists.
+"""
+from concurrent import futures
+from engine import application_processor as ap
+from engine import policy as lending_policy
+import csv
+import itertools
+import json
+import math
+import os
+import numpy as np
+
+FORMATS = ('csv', 'jsonl')
+
+_INTEGER_FIELDS = ('credit_score', 'bankruptcies', 'delinquencies')
+_MANIFEST_FILENAME = 'manifest.json'
+_REJECTIONS_BY_MASK = {}
+
+
+class ScoringError(Exception):
+    pass
+
+
+def part_filename(output_dir, chunk_index):
+    return os.path.join(output_dir, 'part-%06d.jsonl' % chunk_index)
+
+
+def _finite(value):
+    # float() also accepts NaN and infinities, which no limit would reject.
+    number = float(value)
+    if not math.isfinite(number):
+        raise ValueError('%r is not a finite number' % (value, ))
+    return number
+
+
+def _integer(value):
+    # int() would truncate 2.7 to 2, so only whole numbers are accepted.
+    number = _finite(value)
+    if not number.is_integer():
+        raise ValueError('%r is not a whole number' % (value, ))
+    return int(number)
+
+
+_CONVERTERS = tuple(_integer if field in _INTEGER_FIELDS else _finite
+                    for field in ap.APPLICANT_FIELDS)
+
+
+def _parse_row(row):
+    return tuple(
+        convert(row[field])
+        for convert, field in zip(_CONVERTERS, ap.APPLICANT_FIELDS))
+
+
+def _split_lines(input_format, header, lines):
+    # JSONL lines are decoded per row by _decode, so that a malformed line is
+    # reported like any other invalid row.
+    if input_format == 'csv':
+        return (dict(zip(header, values)) for values in csv.reader(lines))
+    return lines
+
+
+def _decode(input_format, row):
+    return json.loads(row) if input_format == 'jsonl' else row
+
+
+def _rejections(rejection_mask):
+    # There are only a few possible masks, so expand each one once.
+    if rejection_mask not in _REJECTIONS_BY_MASK:
+        _REJECTIONS_BY_MASK[rejection_mask] = [{
+            'reason': reason.name
+        } for reason in ap.reasons_from_mask(rejection_mask)]
+    return _REJECTIONS_BY_MASK[rejection_mask]
+
+
+def score_chunk(input_format, header, first_row_number, lines, output_path):
+    """Scores one chunk of raw input lines into output_path.
+
+    Returns a tuple of (rows, approved, invalid) counts.
+    """
+    rows, values, results = [], [], []
+    for row_number, row in enumerate(_split_lines(input_format, header,
+                                                  lines),
+                                     start=first_row_number):
+        try:
+            row = _decode(input_format, row)
+            values.append(_parse_row(row))
+        except (KeyError, TypeError, ValueError) as err:
+            results.append((row_number, {
+                'row': row_number,
+                'error': 'invalid applicant record: %r' % (err, )
+            }))
+            continue
+        rows.append((row_number, row))
+
+    approved = 0
+    if rows:
+        columns = np.array(values, dtype=np.float64).T
+        decisions = ap.process_applications_batch(*columns)
+        term_length_months = lending_policy.current().loan_length_in_months
+        for (row_number, row), rejection_mask, apr, monthly_payment in zip(
+                rows, decisions.rejection_mask.tolist(),
+                decisions.apr.tolist(), decisions.monthly_payment.tolist()):
+            result = {'row': row_number}
+            if 'id' in row:
+                result['id'] = row['id']
+            if rejection_mask == 0:
+                result['status'] = 'APPROVED'
+                result['offer'] = {
+                    'apr': apr,
+                    'monthly_payment': monthly_payment,
+                    'term_length_months': term_length_months,
+                }
+            else:
+                result['status'] = 'DECLINED'
+                result['offer'] = None
+            result['rejections'] = _rejections(rejection_mask)
+            results.append((row_number, result))
+        approved = int(decisions.approved.sum())
+    results.sort(key=lambda result: result[0])
+
+    temp_path = output_path + '.tmp'
+    with open(temp_path, 'w') as output_file:
+        output_file.writelines(
+            json.dumps(result) + '\n' for _, result in results)
+    os.replace(temp_path, output_path)
+    return len(results), approved, len(results) - len(rows)
+
+
+def _check_manifest(output_dir, input_path, input_format, chunk_size):
+    manifest = {
+        'input': os.path.abspath(input_path),
+        'format': input_format,
+        'chunk_size': chunk_size,
+    }
+    manifest_path = os.path.join(output_dir, _MANIFEST_FILENAME)
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as manifest_file:
+            existing = json.load(manifest_file)
+        if existing != manifest:
+            raise ScoringError(
+                'output directory holds a different job: %r' % existing)
+    else:
+        with open(manifest_path, 'w') as manifest_file:
+            json.dump(manifest, manifest_file)
+
+
+def score_file(input_path,
+               output_dir,
+               input_format='jsonl',
+               chunk_size=100000,
+               workers=None):
+    """Scores every record in input_path into part files under output_dir.
+
+    Returns a dict of counts for the chunks scored by this run.
+    """
+    if input_format not in FORMATS:
+        raise ScoringError('unknown format %r.' % input_format)
+    workers = workers or os.cpu_count()
+    os.makedirs(output_dir, exist_ok=True)
+    _check_manifest(output_dir, input_path, input_format, chunk_size)
+
+    totals = {'chunks': 0, 'skipped_chunks': 0, 'rows': 0, 'approved': 0,
+              'invalid': 0}
+    with open(input_path, newline='') as input_file, \
+            futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        header = None
+        if input_format == 'csv':
+            header = next(csv.reader([input_file.readline()]))
+        lines = (line for line in input_file if line.strip())
+
+        pending = set()
+        for chunk_index in itertools.count():
+            chunk = list(itertools.islice(lines, chunk_size))
+            if not chunk:
+                break
+            output_path = part_filename(output_dir, chunk_index)
+            if os.path.exists(output_path):
+                totals['skipped_chunks'] += 1
+                continue
+            # Keep a bounded number of chunks in memory at once.
+            if len(pending) >= 2 * workers:
+                done, pending = futures.wait(
+                    pending, return_when=futures.FIRST_COMPLETED)
+                _add_counts(totals, done)
+            pending.add(
+                executor.submit(score_chunk, input_format, header,
+                                chunk_index * chunk_size, chunk, output_path))
+        _add_counts(totals, futures.wait(pending).done)
+    return totals
+
+
+def _add_counts(totals, done):
+    for future in done:
+        rows, approved, invalid = future.result()
+        totals['chunks'] += 1
+        totals['rows'] += rows
+        totals['approved'] += approved
+        totals['invalid'] += invalid
@@ -0,0 +1,193 @@
+"""Test coverage for offline bulk scoring."""
+from testing.flask_test_base import FlaskTest
+from engine import application_processor as ap
+from engine import bulk_scoring
+import json
+import os
+import tempfile
+
+_STRONG_RECORD = {
+    'credit_score': 1000,
+    'monthly_debt': 0.0,
+    'monthly_income': 1000.0,
+    'bankruptcies': 0,
+    'delinquencies': 0,
+    'vehicle_value': 10000.0,
+    'loan_amount': 2000.0,
+}
+
+_WEAK_RECORD = dict(_STRONG_RECORD, bankruptcies=3, credit_score=333)
+
+
+def _read_parts(output_dir):
+    results = []
+    for filename in sorted(os.listdir(output_dir)):
+        if filename.startswith('part-'):
+            with open(os.path.join(output_dir, filename)) as part_file:
+                results.extend(json.loads(line) for line in part_file)
+    return results
+
+
+class BulkScoringTests(FlaskTest):
+
+    def setUp(self):
+        super().setUp()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.output_dir = os.path.join(self.temp_dir.name, 'out')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+        super().tearDown()
+
+    def _write(self, filename, contents):
+        path = os.path.join(self.temp_dir.name, filename)
+        with open(path, 'w') as input_file:
+            input_file.write(contents)
+        return path
+
+    def _write_jsonl(self, records):
+        return self._write('input.jsonl',
+                           ''.join(json.dumps(r) + '\n' for r in records))
+
+    def test_jsonl_decisions_match_engine(self):
+        records = [_STRONG_RECORD, _WEAK_RECORD] * 5
+        input_path = self._write_jsonl(records)
+        totals = bulk_scoring.score_file(input_path,
+                                         self.output_dir,
+                                         chunk_size=3,
+                                         workers=2)
+        self.assertEqual(totals['rows'], 10)
+        self.assertEqual(totals['approved'], 5)
+        self.assertEqual(totals['chunks'], 4)
+
+        results = _read_parts(self.output_dir)
+        self.assertEqual([r['row'] for r in results], list(range(10)))
+        for record, result in zip(records, results):
+            offer, reasons = ap.process_application(
+                ap.ApplicantRecord(**record))
+            if offer is None:
+                self.assertEqual(result['status'], 'DECLINED')
+                self.assertEqual(result['rejections'],
+                                 [{
+                                     'reason': reason.name
+                                 } for reason in reasons])
+            else:
+                self.assertEqual(result['status'], 'APPROVED')
+                self.assertEqual(result['offer'], offer._asdict())
+
+    def test_csv_input_and_ids_are_passed_through(self):
+        fields = ('id', ) + ap.APPLICANT_FIELDS
+        rows = [','.join(fields)]
+        for i, record in enumerate([_STRONG_RECORD, _WEAK_RECORD]):
+            rows.append(','.join(
+                [str(i + 100)] + [str(record[f]) for f in ap.APPLICANT_FIELDS]))
+        input_path = self._write('input.csv', '\n'.join(rows) + '\n')
+        bulk_scoring.score_file(input_path,
+                                self.output_dir,
+                                input_format='csv',
+                                workers=1)
+        results = _read_parts(self.output_dir)
+        self.assertEqual([r['id'] for r in results], ['100', '101'])
+        self.assertEqual([r['status'] for r in results],
+                         ['APPROVED', 'DECLINED'])
+
+    def test_invalid_rows_are_reported(self):
+        input_path = self._write_jsonl([{'credit_score': 'x'}, _STRONG_RECORD])
+        totals = bulk_scoring.score_file(input_path,
+                                         self.output_dir,
+                                         workers=1)
+        self.assertEqual(totals['invalid'], 1)
+        results = _read_parts(self.output_dir)
+        self.assertIn('error', results[0])
+        self.assertEqual(results[1]['status'], 'APPROVED')
+
+    def test_malformed_lines_are_reported(self):
+        lines = [json.dumps(_STRONG_RECORD), '{"credit_score": ',
+                 json.dumps(_WEAK_RECORD)]
+        input_path = self._write('input.jsonl', '\n'.join(lines) + '\n')
+        totals = bulk_scoring.score_file(input_path,
+                                         self.output_dir,
+                                         workers=1)
+        self.assertEqual(totals['rows'], 3)
+        self.assertEqual(totals['invalid'], 1)
+        results = _read_parts(self.output_dir)
+        self.assertEqual([r['row'] for r in results], [0, 1, 2])
+        self.assertIn('invalid applicant record', results[1]['error'])
+        self.assertEqual([r.get('status') for r in results],
+                         ['APPROVED', None, 'DECLINED'])
+
+    def test_integer_fields_must_be_whole_numbers(self):
+        input_path = self._write_jsonl([
+            dict(_STRONG_RECORD, bankruptcies=2.7),
+            dict(_STRONG_RECORD, credit_score=700.0),
+        ])
+        totals = bulk_scoring.score_file(input_path,
+                                         self.output_dir,
+                                         workers=1)
+        self.assertEqual(totals['invalid'], 1)
+        results = _read_parts(self.output_dir)
+        self.assertIn('2.7 is not a whole number', results[0]['error'])
+        self.assertEqual(results[1]['status'], 'APPROVED')
+
+    def test_numbers_must_be_finite(self):
+        input_path = self._write_jsonl([
+            dict(_STRONG_RECORD, loan_amount=float('nan')),
+            dict(_STRONG_RECORD, vehicle_value=float('inf')),
+            dict(_STRONG_RECORD, monthly_income='nan'),
+            dict(_STRONG_RECORD, credit_score=float('-inf')),
+            _STRONG_RECORD,
+        ])
+        totals = bulk_scoring.score_file(input_path,
+                                         self.output_dir,
+                                         workers=1)
+        self.assertEqual(totals['invalid'], 4)
+        results = _read_parts(self.output_dir)
+        for result in results[:4]:
+            self.assertIn('is not a finite number', result['error'])
+        self.assertEqual(results[4]['status'], 'APPROVED')
+
+        fields = ap.APPLICANT_FIELDS
+        input_path = self._write(
+            'input.csv', ','.join(fields) + '\n' + ','.join(
+                'inf' if field == 'loan_amount' else str(_STRONG_RECORD[field])
+                for field in fields) + '\n')
+        totals = bulk_scoring.score_file(input_path,
+                                         os.path.join(self.output_dir, 'csv'),
+                                         input_format='csv',
+                                         workers=1)
+        self.assertEqual(totals['invalid'], 1)
+
+    def test_completed_chunks_are_skipped_on_restart(self):
+        input_path = self._write_jsonl([_STRONG_RECORD] * 6)
+        bulk_scoring.score_file(input_path,
+                                self.output_dir,
+                                chunk_size=2,
+                                workers=1)
+        os.remove(bulk_scoring.part_filename(self.output_dir, 1))
+        totals = bulk_scoring.score_file(input_path,
+                                         self.output_dir,
+                                         chunk_size=2,
+                                         workers=1)
+        self.assertEqual(totals['chunks'], 1)
+        self.assertEqual(totals['skipped_chunks'], 2)
+        self.assertEqual(len(_read_parts(self.output_dir)), 6)
+
+    def test_resuming_with_different_chunk_size_fails(self):
+        input_path = self._write_jsonl([_STRONG_RECORD])
+        bulk_scoring.score_file(input_path,
+                                self.output_dir,
+                                chunk_size=2,
+                                workers=1)
+        with self.assertRaises(bulk_scoring.ScoringError):
+            bulk_scoring.score_file(input_path,
+                                    self.output_dir,
+                                    chunk_size=3,
+                                    workers=1)
+
+    def test_score_file_command(self):
+        input_path = self._write_jsonl([_STRONG_RECORD, _WEAK_RECORD])
+        result = self.app.test_cli_runner().invoke(
+            args=['score-file', input_path, self.output_dir, '--workers', '1'])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn('Scored 2 rows', result.output)
+        self.assertEqual(len(_read_parts(self.output_dir)), 2)
@@ -0,0 +1,221 @@
+"""A memory-mapped columnar file of applicant inputs.
+
+Historical replays score the same applicants over and over. Exporting them
+once into this file lets batch scoring and policy analysis run over NumPy
+memmaps instead of querying Postgres and building ORM objects.
+
+Layout, all little-endian:
+
+    header (64 bytes): magic, version, capacity, row count, layout checksum,
+                       header checksum
+    one contiguous region per column, each sized for `capacity` rows
+
+Appends write the new values into each column region and then bump the row
+count in the header, so a partially written append is never visible. When the
+capacity is exhausted the file is rewritten with twice the capacity.
+"""
+from engine import application_processor as ap
+from engine import applicant_stream
+import os
+import struct
+import uuid
+import zlib
+import numpy as np
+
+COLUMNS = (('application_id', np.dtype('V16')),
+           ('credit_score', np.dtype('<i8')),
+           ('monthly_debt', np.dtype('<f8')),
+           ('monthly_income', np.dtype('<f8')),
+           ('bankruptcies', np.dtype('<i8')),
+           ('delinquencies', np.dtype('<i8')),
+           ('vehicle_value', np.dtype('<f8')),
+           ('loan_amount', np.dtype('<f8')))
+
+_MAGIC = b'TNETAPCS'
+_VERSION = 1
+_HEADER = struct.Struct('<8sIQQII')
+_HEADER_SIZE = 64
+_LAYOUT_CHECKSUM = zlib.crc32(
+    repr([(name, dtype.str) for name, dtype in COLUMNS]).encode())
+_DEFAULT_CAPACITY = 1 << 16
+
+
+class StoreError(Exception):
+    pass
+
+
+def _write_header(store_file, capacity, row_count):
+    fields = (_MAGIC, _VERSION, capacity, row_count, _LAYOUT_CHECKSUM)
+    checksum = zlib.crc32(_HEADER.pack(*fields, 0))
+    store_file.seek(0)
+    store_file.write(_HEADER.pack(*fields, checksum).ljust(_HEADER_SIZE, b'\0'))
+
+
+def read_header(path):
+    """Validates the header of a store and returns (capacity, row_count)."""
+    with open(path, 'rb') as store_file:
+        header = store_file.read(_HEADER.size)
+    if len(header) != _HEADER.size:
+        raise StoreError('%s is too short to be a column store.' % path)
+    magic, version, capacity, row_count, layout, checksum = _HEADER.unpack(
+        header)
+    if magic != _MAGIC:
+        raise StoreError('%s is not a column store.' % path)
+    if zlib.crc32(_HEADER.pack(magic, version, capacity, row_count, layout,
+                               0)) != checksum:
+        raise StoreError('%s has a corrupt header.' % path)
+    if version != _VERSION or layout != _LAYOUT_CHECKSUM:
+        raise StoreError('%s was written with an incompatible layout.' % path)
+    if row_count > capacity or os.path.getsize(path) < _file_size(capacity):
+        raise StoreError('%s is truncated.' % path)
+    return capacity, row_count
+
+
+def _column_offsets(capacity):
+    offsets, offset = {}, _HEADER_SIZE
+    for name, dtype in COLUMNS:
+        offsets[name] = offset
+        offset += capacity * dtype.itemsize
+    return offsets
+
+
+def _file_size(capacity):
+    return _HEADER_SIZE + capacity * sum(dtype.itemsize for _, dtype in COLUMNS)
+
+
+def create(path, capacity=_DEFAULT_CAPACITY):
+    """Creates an empty store at path, replacing any existing file."""
+    with open(path, 'wb') as store_file:
+        store_file.truncate(_file_size(capacity))
+        _write_header(store_file, capacity, 0)
+
+
+def read_columns(path, mode='r'):
+    """Returns a dict of column name -> memmap over the stored rows."""
+    capacity, row_count = read_header(path)
+    offsets = _column_offsets(capacity)
+    return {
+        name: np.memmap(path,
+                        dtype=dtype,
+                        mode=mode,
+                        offset=offsets[name],
+                        shape=(row_count, ))
+        for name, dtype in COLUMNS
+    }
+
+
+def _grow(path, capacity, row_count, needed):
+    new_capacity = max(capacity * 2, needed)
+    temp_path = path + '.tmp'
+    create(temp_path, new_capacity)
+    old_columns = read_columns(path)
+    offsets = _column_offsets(new_capacity)
+    for name, dtype in COLUMNS:
+        new_column = np.memmap(temp_path,
+                               dtype=dtype,
+                               mode='r+',
+                               offset=offsets[name],
+                               shape=(row_count, ))
+        new_column[:] = old_columns[name]
+        new_column.flush()
+    with open(temp_path, 'r+b') as store_file:
+        _write_header(store_file, new_capacity, row_count)
+    os.replace(temp_path, path)
+    return new_capacity
+
+
+def append(path, columns):
+    """Appends rows given as a dict of column name -> array-like.
+
+    application_id values may be uuid.UUID objects or 16-byte strings.
+    Returns the new row count.
+    """
+    capacity, row_count = read_header(path)
+    values = {}
+    for name, dtype in COLUMNS:
+        column = columns[name]
+        if name == 'application_id':
+            column = [
+                value.bytes if isinstance(value, uuid.UUID) else value
+                for value in column
+            ]
+        values[name] = np.asarray(column).astype(dtype)
+    added = len(values['application_id'])
+    if any(len(column) != added for column in values.values()):
+        raise StoreError('all columns must have the same length.')
+    if added == 0:
+        return row_count
+
+    if row_count + added > capacity:
+        capacity = _grow(path, capacity, row_count, row_count + added)
+    offsets = _column_offsets(capacity)
+    for name, dtype in COLUMNS:
+        region = np.memmap(path,
+                           dtype=dtype,
+                           mode='r+',
+                           offset=offsets[name] + row_count * dtype.itemsize,
+                           shape=(added, ))
+        region[:] = values[name]
+        region.flush()
+    # The row count is the commit point for the appended rows.
+    with open(path, 'r+b') as store_file:
+        _write_header(store_file, capacity, row_count + added)
+    return row_count + added
+
+
+def application_ids(columns):
+    """Returns the stored application ids as uuid.UUID objects."""
+    return [uuid.UUID(bytes=bytes(value)) for value in columns['application_id']]
+
+
+def _sorted_ids(columns):
+    return np.sort(columns['application_id'].view('S16'))
+
+
+def _is_stored(sorted_ids, candidate_ids):
+    candidate_ids = candidate_ids.view('S16')
+    if len(sorted_ids) == 0:
+        return np.zeros(len(candidate_ids), dtype=bool)
+    positions = np.searchsorted(sorted_ids, candidate_ids)
+    positions[positions == len(sorted_ids)] = 0
+    return sorted_ids[positions] == candidate_ids
+
+
+def export_applicant_info(path, append_new=False, chunk_size=100000):
+    """Copies applicant_info rows from the database into a store at path.
+
+    With append_new, applications already in the store are skipped and the
+    rest are appended; otherwise the store is recreated. Must be called
+    within an app context. Returns the number of rows written.
+    """
+    if not (append_new and os.path.exists(path)):
+        create(path)
+    sorted_ids = _sorted_ids(read_columns(path))
+
+    written = 0
+    for chunk in applicant_stream.iter_applicant_chunks(chunk_size):
+        chunk['application_id'] = np.array(
+            [value.bytes for value in chunk['application_id']], dtype='V16')
+        keep = ~_is_stored(sorted_ids, chunk['application_id'])
+        chunk = {name: column[keep] for name, column in chunk.items()}
+        append(path, chunk)
+        written += int(keep.sum())
+    return written
+
+
+def score(path):
+    """Runs the batch engine over every row in the store."""
+    columns = read_columns(path)
+    return ap.process_applications_batch(
+        *(columns[field] for field in ap.APPLICANT_FIELDS))
+
+
+def iter_chunks(path, chunk_size=100000):
+    """Yields dicts of column name -> memmap slice of at most chunk_size rows."""
+    columns = read_columns(path)
+    row_count = len(columns['application_id'])
+    for start in range(0, row_count, chunk_size):
+        yield {
+            name: column[start:start + chunk_size]
+            for name, column in columns.items()
+        }
@@ -0,0 +1,143 @@
+"""Test coverage for the memory-mapped applicant column store."""
+from testing.flask_test_base import FlaskTest
+from testing.applications import STRONG_APPLICATION
+from engine import application_processor as ap
+from engine import columnar_store
+import numpy as np
+import os
+import tempfile
+import uuid
+
+
+def _make_columns(count, seed=0):
+    rng = np.random.default_rng(seed)
+    return {
+        'application_id': [uuid.uuid4() for _ in range(count)],
+        'credit_score': rng.integers(500, 1001, count),
+        'monthly_debt': rng.uniform(0, 3000, count),
+        'monthly_income': rng.uniform(500, 10000, count),
+        'bankruptcies': rng.integers(0, 2, count),
+        'delinquencies': rng.integers(0, 3, count),
+        'vehicle_value': rng.uniform(1000, 60000, count),
+        'loan_amount': rng.uniform(1000, 60000, count),
+    }
+
+
+class ColumnStoreFileTests(FlaskTest):
+
+    def setUp(self):
+        super().setUp()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, 'applicants.cols')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+        super().tearDown()
+
+    def test_round_trip(self):
+        columnar_store.create(self.path)
+        data = _make_columns(10)
+        self.assertEqual(columnar_store.append(self.path, data), 10)
+        columns = columnar_store.read_columns(self.path)
+        self.assertEqual(columnar_store.application_ids(columns),
+                         data['application_id'])
+        for field in ap.APPLICANT_FIELDS:
+            np.testing.assert_array_equal(columns[field], data[field])
+
+    def test_empty_store(self):
+        columnar_store.create(self.path)
+        columns = columnar_store.read_columns(self.path)
+        self.assertEqual(len(columns['credit_score']), 0)
+        self.assertEqual(len(columnar_store.score(self.path).approved), 0)
+
+    def test_appends_grow_capacity(self):
+        columnar_store.create(self.path, capacity=4)
+        first, second = _make_columns(3, seed=1), _make_columns(7, seed=2)
+        columnar_store.append(self.path, first)
+        columnar_store.append(self.path, second)
+        capacity, row_count = columnar_store.read_header(self.path)
+        self.assertEqual(row_count, 10)
+        self.assertGreaterEqual(capacity, 10)
+        columns = columnar_store.read_columns(self.path)
+        np.testing.assert_array_equal(
+            columns['loan_amount'],
+            np.concatenate([first['loan_amount'], second['loan_amount']]))
+
+    def test_corrupt_header_is_detected(self):
+        columnar_store.create(self.path)
+        with open(self.path, 'r+b') as store_file:
+            store_file.seek(20)
+            store_file.write(b'\xff')
+        with self.assertRaises(columnar_store.StoreError):
+            columnar_store.read_columns(self.path)
+
+    def test_truncated_file_is_detected(self):
+        columnar_store.create(self.path)
+        with open(self.path, 'r+b') as store_file:
+            store_file.truncate(100)
+        with self.assertRaises(columnar_store.StoreError):
+            columnar_store.read_header(self.path)
+
+    def test_scoring_matches_batch_engine(self):
+        columnar_store.create(self.path)
+        data = _make_columns(500)
+        columnar_store.append(self.path, data)
+        decisions = columnar_store.score(self.path)
+        expected = ap.process_applications_batch(
+            *(data[field] for field in ap.APPLICANT_FIELDS))
+        np.testing.assert_array_equal(decisions.rejection_mask,
+                                      expected.rejection_mask)
+        np.testing.assert_array_equal(decisions.monthly_payment,
+                                      expected.monthly_payment)
+
+
+class ColumnStoreExportTests(FlaskTest):
+
+    def setUp(self):
+        super().setUp()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, 'applicants.cols')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+        super().tearDown()
+
+    def _submit(self, user_id):
+        return self.post('/users/' + user_id + '/applications',
+                         STRONG_APPLICATION).json['id']
+
+    def test_export_and_incremental_append(self):
+        user_id = self.post('/users', {'name': 'steve'}).json['id']
+        first_ids = [self._submit(user_id) for _ in range(3)]
+        self.assertEqual(columnar_store.export_applicant_info(self.path), 3)
+
+        second_id = self._submit(user_id)
+        self.assertEqual(
+            columnar_store.export_applicant_info(self.path, append_new=True),
+            1)
+        columns = columnar_store.read_columns(self.path)
+        self.assertEqual(
+            sorted(str(i) for i in columnar_store.application_ids(columns)),
+            sorted(first_ids + [second_id]))
+        np.testing.assert_array_equal(columns['credit_score'], [1000] * 4)
+        self.assertTrue(columnar_store.score(self.path).approved.all())
+
+    def test_export_covers_both_layouts(self):
+        user_id = self.post('/users', {'name': 'steve'}).json['id']
+        ids = [self._submit(user_id)]
+        self.app.config['COMPACT_APPLICATION_STORAGE'] = True
+        ids.append(self._submit(user_id))
+        self.assertEqual(columnar_store.export_applicant_info(self.path), 2)
+        columns = columnar_store.read_columns(self.path)
+        self.assertEqual(
+            sorted(str(i) for i in columnar_store.application_ids(columns)),
+            sorted(ids))
+        np.testing.assert_array_equal(columns['credit_score'], [1000] * 2)
+
+    def test_export_command(self):
+        user_id = self.post('/users', {'name': 'steve'}).json['id']
+        self._submit(user_id)
+        result = self.app.test_cli_runner().invoke(
+            args=['export-applicants', self.path])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn('the store now holds 1 rows', result.output)
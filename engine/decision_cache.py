@@ -0,0 +1,175 @@
+"""Memoizes engine decisions for repeated applicant inputs.
+
+Retries, funnel re-renders and test traffic submit identical applicants over
+and over. Decisions are cached in a bounded in-process LRU, keyed by the
+normalized applicant fields, the requested terms and the digest of the active
+policy, so any change to the constants stops old entries from matching. An
+optional shared backend lets several processes reuse each other's decisions.
+"""
+from app import models
+from engine import application_processor as ap
+from engine import policy as lending_policy
+import collections
+import json
+import threading
+
+DEFAULT_MAXSIZE = 10000
+
+_INTEGER_FIELDS = ('credit_score', 'bankruptcies', 'delinquencies')
+
+
+class LocalSharedBackend:
+    """In-memory stand-in for a shared key-value store such as Redis.
+
+    Backends only need get and set; values are JSON strings so that a
+    networked store can hold them as-is.
+    """
+
+    def __init__(self):
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            return self._values.get(key)
+
+    def set(self, key, value):
+        with self._lock:
+            self._values[key] = value
+
+
+def _normalize(applicant_info):
+    return tuple(
+        int(getattr(applicant_info, field)) if field in _INTEGER_FIELDS else
+        float(getattr(applicant_info, field))
+        for field in ap.APPLICANT_FIELDS)
+
+
+def _encode(decision):
+    offers, rejection_reasons = decision
+    if offers is None or isinstance(offers, ap.OfferTerms):
+        kind, offers = 'single', [] if offers is None else [offers]
+    else:
+        kind = 'grid'
+    return json.dumps({
+        'kind': kind,
+        'offers': [list(offer) for offer in offers],
+        'reasons': [int(reason) for reason in rejection_reasons],
+    })
+
+
+def _decode(value):
+    value = json.loads(value)
+    offers = [ap.OfferTerms(*offer) for offer in value['offers']]
+    if value['kind'] == 'single':
+        offers = offers[0] if offers else None
+    return offers, [
+        models.RejectionReason(reason) for reason in value['reasons']
+    ]
+
+
+def _copy(decision):
+    # Callers own the lists they get back; the cached ones stay untouched.
+    offers, rejection_reasons = decision
+    if isinstance(offers, list):
+        offers = list(offers)
+    return offers, list(rejection_reasons)
+
+
+class DecisionCache:
+    """A thread-safe LRU of engine decisions with hit/miss/eviction counters."""
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE, backend=None):
+        self.maxsize = maxsize
+        self.backend = backend
+        self._entries = collections.OrderedDict()
+        self._digest = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def process_application(self, applicant_info, terms=None):
+        """Same as application_processor.process_application, but memoized."""
+        policy = lending_policy.current()
+        if self.maxsize <= 0:
+            return ap.process_application(applicant_info, policy, terms)
+
+        key = (_normalize(applicant_info),
+               None if terms is None else tuple(terms))
+        with self._lock:
+            if self._digest != policy.digest:
+                # Entries for the previous policy can never match again.
+                if self._entries:
+                    self.invalidations += 1
+                self._entries.clear()
+                self._digest = policy.digest
+            decision = self._entries.get(key)
+            if decision is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return _copy(decision)
+
+        shared_key = None
+        if self.backend is not None:
+            shared_key = 'decision:%s:%r' % (policy.digest, key)
+            value = self.backend.get(shared_key)
+            if value is not None:
+                decision = _decode(value)
+                self._store(policy.digest, key, decision, shared_hit=True)
+                return _copy(decision)
+
+        decision = ap.process_application(applicant_info, policy, terms)
+        if shared_key is not None:
+            self.backend.set(shared_key, _encode(decision))
+        self._store(policy.digest, key, decision)
+        return _copy(decision)
+
+    def _store(self, digest, key, decision, shared_hit=False):
+        with self._lock:
+            if shared_hit:
+                self.shared_hits += 1
+            else:
+                self.misses += 1
+            if digest != self._digest:
+                return
+            self._entries[key] = _copy(decision)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'shared_hits': self.shared_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'policy_digest': self._digest,
+            }
+
+
+# The cache used by the API. create_app replaces it according to its config.
+cache = DecisionCache()
+
+
+def configure(maxsize=DEFAULT_MAXSIZE, backend=None):
+    """Replaces the API's decision cache."""
+    global cache
+    cache = DecisionCache(maxsize=maxsize, backend=backend)
+    return cache
+
+
+def process_application(applicant_info, terms=None):
+    """Evaluates an application through the API's decision cache."""
+    return cache.process_application(applicant_info, terms=terms)
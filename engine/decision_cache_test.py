@@ -0,0 +1,102 @@
+"""Test coverage for the decision cache."""
+from unittest import mock
+from testing.flask_test_base import FlaskTest
+from app import models
+from constants import constants
+from engine import application_processor as ap
+from engine import decision_cache
+
+
+def _make_record(**overrides):
+    fields = dict(credit_score=1000,
+                  monthly_debt=0.0,
+                  monthly_income=1000.0,
+                  bankruptcies=0,
+                  delinquencies=0,
+                  vehicle_value=10000.0,
+                  loan_amount=2000.0)
+    fields.update(overrides)
+    return ap.ApplicantRecord(**fields)
+
+
+class DecisionCacheTests(FlaskTest):
+
+    def test_hits_return_engine_decisions(self):
+        cache = decision_cache.DecisionCache(maxsize=10)
+        for record in (_make_record(), _make_record(bankruptcies=3)):
+            expected = ap.process_application(record)
+            self.assertEqual(cache.process_application(record), expected)
+            self.assertEqual(cache.process_application(record), expected)
+        self.assertEqual(cache.stats()['hits'], 2)
+        self.assertEqual(cache.stats()['misses'], 2)
+
+    def test_inputs_are_normalized(self):
+        cache = decision_cache.DecisionCache(maxsize=10)
+        cache.process_application(_make_record())
+        cache.process_application(
+            _make_record(credit_score=1000.0, monthly_debt=0))
+        info = models.ApplicantInfo(**_make_record()._asdict())
+        cache.process_application(info)
+        self.assertEqual(cache.stats()['hits'], 2)
+
+    def test_terms_are_part_of_the_key(self):
+        cache = decision_cache.DecisionCache(maxsize=10)
+        single, _ = cache.process_application(_make_record())
+        grid, _ = cache.process_application(_make_record(), terms=[36, 72])
+        self.assertIsInstance(single, ap.OfferTerms)
+        self.assertEqual(len(grid), 2)
+        self.assertEqual(cache.stats()['misses'], 2)
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = decision_cache.DecisionCache(maxsize=2)
+        first, second, third = (_make_record(loan_amount=amount)
+                                for amount in (1.0, 2.0, 3.0))
+        cache.process_application(first)
+        cache.process_application(second)
+        cache.process_application(first)
+        cache.process_application(third)
+        self.assertEqual(cache.stats()['evictions'], 1)
+        cache.process_application(first)
+        self.assertEqual(cache.stats()['hits'], 2)
+        cache.process_application(second)
+        self.assertEqual(cache.stats()['misses'], 4)
+
+    def test_policy_change_invalidates(self):
+        cache = decision_cache.DecisionCache(maxsize=10)
+        record = _make_record()
+        offer, _ = cache.process_application(record)
+        bands = [{'minimum_score_required': 100, 'apr': 0.25}]
+        with mock.patch.object(constants, 'CREDIT_BANDS', bands):
+            changed_offer, _ = cache.process_application(record)
+            self.assertEqual(changed_offer.apr, 0.25)
+        self.assertEqual(cache.stats()['invalidations'], 1)
+        self.assertEqual(cache.process_application(record)[0], offer)
+        self.assertEqual(cache.stats()['hits'], 0)
+
+    def test_returned_lists_can_be_mutated(self):
+        cache = decision_cache.DecisionCache(maxsize=10)
+        record = _make_record(bankruptcies=3)
+        _, rejection_reasons = cache.process_application(record)
+        rejection_reasons.clear()
+        _, rejection_reasons = cache.process_application(record)
+        self.assertEqual(rejection_reasons,
+                         [models.RejectionReason.EXCESSIVE_BANKRUPTCIES])
+
+    def test_shared_backend_is_used_across_caches(self):
+        backend = decision_cache.LocalSharedBackend()
+        first = decision_cache.DecisionCache(maxsize=10, backend=backend)
+        second = decision_cache.DecisionCache(maxsize=10, backend=backend)
+        for record in (_make_record(), _make_record(bankruptcies=3)):
+            for terms in (None, [36, 72]):
+                expected = first.process_application(record, terms=terms)
+                self.assertEqual(
+                    second.process_application(record, terms=terms), expected)
+        self.assertEqual(second.stats()['shared_hits'], 4)
+        self.assertEqual(second.stats()['misses'], 0)
+
+    def test_zero_maxsize_disables_cache(self):
+        cache = decision_cache.DecisionCache(maxsize=0)
+        cache.process_application(_make_record())
+        cache.process_application(_make_record())
+        self.assertEqual(cache.stats()['size'], 0)
+        self.assertEqual(cache.stats()['hits'], 0)
@@ -0,0 +1,156 @@
+"""Lending policy compiled from the financial constants.
+
+The constants module describes the policy in a form that is easy to review.
+The engine compiles it once into lookup tables, so evaluating an application
+costs the same no matter how many credit bands are configured.
+"""
+from constants import constants
+import functools
+import hashlib
+import numpy as np
+import numpy_financial as npf
+
+# Credit scores are reported on a 0-1000 scale.
+MAXIMUM_CREDIT_SCORE = 1000
+
+
+@functools.lru_cache(maxsize=None)
+def annuity_factor(apr, term_length_months):
+    """Returns the monthly payment per unit of principal for a loan.
+
+    Policies only ever use a handful of (apr, term) pairs, so the result is
+    memoized and a payment costs one multiply instead of an npf.pmt call.
+    """
+    return float(-1 * npf.pmt(apr / 12, term_length_months, 1.0))
+
+
+@functools.lru_cache(maxsize=1024)
+def annuity_factors(apr, term_lengths_months):
+    """Returns annuity_factor for each term in a tuple, as a read-only array."""
+    factors = np.array(
+        [annuity_factor(apr, term) for term in term_lengths_months])
+    factors.flags.writeable = False
+    return factors
+
+
+class Policy:
+    """A compiled, immutable view of the lending constants."""
+
+    def __init__(self, credit_bands, maximum_bankruptcies,
+                 maximum_delinquencies, maximum_debt_to_income_ratio,
+                 maximum_loan_to_value_ratio, loan_length_in_months):
+        self.credit_bands = tuple(
+            (band['minimum_score_required'], band['apr'])
+            for band in credit_bands)
+        self.maximum_bankruptcies = maximum_bankruptcies
+        self.maximum_delinquencies = maximum_delinquencies
+        self.maximum_debt_to_income_ratio = maximum_debt_to_income_ratio
+        self.maximum_loan_to_value_ratio = maximum_loan_to_value_ratio
+        self.loan_length_in_months = loan_length_in_months
+        # Identifies the policy's behavior, e.g. for keying cached decisions.
+        self.digest = hashlib.sha256(
+            repr((self.credit_bands, maximum_bankruptcies,
+                  maximum_delinquencies, maximum_debt_to_income_ratio,
+                  maximum_loan_to_value_ratio,
+                  loan_length_in_months)).encode()).hexdigest()
+
+        # Dense score -> APR table. Bands are applied in reverse so that the
+        # first eligible band in the configured order wins, as it always has.
+        apr_by_score = np.full(MAXIMUM_CREDIT_SCORE + 1, np.nan)
+        for minimum_score, apr in reversed(self.credit_bands):
+            if not 0 <= minimum_score <= MAXIMUM_CREDIT_SCORE:
+                raise ValueError(
+                    'minimum_score_required must be between 0 and %d.' %
+                    MAXIMUM_CREDIT_SCORE)
+            apr_by_score[minimum_score:] = apr
+        apr_by_score.flags.writeable = False
+        self.apr_by_score = apr_by_score
+
+        # Matching score -> monthly payment per unit of principal.
+        payment_factor_by_score = np.full(MAXIMUM_CREDIT_SCORE + 1, np.nan)
+        for minimum_score, apr in reversed(self.credit_bands):
+            payment_factor_by_score[minimum_score:] = annuity_factor(
+                apr, loan_length_in_months)
+        payment_factor_by_score.flags.writeable = False
+        self.payment_factor_by_score = payment_factor_by_score
+
+        # Scalar lookups index a tuple of Python floats to avoid NumPy scalars.
+        self._band_by_score = tuple(
+            None if np.isnan(apr) else (float(apr), float(factor))
+            for apr, factor in zip(apr_by_score, payment_factor_by_score))
+
+    @classmethod
+    def from_constants(cls, module=constants):
+        """Compiles the policy described by a constants module."""
+        return cls(
+            credit_bands=module.CREDIT_BANDS,
+            maximum_bankruptcies=module.MAXIMUM_BANKRUPTCIES,
+            maximum_delinquencies=module.MAXIMUM_DELINQUENCIES,
+            maximum_debt_to_income_ratio=module.MAXIMUM_DEBT_TO_INCOME_RATIO,
+            maximum_loan_to_value_ratio=module.MAXIMUM_LOAN_TO_VALUE_RATIO,
+            loan_length_in_months=module.LOAN_LENGTH_IN_MONTHS)
+
+    def band_for_score(self, credit_score):
+        """Returns (apr, payment_factor) of the highest eligible band, or None."""
+        if credit_score < 0:
+            return None
+        return self._band_by_score[min(int(credit_score),
+                                       MAXIMUM_CREDIT_SCORE)]
+
+    def apr_for_score(self, credit_score):
+        """Returns the APR of the highest eligible band, or None."""
+        band = self.band_for_score(credit_score)
+        return None if band is None else band[0]
+
+    def aprs_for_scores(self, credit_scores):
+        """Array version of apr_for_score. Ineligible scores map to NaN."""
+        return self._lookup(self.apr_by_score, credit_scores)
+
+    def payment_factors_for_scores(self, credit_scores):
+        """Returns the payment factor per score. Ineligible scores map to NaN."""
+        return self._lookup(self.payment_factor_by_score, credit_scores)
+
+    @staticmethod
+    def _lookup(table, credit_scores):
+        credit_scores = np.asarray(credit_scores)
+        index = np.clip(credit_scores, 0,
+                        MAXIMUM_CREDIT_SCORE).astype(np.intp)
+        values = table[index]
+        values[credit_scores < 0] = np.nan
+        return values
+
+
+_current = None
+_current_key = None
+
+
+def _constants_key(module):
+    # Cheap to compute on every call. Replacing any constant (including the
+    # CREDIT_BANDS list itself, as mock.patch does) triggers a recompile.
+    return (id(module.CREDIT_BANDS), module.MAXIMUM_BANKRUPTCIES,
+            module.MAXIMUM_DELINQUENCIES, module.MAXIMUM_DEBT_TO_INCOME_RATIO,
+            module.MAXIMUM_LOAN_TO_VALUE_RATIO, module.LOAN_LENGTH_IN_MONTHS)
+
+
+def reload():
+    """Recompiles the active policy from the constants module.
+
+    Call this after editing constants.CREDIT_BANDS in place; replacing any of
+    the constants is picked up automatically by current().
+    """
+    global _current, _current_key
+    annuity_factor.cache_clear()
+    annuity_factors.cache_clear()
+    _current_key = _constants_key(constants)
+    _current = Policy.from_constants(constants)
+    return _current
+
+
+def current():
+    """Returns the policy compiled from the active constants."""
+    if _current_key != _constants_key(constants):
+        return reload()
+    return _current
+
+
+reload()
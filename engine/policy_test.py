@@ -0,0 +1,108 @@
+"""Test coverage for the compiled lending policy."""
+from unittest import mock
+from testing.flask_test_base import FlaskTest
+from constants import constants
+from engine import policy as lending_policy
+import numpy as np
+import numpy_financial as npf
+
+
+def _linear_scan_apr(credit_bands, credit_score):
+    for band in credit_bands:
+        if credit_score >= band['minimum_score_required']:
+            return band['apr']
+    return None
+
+
+_FINE_GRAINED_BANDS = [{
+    'minimum_score_required': 990 - 10 * i,
+    'apr': round(0.01 + 0.002 * i, 4),
+} for i in range(50)]
+
+
+class CreditBandLookupTests(FlaskTest):
+    """Make sure the lookup table agrees with a scan over the bands."""
+
+    def test_lookup_matches_linear_scan(self):
+        policy = lending_policy.Policy.from_constants()
+        for score in list(range(-5, 1006)) + [659.5, 779.99, 1000.5, -0.5]:
+            self.assertEqual(policy.apr_for_score(score),
+                             _linear_scan_apr(constants.CREDIT_BANDS, score))
+
+    def test_array_lookup_matches_linear_scan(self):
+        policy = lending_policy.Policy.from_constants()
+        scores = np.arange(-5, 1006)
+        aprs = policy.aprs_for_scores(scores)
+        for score, apr in zip(scores, aprs):
+            expected = _linear_scan_apr(constants.CREDIT_BANDS, score)
+            if expected is None:
+                self.assertTrue(np.isnan(apr))
+            else:
+                self.assertEqual(apr, expected)
+
+    def test_fine_grained_bands(self):
+        with mock.patch.object(constants, 'CREDIT_BANDS', _FINE_GRAINED_BANDS):
+            policy = lending_policy.current()
+            for score in range(0, 1001):
+                self.assertEqual(policy.apr_for_score(score),
+                                 _linear_scan_apr(_FINE_GRAINED_BANDS, score))
+
+    def test_replaced_constants_are_recompiled(self):
+        bands = [{'minimum_score_required': 100, 'apr': 0.25}]
+        with mock.patch.object(constants, 'CREDIT_BANDS', bands):
+            self.assertEqual(lending_policy.current().apr_for_score(150), 0.25)
+        self.assertIsNone(lending_policy.current().apr_for_score(150))
+
+    def test_reload_picks_up_in_place_edits(self):
+        bands = [{'minimum_score_required': 100, 'apr': 0.25}]
+        with mock.patch.object(constants, 'CREDIT_BANDS', bands):
+            lending_policy.current()
+            bands[0]['apr'] = 0.2
+            self.assertEqual(lending_policy.reload().apr_for_score(150), 0.2)
+
+    def test_band_outside_score_range_is_rejected(self):
+        with self.assertRaises(ValueError):
+            lending_policy.Policy(credit_bands=[{
+                'minimum_score_required': 1001,
+                'apr': 0.02
+            }],
+                                  maximum_bankruptcies=0,
+                                  maximum_delinquencies=1,
+                                  maximum_debt_to_income_ratio=0.6,
+                                  maximum_loan_to_value_ratio=1,
+                                  loan_length_in_months=72)
+
+
+class AnnuityFactorTests(FlaskTest):
+    """Make sure cached payment factors agree with npf.pmt."""
+
+    def test_factor_matches_pmt_to_the_cent(self):
+        for band in constants.CREDIT_BANDS:
+            for term in (36, 48, 60, 72, 84):
+                for principal in (1.0, 399.0, 12345.67, 99999.99):
+                    expected = -1 * npf.pmt(band['apr'] / 12, term, principal)
+                    actual = principal * lending_policy.annuity_factor(
+                        band['apr'], term)
+                    self.assertLess(abs(actual - expected), 0.005)
+
+    def test_factor_table_uses_loan_length(self):
+        policy = lending_policy.Policy.from_constants()
+        apr, factor = policy.band_for_score(1000)
+        self.assertEqual(
+            factor,
+            lending_policy.annuity_factor(apr, constants.LOAN_LENGTH_IN_MONTHS))
+        self.assertIsNone(policy.band_for_score(0))
+        self.assertTrue(np.isnan(policy.payment_factors_for_scores([0])[0]))
+
+    def test_reload_clears_factor_cache(self):
+        lending_policy.annuity_factor(0.02, 12)
+        self.assertGreater(lending_policy.annuity_factor.cache_info().currsize,
+                           0)
+        lending_policy.reload()
+        self.assertEqual(lending_policy.annuity_factor.cache_info().currsize,
+                         len(set(band['apr'] for band in constants.CREDIT_BANDS)))
+
+    def test_changed_loan_length_is_recompiled(self):
+        with mock.patch.object(constants, 'LOAN_LENGTH_IN_MONTHS', 36):
+            apr, factor = lending_policy.current().band_for_score(1000)
+            self.assertEqual(factor, lending_policy.annuity_factor(apr, 36))
@@ -6,6 +6,7 @@ from logging.config import fileConfig
 from flask import current_app
 
 from alembic import context
+from app import partitions
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -71,6 +72,17 @@ def run_migrations_online():
                 directives[:] = []
                 logger.info('No changes in schema detected.')
 
+    # Partitions are created and dropped by app/partitions.py, not by
+    # migrations, so autogenerate should see neither them nor the copies of
+    # foreign keys that Postgres makes for each partition they refer to.
+    def include_object(object, name, type_, reflected, compare_to):
+        if type_ == 'table':
+            return not partitions.is_partition_name(name)
+        if type_ == 'foreign_key_constraint' and reflected:
+            return not partitions.is_partition_name(
+                object.referred_table.name)
+        return True
+
     connectable = current_app.extensions['migrate'].db.get_engine()
 
     with connectable.connect() as connection:
@@ -78,6 +90,7 @@ def run_migrations_online():
             connection=connection,
             target_metadata=target_metadata,
             process_revision_directives=process_revision_directives,
+            include_object=include_object,
             **current_app.extensions['migrate'].configure_args
         )
 
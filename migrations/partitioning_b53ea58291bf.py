@@ -0,0 +1,184 @@
+"""Converts the application tables to and from monthly partitions.
+
+Used by migration b53ea58291bf, and frozen with the schema as of that
+revision: the columns, constraints and indexes are spelled out here rather
+than read from the models, so the migration keeps rebuilding exactly the
+tables it was written for however the models change later. Migrations that
+change these tables afterwards write their own DDL, against partitioned and
+plain tables alike, and must not change this module.
+
+Partitions are named and bounded as app/partitions.py expects, which creates
+and drops them at runtime.
+"""
+from app import ids
+import datetime
+import sqlalchemy as sa
+import uuid
+
+# Parents before children, the order they are created and filled in.
+TABLES = ('application', 'applicant_info', 'offer', 'rejection')
+
+_PARTITION_KEYS = {
+    'application': 'id',
+    'applicant_info': 'application_id',
+    'offer': 'application_id',
+    'rejection': 'application_id',
+}
+
+_COLUMNS = {
+    'application': (
+        ('id', 'uuid NOT NULL'),
+        ('user_id', 'uuid NOT NULL'),
+        ('status', 'applicationstatus'),
+        ('credit_score', 'integer'),
+        ('monthly_debt', 'double precision'),
+        ('monthly_income', 'double precision'),
+        ('bankruptcies', 'integer'),
+        ('delinquencies', 'integer'),
+        ('vehicle_value', 'double precision'),
+        ('loan_amount', 'double precision'),
+        ('offer_apr', 'double precision'),
+        ('offer_monthly_payment', 'double precision'),
+        ('offer_term_length_months', 'integer'),
+        ('rejection_mask', 'integer'),
+        ('created_at', 'timestamp with time zone DEFAULT now() NOT NULL'),
+    ),
+    'applicant_info': (
+        ('id', 'uuid NOT NULL'),
+        ('application_id', 'uuid NOT NULL'),
+        ('credit_score', 'integer NOT NULL'),
+        ('monthly_debt', 'double precision NOT NULL'),
+        ('monthly_income', 'double precision NOT NULL'),
+        ('bankruptcies', 'integer NOT NULL'),
+        ('delinquencies', 'integer NOT NULL'),
+        ('vehicle_value', 'double precision NOT NULL'),
+        ('loan_amount', 'double precision NOT NULL'),
+    ),
+    'offer': (
+        ('id', 'uuid NOT NULL'),
+        ('application_id', 'uuid NOT NULL'),
+        ('apr', 'double precision NOT NULL'),
+        ('monthly_payment', 'double precision NOT NULL'),
+        ('term_length_months', 'integer NOT NULL'),
+    ),
+    'rejection': (
+        ('id', 'uuid NOT NULL'),
+        ('application_id', 'uuid NOT NULL'),
+        ('reason', 'rejectionreason NOT NULL'),
+    ),
+}
+
+# Every constraint but the primary keys, which depend on the layout.
+_CONSTRAINTS = {
+    'application': (
+        'application_user_id_fkey FOREIGN KEY (user_id) '
+        'REFERENCES users (id) ON DELETE CASCADE', ),
+    'applicant_info': (
+        'applicant_info_application_id_fkey FOREIGN KEY (application_id) '
+        'REFERENCES application (id) ON DELETE CASCADE', ),
+    'offer': (
+        '_application_offer_term_uc '
+        'UNIQUE (application_id, term_length_months)',
+        'offer_application_id_fkey FOREIGN KEY (application_id) '
+        'REFERENCES application (id) ON DELETE CASCADE',
+    ),
+    'rejection': (
+        '_application_rejection_uc UNIQUE (application_id, reason)',
+        'rejection_application_id_fkey FOREIGN KEY (application_id) '
+        'REFERENCES application (id) ON DELETE CASCADE',
+    ),
+}
+
+_INDEXES = (
+    'ix_application_created_at_id ON application (created_at, id)',
+    'ix_application_user_id_id ON application (user_id, id)',
+    'ix_applicant_info_application_id ON applicant_info (application_id)',
+)
+
+
+def _month_start(when):
+    when = when.astimezone(datetime.timezone.utc)
+    return datetime.datetime(when.year, when.month, 1,
+                             tzinfo=datetime.timezone.utc)
+
+
+def _next_month(month):
+    return _month_start(month + datetime.timedelta(days=32))
+
+
+def _create_constraints(connection, partitioned):
+    for name in TABLES:
+        key = _PARTITION_KEYS[name]
+        # A partitioned table's primary key must include its partition key.
+        primary_key = ('%s, id' % key if partitioned and key != 'id' else
+                       'id')
+        connection.execute(
+            sa.text('ALTER TABLE %s ADD CONSTRAINT %s_pkey PRIMARY KEY (%s)' %
+                    (name, name, primary_key)))
+        for constraint in _CONSTRAINTS[name]:
+            connection.execute(
+                sa.text('ALTER TABLE %s ADD CONSTRAINT %s' %
+                        (name, constraint)))
+    for index in _INDEXES:
+        connection.execute(sa.text('CREATE INDEX ' + index))
+
+
+def _rebuild(connection, partitioned, months=()):
+    """Copies the tables into new ones and swaps them in."""
+    for name in TABLES:
+        columns = ', '.join(column for column, _ in _COLUMNS[name])
+        connection.execute(
+            sa.text('CREATE TABLE %s_rebuilt (%s)%s' %
+                    (name, ', '.join('%s %s' % column
+                                     for column in _COLUMNS[name]),
+                     ' PARTITION BY RANGE (%s)' %
+                     _PARTITION_KEYS[name] if partitioned else '')))
+        if partitioned:
+            connection.execute(
+                sa.text('CREATE TABLE %s_default PARTITION OF %s_rebuilt '
+                        'DEFAULT' % (name, name)))
+            for month in months:
+                connection.execute(
+                    sa.text("CREATE TABLE %s_p%04d_%02d PARTITION OF "
+                            "%s_rebuilt FOR VALUES FROM ('%s') TO ('%s')" %
+                            (name, month.year, month.month, name,
+                             ids.lower_bound(month),
+                             ids.lower_bound(_next_month(month)))))
+        connection.execute(
+            sa.text('INSERT INTO %s_rebuilt (%s) SELECT %s FROM %s' %
+                    (name, columns, columns, name)))
+    for name in reversed(TABLES):
+        connection.execute(sa.text('DROP TABLE %s' % name))
+    for name in TABLES:
+        connection.execute(
+            sa.text('ALTER TABLE %s_rebuilt RENAME TO %s' % (name, name)))
+    _create_constraints(connection, partitioned)
+
+
+def partition_tables(connection, months_ahead=3, now=None):
+    """Converts the application tables into partitioned ones.
+
+    Creates a partition for every month from the oldest time-ordered
+    application id through months_ahead months after now, and copies every
+    row across. Takes exclusive locks on the tables until the transaction
+    commits.
+    """
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    oldest = connection.execute(
+        sa.text("SELECT id::text FROM application "
+                "WHERE substr(id::text, 15, 1) = '7' "
+                'ORDER BY id LIMIT 1')).scalar()
+    month = _month_start(ids.created_at(uuid.UUID(oldest)) if oldest else now)
+    last = _month_start(now)
+    for _ in range(months_ahead):
+        last = _next_month(last)
+    months = []
+    while month <= last:
+        months.append(month)
+        month = _next_month(month)
+    _rebuild(connection, partitioned=True, months=months)
+
+
+def unpartition_tables(connection):
+    """Converts partitioned application tables back into plain ones."""
+    _rebuild(connection, partitioned=False)
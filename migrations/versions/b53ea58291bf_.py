@@ -0,0 +1,35 @@
+"""Partition the application tables by month, if configured.
+
+Only runs when PARTITION_APPLICATIONS is set; see app/partitions.py. The
+tables are rebuilt by migrations/partitioning_b53ea58291bf.py, which holds
+their DDL as of this revision. It copies every application row, holding
+exclusive locks until it commits. To partition a database that has already
+passed this revision, downgrade to 218a2d08eb9e and upgrade again with the
+setting on.
+
+Revision ID: b53ea58291bf
+Revises: 218a2d08eb9e
+Create Date: 2026-10-18 12:46:07.947275
+
+"""
+from alembic import op
+from app import partitions
+from flask import current_app
+from migrations import partitioning_b53ea58291bf as partitioning
+
+
+# revision identifiers, used by Alembic.
+revision = 'b53ea58291bf'
+down_revision = '218a2d08eb9e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if current_app.config['PARTITION_APPLICATIONS']:
+        partitioning.partition_tables(op.get_bind())
+
+
+def downgrade():
+    if partitions.is_partitioned(op.get_bind()):
+        partitioning.unpartition_tables(op.get_bind())
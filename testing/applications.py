@@ -0,0 +1,25 @@
+"""Applicant info shared by the tests.
+
+A strong applicant is approved with a single offer under the default policy,
+and a weak one is declined.
+"""
+
+STRONG_APPLICATION = {
+    'bankruptcies': 0,
+    'credit_score': 1000,
+    'monthly_debt': 0,
+    'loan_amount': 399,
+    'vehicle_value': 2000,
+    'monthly_income': 4444444,
+    'delinquencies': 0,
+}
+
+WEAK_APPLICATION = {
+    'bankruptcies': 3,
+    'credit_score': 333,
+    'monthly_debt': 220,
+    'loan_amount': 399,
+    'vehicle_value': 2000,
+    'monthly_income': 4444444,
+    'delinquencies': 33,
+}
@@ -1,5 +1,7 @@
 import unittest
 from tenet import create_app, db
+from sqlalchemy import event
+import contextlib
 import json
 
 class FlaskTest(unittest.TestCase):
@@ -34,3 +36,27 @@ class FlaskTest(unittest.TestCase):
 
     def delete(self, route):
         return self.client.delete(route, headers=self.get_api_headers())
+
+    @contextlib.contextmanager
+    def record_statements(self, parameters=False):
+        """Collects the SQL statements executed within the block.
+
+        With parameters, each is collected as a (statement, parameters)
+        tuple, with the first parameter set of an executemany.
+        """
+        statements = []
+
+        def record(conn, cursor, statement, statement_parameters, context,
+                   executemany):
+            if not parameters:
+                statements.append(statement)
+                return
+            if executemany:
+                statement_parameters = statement_parameters[0]
+            statements.append((statement, statement_parameters))
+
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            yield statements
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)